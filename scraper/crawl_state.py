@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Stato persistente dello scraper: cache delle pagine e checkpoint del crawl.
+
+- PageCache: dettagli già estratti per URL, con ETag/Last-Modified/hash del
+  contenuto e TTL. Una pagina non modificata non viene renderizzata di nuovo.
+- Checkpoint: frontiera del crawl del catalogo (pagine da visitare e già
+  visitate), per riprendere un crawl interrotto dall'ultimo punto completato.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+SCRAPER_DIR = Path(__file__).parent
+
+DEFAULT_CACHE_FILE = SCRAPER_DIR / '.page-cache.json'
+DEFAULT_CHECKPOINT_FILE = SCRAPER_DIR / '.scrape-checkpoint.json'
+DEFAULT_TTL_HOURS = 24
+REVALIDATE_TIMEOUT = 10  # secondi
+
+USER_AGENT = 'Mozilla/5.0 (compatible; CodroipoKBScraper/1.0)'
+
+
+def _atomic_write_json(path, data):
+    """Scrive un file JSON in modo atomico (file temporaneo + rename)."""
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def content_hash(content):
+    """Hash SHA-256 del contenuto (bytes o str)."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    """
+    Cache su disco dei dettagli estratti, indicizzata per URL.
+
+    Una voce è valida senza richieste di rete finché non supera il TTL.
+    Dopo il TTL viene rivalidata con una GET condizionale
+    (If-None-Match / If-Modified-Since): un 304, oppure un 200 con lo
+    stesso hash del contenuto, rinnova la voce senza renderizzare la pagina.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl_hours=DEFAULT_TTL_HOURS, session=None):
+        self.path = Path(path)
+        self.ttl = ttl_hours * 3600
+        self.session = session or requests.Session()
+        self.session.headers.setdefault('User-Agent', USER_AGENT)
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (json.JSONDecodeError, OSError):
+                print(f"⚠️  Cache {self.path.name} illeggibile, verrà ricreata")
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _revalidate(self, url, entry):
+        """
+        GET condizionale verso l'URL.
+
+        Returns:
+            tuple: (invariata, validatori aggiornati, HTML scaricato o None)
+        """
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=REVALIDATE_TIMEOUT)
+        except requests.RequestException:
+            return False, {}, None
+
+        if response.status_code == 304:
+            return True, {}, None
+
+        if response.status_code != 200:
+            return False, {}, None
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash(response.content),
+        }
+        unchanged = bool(entry) and entry.get('content_hash') == validators['content_hash']
+        return unchanged, validators, response.text
+
+    def lookup(self, url):
+        """
+        Cerca i dettagli di un URL in cache.
+
+        In caso di miss restituisce anche l'HTML scaricato durante la
+        rivalidazione, così chi chiama può analizzarlo senza una seconda GET.
+
+        Returns:
+            tuple: (dettagli o None, validatori da passare a store(), HTML o None)
+        """
+        with self._lock:
+            entry = self.entries.get(url)
+
+        if entry and time.time() - entry.get('fetched_at', 0) < self.ttl:
+            self._count('hits')
+            return entry['details'], {}, None
+
+        unchanged, validators, html = self._revalidate(url, entry)
+
+        if entry and unchanged:
+            with self._lock:
+                entry['fetched_at'] = time.time()
+                entry.update({k: v for k, v in validators.items() if v})
+                self._dirty = True
+            self._count('revalidated')
+            return entry['details'], {}, None
+
+        self._count('misses')
+        return None, validators, html
+
+    def store(self, url, details, validators=None):
+        """Salva i dettagli estratti per un URL."""
+        entry = {
+            'details': details,
+            'fetched_at': time.time(),
+        }
+        entry.update({k: v for k, v in (validators or {}).items() if v})
+
+        with self._lock:
+            self.entries[url] = entry
+            self._dirty = True
+
+    def save(self):
+        """Scrive la cache su disco (solo se modificata)."""
+        with self._lock:
+            if not self._dirty:
+                return
+            _atomic_write_json(self.path, self.entries)
+            self._dirty = False
+
+    def summary(self):
+        """Riepilogo leggibile delle statistiche della cache."""
+        return "Cache pagine: {hits} hit, {revalidated} rivalidate, {misses} miss".format(**self.stats)
+
+
+class Checkpoint:
+    """
+    Frontiera del crawl del catalogo salvata su disco.
+
+    Contiene le pagine di elenco ancora da completare (in coda o con servizi
+    non ancora scritti) e quelle già completate. Viene riscritta in modo
+    atomico, al massimo una volta ogni `interval` secondi.
+    """
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_FILE, interval=2.0):
+        self.path = Path(path)
+        self.interval = interval
+        self._last_save = 0.0
+
+    def load(self):
+        """Legge il checkpoint, o None se assente/illeggibile."""
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def save(self, pending_pages, visited_pages, force=False):
+        """Salva la frontiera del crawl."""
+        now = time.monotonic()
+        if not force and now - self._last_save < self.interval:
+            return
+
+        _atomic_write_json(self.path, {
+            'pending_pages': list(pending_pages),
+            'visited_pages': sorted(visited_pages),
+            'updated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        self._last_save = now
+
+    def clear(self):
+        """Rimuove il checkpoint a crawl completato."""
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Estrazione dei dettagli di un servizio (requisiti, orari, costo).
+
+Le pagine vengono ridotte a una lista di nodi {tag, text} in ordine di
+documento, raccolta con una sola chiamata (page.evaluate nel browser,
+soup.select per l'HTML statico); la classificazione avviene poi in
+Python con un solo passaggio sui nodi.
+"""
+
+# Nodi candidati: blocchi di testo + eventuali contenitori orari
+NODE_SELECTOR = 'p, li, .orari, .hours'
+BLOCK_TAGS = ('p', 'li')
+
+# Raccoglie testo della pagina e nodi candidati in una sola chiamata al browser
+EXTRACT_NODES_JS = """
+(selector) => ({
+    text: document.body ? document.body.innerText : '',
+    nodes: Array.from(document.querySelectorAll(selector)).map(el => ({
+        tag: el.tagName.toLowerCase(),
+        text: (el.innerText || '').trim()
+    }))
+})
+"""
+
+REQUIREMENT_KEYWORDS = ['documento', 'carta', 'codice', 'certificato', 'identità']
+WEEKDAYS = ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì']
+MAX_REQUIREMENT_BLOCKS = 20  # Solo i primi blocchi contengono i requisiti
+
+
+def empty_details():
+    """Struttura vuota dei dettagli di un servizio."""
+    return {
+        'requirements': [],
+        'office_hours': '',
+        'cost': '',
+        'how_to': ''
+    }
+
+
+def classify_nodes(content, nodes):
+    """
+    Classifica i nodi di una pagina in requisiti, orari e costo.
+
+    Args:
+        content: Testo completo della pagina (per capire quali sezioni cercare)
+        nodes: Lista di dict {tag, text} in ordine di documento
+
+    Returns:
+        dict: Dettagli del servizio
+    """
+    details = empty_details()
+    content_lower = content.lower()
+
+    # Cerca solo le sezioni presenti nella pagina
+    want_requirements = 'documenti necessari' in content_lower or 'requisiti' in content_lower
+    want_hours = 'orari' in content_lower or 'apertura' in content_lower
+    want_cost = '€' in content or 'euro' in content_lower or 'costo' in content_lower
+
+    blocks = 0
+    for node in nodes:
+        text = node['text'].strip()
+        text_lower = text.lower()
+
+        if node['tag'] in BLOCK_TAGS:
+            # Requisiti: blocchi brevi con parole chiave sui documenti
+            if want_requirements and blocks < MAX_REQUIREMENT_BLOCKS and 10 < len(text) < 200:
+                if any(keyword in text_lower for keyword in REQUIREMENT_KEYWORDS):
+                    details['requirements'].append(text)
+            blocks += 1
+
+            # Costo: primo blocco con un importo
+            if want_cost and not details['cost'] and ('€' in text or 'euro' in text_lower):
+                details['cost'] = text
+
+        # Orari: primo nodo che nomina un giorno feriale
+        if want_hours and not details['office_hours']:
+            if any(day in text_lower for day in WEEKDAYS):
+                details['office_hours'] = text
+
+    return details
@@ -2,9 +2,20 @@
 """
 Genera file Markdown per knowledge base da services_data_real.json.
 Crea un file .md per ogni servizio in knowledge-base/
+
+Genera anche knowledge-base/services-index.json: per ogni servizio (slug
+del file) nome, ufficio, documenti necessari, orari, costo e link, letti
+dal tool get_service_info del server (server/service_index.py). I file
+Markdown scritti a mano vengono letti e inclusi nell'indice.
+
+Uso:
+  python scraper/generate_knowledge_base.py                           # services_data_real.json
+  python scraper/generate_knowledge_base.py services_data_real.jsonl  # output di --crawl
+  python scraper/generate_knowledge_base.py --index                   # solo indice, dai .md
 """
 
 import json
+import os
 from pathlib import Path
 import re
 
@@ -80,43 +91,143 @@ def generate_markdown(service):
 
     return markdown
 
-def generate_all_knowledge_base():
-    """Genera tutti i file knowledge base."""
-
-    # Leggi dati estratti
-    json_path = Path(__file__).parent / 'services_data_real.json'
-
-    if not json_path.exists():
-        print("❌ File services_data_real.json non trovato!")
-        print("\nEsegui prima:")
-        print("  python scraper/scrape_real.py")
-        return False
+def iter_services(json_path):
+    """
+    Legge i servizi da JSON (array) o JSONL (un servizio per riga).
 
+    Il formato JSONL viene letto in streaming, una riga alla volta.
+    """
     with open(json_path, 'r', encoding='utf-8') as f:
-        services = json.load(f)
-
-    print("="*60)
-    print("GENERAZIONE KNOWLEDGE BASE")
-    print("="*60)
-    print()
-    print(f"Servizi da processare: {len(services)}")
+        if json_path.suffix == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+KB_DIR = Path(__file__).parent.parent / 'knowledge-base'
+SERVICE_INDEX_FILE = 'services-index.json'
+MAX_DOCUMENTS = 10
+
+ITEM_RE = re.compile(r'^\s*(?:\d+\.|[-*])\s+(.+)$')
+FIELD_RE = re.compile(r'^\s*(?:[-*]\s+)?\*\*(.+?)\*\*:\s*(.*)$')
+EURO_RE = re.compile(r'€\s?\d+(?:[.,]\d+)?')
+URL_RE = re.compile(r'https?://\S+')
+
+def service_entry(service):
+    """Voce dell'indice servizi da un servizio estratto dallo scraper."""
+    return {
+        'name': service['service_name'],
+        'office': service.get('office') or None,
+        'documents': list(service.get('requirements', [])[:MAX_DOCUMENTS]),
+        'hours': service.get('office_hours') or None,
+        'cost': service.get('cost') or None,
+        'url': service.get('url') or None,
+    }
+
+def _plain(text):
+    """Toglie il markup Markdown inline (grassetto, link)."""
+    text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
+    return text.replace('**', '').strip()
+
+def parse_markdown_service(text):
+    """
+    Voce dell'indice servizi da un file Markdown della knowledge base.
+
+    Riconosce sia il formato generato da generate_markdown sia quello dei
+    file scritti a mano (**Ufficio**, **Orari** con sotto-elenco, ## Costi).
+    """
+    entry = {'name': None, 'office': None, 'documents': [], 'hours': None, 'cost': None, 'url': None}
+    section = ''
+    hours, costs = [], []
+
+    for line in text.splitlines():
+        if line.startswith('# ') and not entry['name']:
+            entry['name'] = line[2:].strip()
+            continue
+        if line.startswith('## '):
+            section = line[3:].strip().lower()
+            continue
+
+        field = FIELD_RE.match(line)
+        item = ITEM_RE.match(line)
+        if field:
+            key, value = field.group(1).lower(), _plain(field.group(2))
+            if key == 'ufficio':
+                entry['office'] = value
+            elif key.startswith('orari'):
+                if value:
+                    hours.append(value)
+                section = 'orari'
+            elif key == 'costo' and value:
+                costs.append(value)
+            elif key == 'link':
+                entry['url'] = value
+            elif section == 'costi':
+                costs.append(f"{field.group(1)}: {value}")
+        elif item and line.startswith((' ', '\t')) and section == 'orari':
+            hours.append(_plain(item.group(1)))
+        elif item and section.startswith('documenti'):
+            entry['documents'].append(_plain(item.group(1)))
+        elif item and section == 'costi':
+            costs.append(_plain(item.group(1)))
+        elif section == 'link utili' and not entry['url']:
+            url = URL_RE.search(line)
+            entry['url'] = url.group(0) if url else None
+
+    if not costs:
+        euro = EURO_RE.search(text)
+        costs = [euro.group(0)] if euro else []
+
+    entry['documents'] = entry['documents'][:MAX_DOCUMENTS]
+    entry['hours'] = ', '.join(hours) or None
+    entry['cost'] = '; '.join(costs) or None
+    return entry
+
+def write_service_index(entries=None, kb_dir=KB_DIR):
+    """
+    Scrive knowledge-base/services-index.json.
+
+    Args:
+        entries: slug → voce per i servizi appena generati; gli altri file
+            Markdown della knowledge base vengono letti e aggiunti
+
+    Returns:
+        Path: File scritto
+    """
+    entries = dict(entries or {})
+    for md_file in sorted(kb_dir.glob('*.md')):
+        if md_file.stem not in entries:
+            entries[md_file.stem] = parse_markdown_service(md_file.read_text(encoding='utf-8'))
+
+    index_path = kb_dir / SERVICE_INDEX_FILE
+    tmp_path = index_path.with_name(index_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'services': dict(sorted(entries.items()))}, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, index_path)
+    return index_path
+
+def clean_knowledge_base(kb_dir=KB_DIR):
+    """Rimuove i file Markdown esistenti dalla knowledge base."""
+    for old_file in kb_dir.glob('*.md'):
+        old_file.unlink()
+        print(f"✓ Rimosso: {old_file.name}")
     print()
 
-    # Crea directory knowledge-base se non esiste
-    kb_dir = Path(__file__).parent.parent / 'knowledge-base'
-    kb_dir.mkdir(exist_ok=True)
+def iter_generate(json_path, kb_dir=KB_DIR):
+    """
+    Genera i file Markdown uno alla volta.
 
-    # Pulisci vecchi file (opzionale)
-    cleanup = input("Vuoi pulire i file esistenti in knowledge-base/? [s/N]: ").lower()
-    if cleanup == 's':
-        for old_file in kb_dir.glob('*.md'):
-            old_file.unlink()
-            print(f"✓ Rimosso: {old_file.name}")
-        print()
+    Al termine scrive l'indice dei servizi (services-index.json).
 
-    # Genera file per ogni servizio
-    generated = 0
-    for service in services:
+    Yields:
+        Path: File appena scritto (utile per caricarlo subito, in pipeline)
+    """
+    kb_dir.mkdir(exist_ok=True)
+    entries = {}
+
+    for service in iter_services(json_path):
         title = service['service_name']
         slug = slugify(title)
 
@@ -131,8 +242,49 @@ def generate_all_knowledge_base():
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(markdown_content)
 
+        entries[slug] = service_entry(service)
         print(f"✓ Creato: {filename}")
-        generated += 1
+        yield filepath
+
+    index_path = write_service_index(entries, kb_dir)
+    print(f"✓ Indice servizi: {index_path.name}")
+
+def generate_all_knowledge_base(input_file='services_data_real.json', cleanup=None):
+    """
+    Genera tutti i file knowledge base.
+
+    Args:
+        input_file: File JSON/JSONL in scraper/
+        cleanup: Se True rimuove i file esistenti; None = chiedi all'utente
+    """
+
+    # Leggi dati estratti
+    json_path = Path(__file__).parent / input_file
+
+    if not json_path.exists():
+        print(f"❌ File {input_file} non trovato!")
+        print("\nEsegui prima:")
+        print("  python scraper/scrape_real.py")
+        return False
+
+    print("="*60)
+    print("GENERAZIONE KNOWLEDGE BASE")
+    print("="*60)
+    print()
+    print(f"Sorgente: {input_file}")
+    print()
+
+    # Crea directory knowledge-base se non esiste
+    KB_DIR.mkdir(exist_ok=True)
+
+    # Pulisci vecchi file (opzionale)
+    if cleanup is None:
+        cleanup = input("Vuoi pulire i file esistenti in knowledge-base/? [s/N]: ").lower() == 's'
+    if cleanup:
+        clean_knowledge_base()
+
+    # Genera file per ogni servizio
+    generated = sum(1 for _ in iter_generate(json_path))
 
     print()
     print("="*60)
@@ -141,11 +293,18 @@ def generate_all_knowledge_base():
     print(f"\n✓ {generated} file Markdown creati in knowledge-base/")
     print("\nProssimo step:")
     print("  python scripts/upload_knowledge_base.py")
-    print("  python scripts/link_knowledge_base.py")
 
     return True
 
 if __name__ == "__main__":
     import sys
-    success = generate_all_knowledge_base()
+    if len(sys.argv) > 1 and sys.argv[1] == '--index':
+        index_path = write_service_index()
+        with open(index_path, encoding='utf-8') as f:
+            print(f"✓ {len(json.load(f)['services'])} servizi in {index_path}")
+        sys.exit(0)
+    if len(sys.argv) > 1:
+        success = generate_all_knowledge_base(sys.argv[1])
+    else:
+        success = generate_all_knowledge_base()
     sys.exit(0 if success else 1)
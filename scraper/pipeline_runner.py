@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Esecutore in-process di pipeline a stadi con dipendenze (DAG).
+
+Ogni stadio è una funzione Python che riceve un contesto condiviso (dict)
+e restituisce True/False. Gli stadi partono appena le loro dipendenze sono
+completate, in parallelo su un pool di thread; se uno stadio fallisce,
+quelli che ne dipendono vengono saltati. Alla fine viene stampato il
+riepilogo con i tempi di ogni stadio.
+"""
+
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Stati di uno stadio
+OK = 'ok'
+FAILED = 'failed'
+SKIPPED = 'skipped'      # Saltato per dipendenza fallita
+DISABLED = 'disabled'    # Disabilitato da opzioni (conta come completato)
+
+STATUS_ICONS = {OK: '✅', FAILED: '❌', SKIPPED: '⏭️ ', DISABLED: '➖'}
+
+
+class Stage:
+    """Uno stadio della pipeline."""
+
+    def __init__(self, name, func, deps=(), description='', enabled=True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.description = description or name
+        self.enabled = enabled
+
+        self.status = None
+        self.started = None
+        self.elapsed = 0.0
+
+
+def _check_graph(stages):
+    """Verifica che le dipendenze esistano e che non ci siano cicli."""
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        missing = set(stage.deps) - names
+        if missing:
+            raise ValueError(f"Stadio '{stage.name}': dipendenze sconosciute {sorted(missing)}")
+
+    deps = {stage.name: set(stage.deps) for stage in stages}
+    resolved = set()
+    while deps:
+        ready = [name for name, d in deps.items() if d <= resolved]
+        if not ready:
+            raise ValueError(f"Ciclo tra gli stadi: {sorted(deps)}")
+        for name in ready:
+            resolved.add(name)
+            del deps[name]
+
+
+def _run_stage(stage, context):
+    """Esegue uno stadio e ne misura la durata."""
+    print(f"\n▶️  {stage.description}")
+    start = time.perf_counter()
+    try:
+        ok = bool(stage.func(context))
+    except Exception as e:
+        print(f"\n❌ Errore in '{stage.name}': {e}")
+        traceback.print_exc()
+        ok = False
+    stage.elapsed = time.perf_counter() - start
+
+    icon = '✅' if ok else '❌'
+    print(f"\n{icon} {stage.description} ({stage.elapsed:.1f}s)")
+    return ok
+
+
+def run_pipeline(stages, context=None, max_workers=4):
+    """
+    Esegue gli stadi rispettando le dipendenze, in parallelo dove possibile.
+
+    Args:
+        stages: Lista di Stage
+        context: Dict condiviso tra gli stadi
+        max_workers: Stadi eseguibili in contemporanea
+
+    Returns:
+        bool: True se nessuno stadio è fallito o è stato saltato
+    """
+    _check_graph(stages)
+    context = {} if context is None else context
+    by_name = {stage.name: stage for stage in stages}
+    pending = list(stages)
+    running = {}
+    pipeline_start = time.perf_counter()
+
+    def satisfied(stage):
+        return all(by_name[dep].status in (OK, DISABLED) for dep in stage.deps)
+
+    def blocked(stage):
+        return any(by_name[dep].status in (FAILED, SKIPPED) for dep in stage.deps)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if blocked(stage):
+                    stage.status = SKIPPED
+                    pending.remove(stage)
+                elif satisfied(stage):
+                    pending.remove(stage)
+                    if not stage.enabled:
+                        stage.status = DISABLED
+                        continue
+                    stage.started = time.perf_counter() - pipeline_start
+                    running[executor.submit(_run_stage, stage, context)] = stage
+
+            if not running:
+                # Solo stadi disabilitati/saltati in questo giro: ricontrolla
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                stage.status = OK if future.result() else FAILED
+
+    total = time.perf_counter() - pipeline_start
+    print_timings(stages, total)
+
+    return all(stage.status in (OK, DISABLED) for stage in stages)
+
+
+def print_timings(stages, total):
+    """Stampa il riepilogo tempi degli stadi."""
+    print("\n" + "=" * 60)
+    print("TEMPI PIPELINE")
+    print("=" * 60)
+    print(f"{'Stadio':<14} {'Stato':<10} {'Inizio':>8} {'Durata':>8}")
+    print("-" * 60)
+    for stage in stages:
+        icon = STATUS_ICONS.get(stage.status, '?')
+        started = f"{stage.started:.1f}s" if stage.started is not None else '-'
+        elapsed = f"{stage.elapsed:.1f}s" if stage.status in (OK, FAILED) else '-'
+        print(f"{stage.name:<14} {icon} {stage.status:<7} {started:>8} {elapsed:>8}")
+    print("-" * 60)
+    print(f"Totale: {total:.1f}s")
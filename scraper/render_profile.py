@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Profilo di rendering per le pagine Playwright dello scraper.
+
+Profilo "light" (default): blocca immagini, font, fogli di stile, media e
+script di analytics, che non servono per leggere il testo dei servizi.
+Profilo "full": carica tutto (utile per confronto o debug).
+
+In entrambi i casi vengono contate le richieste caricate/bloccate e i byte
+trasferiti (da Content-Length), così eseguendo lo stesso crawl con i due
+profili si misura quanto traffico viene risparmiato.
+
+Il risparmio è registrato anche per pagina: con il profilo light sono le
+richieste bloccate (una richiesta interrotta non ha dimensione), con il
+profilo full le richieste che il profilo light bloccherebbe e i loro byte.
+"""
+
+from collections import Counter
+from urllib.parse import urlparse
+
+PROFILES = ('light', 'full')
+DEFAULT_PROFILE = 'light'
+
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet', 'texttrack', 'eventsource'}
+
+BLOCKED_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'facebook.net',
+    'hotjar.com',
+    'matomo',
+    'cookiebot.com',
+    'iubenda.com',
+    'youtube.com',
+    'ytimg.com',
+)
+
+
+def should_block(resource_type, url):
+    """True se la richiesta non serve per leggere il contenuto della pagina."""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlparse(url).hostname or ''
+    return any(blocked in host for blocked in BLOCKED_HOSTS)
+
+
+class RenderStats:
+    """Richieste e byte di una o più pagine renderizzate."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, url=None):
+        """Azzera le statistiche (prima di renderizzare `url`)."""
+        self.url = url
+        self.pages = 0
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = Counter()
+        # Richieste e byte risparmiati dal profilo light: bloccati (light)
+        # o bloccabili (full, dove i byte sono misurabili)
+        self.saved_requests = 0
+        self.saved_bytes = 0
+        # URL → (richieste, byte, richieste risparmiate, byte risparmiati)
+        self.by_page = {}
+
+    def add(self, other):
+        """Somma le statistiche di una pagina renderizzata."""
+        self.pages += 1
+        self.requests += other.requests
+        self.bytes += other.bytes
+        self.blocked.update(other.blocked)
+        self.saved_requests += other.saved_requests
+        self.saved_bytes += other.saved_bytes
+        if other.url:
+            self.by_page[other.url] = (other.requests, other.bytes, other.saved_requests, other.saved_bytes)
+
+    def summary(self):
+        """Riepilogo leggibile."""
+        blocked = sum(self.blocked.values())
+        text = f"{self.requests} richieste, {self.bytes / 1024:.0f} KB"
+        if blocked:
+            detail = ", ".join(f"{kind} {count}" for kind, count in self.blocked.most_common())
+            text += f", {blocked} bloccate ({detail})"
+        elif self.saved_requests:
+            text += f", {self.saved_requests} bloccabili ({self.saved_bytes / 1024:.0f} KB)"
+        return text
+
+    def page_report(self, limit=10):
+        """Righe di riepilogo per pagina, dalle `limit` con più richieste risparmiate."""
+        pages = sorted(self.by_page.items(), key=lambda item: (-item[1][2], -item[1][3], item[0]))
+        lines = []
+        for url, (requests, size, saved_requests, saved_bytes) in pages[:limit]:
+            saved = f"-{saved_requests} richieste"
+            if saved_bytes:
+                saved += f", -{saved_bytes / 1024:.0f} KB"
+            lines.append(f"{url[:60]:<60}  {requests:>4} rich. {size / 1024:>6.0f} KB  ({saved})")
+        return lines
+
+
+async def apply_render_profile(page, profile=DEFAULT_PROFILE):
+    """
+    Applica il profilo di rendering a una pagina Playwright (async).
+
+    Returns:
+        RenderStats: Statistiche della pagina, da azzerare (reset(url))
+            prima di ogni navigazione se la pagina viene riutilizzata
+    """
+    stats = RenderStats()
+
+    def on_response(response):
+        stats.requests += 1
+        length = response.headers.get('content-length')
+        size = int(length) if length and length.isdigit() else 0
+        stats.bytes += size
+        if profile != 'light' and should_block(response.request.resource_type, response.url):
+            stats.saved_requests += 1
+            stats.saved_bytes += size
+
+    page.on('response', on_response)
+
+    if profile == 'light':
+        async def handle_route(route):
+            request = route.request
+            if should_block(request.resource_type, request.url):
+                stats.blocked[request.resource_type] += 1
+                stats.saved_requests += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route('**/*', handle_route)
+
+    return stats
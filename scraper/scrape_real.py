@@ -4,14 +4,25 @@ Scraper REALE per estrarre servizi dal sito del Comune di Codroipo.
 Usa Playwright per gestire JavaScript rendering (Angular SPA).
 """
 
+import argparse
+import asyncio
 import json
 import sys
+import time
+from collections import Counter, deque
+from contextlib import aclosing
 from pathlib import Path
 from datetime import datetime
 
+from extraction import EXTRACT_NODES_JS, NODE_SELECTOR, classify_nodes
+from crawl_state import Checkpoint, PageCache, DEFAULT_TTL_HOURS
+from static_fetch import TieredFetcher, create_session
+from render_profile import DEFAULT_PROFILE, PROFILES, RenderStats, apply_render_profile
+
 # Prova a importare playwright
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.async_api import async_playwright
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
@@ -21,8 +32,197 @@ except ImportError:
     print("  playwright install chromium")
     print()
 
-def scrape_services_with_playwright():
-    """Scrape servizi usando Playwright."""
+# Parametri di default per l'estrazione dettagli
+DEFAULT_CONCURRENCY = 4        # Pagine caricate in parallelo
+DEFAULT_PAGE_TIMEOUT = 15000   # Budget per pagina (ms)
+LISTING_READY_TIMEOUT = 10000  # Attesa massima delle card nel catalogo (ms)
+
+# Contenuto che indica una pagina di dettaglio già renderizzata da Angular
+DETAIL_READY_SELECTOR = 'main p, main li, article p, .content p'
+
+# Richieste e byte di tutte le pagine renderizzate nell'esecuzione
+render_totals = RenderStats()
+
+# Catalogo servizi
+BASE_URL = "https://www.comune.codroipo.ud.it"
+CATALOGUE_URL = f"{BASE_URL}/it/servizi-224003"
+
+# Selettori catalogo (card servizio e link di paginazione)
+SERVICE_SELECTOR = 'article, .service-card, .servizio, .card'
+PAGINATION_SELECTOR = (
+    'a[rel="next"], .pagination a, .pager a, '
+    'nav[aria-label*="pagin" i] a, a.page-link'
+)
+
+# Estrae tutte le card del catalogo con una sola chiamata al browser
+EXTRACT_CARDS_JS = """
+(selector) => Array.from(document.querySelectorAll(selector)).map(el => {
+    const title = el.querySelector('h1, h2, h3, .title, .titolo');
+    const desc = el.querySelector('p, .description, .descrizione');
+    const link = el.querySelector('a');
+    return {
+        title: title ? title.innerText.trim() : '',
+        description: desc ? desc.innerText.trim() : '',
+        url: link ? link.href : ''
+    };
+})
+"""
+
+EXTRACT_LINKS_JS = """
+(selector) => Array.from(document.querySelectorAll(selector)).map(a => a.href)
+"""
+
+def _normalize_url(url):
+    """Rimuove frammento e slash finale per confrontare gli URL."""
+    url, _, _ = url.partition('#')
+    return url.rstrip('/')
+
+def _is_catalogue_url(url):
+    """True se l'URL appartiene al catalogo servizi del Comune."""
+    return _normalize_url(url).startswith(CATALOGUE_URL)
+
+def _is_category_url(url):
+    """True se l'URL è una pagina di categoria (figlio diretto del catalogo)."""
+    url = _normalize_url(url)
+    if not url.startswith(CATALOGUE_URL + '/'):
+        return False
+    return '/' not in url[len(CATALOGUE_URL) + 1:]
+
+def _build_service(card, idx):
+    """Costruisce il record servizio a partire da una card del catalogo."""
+    title = card['title'] or f"Servizio {idx}"
+    if len(title) <= 3:
+        return None
+
+    description = card['description']
+
+    return {
+        'service_name': title,
+        'description': description[:500] if description else f"Servizio {title} del Comune di Codroipo",
+        'url': card['url'],
+        'office_hours': 'Lunedì-Venerdì: 8:30-12:30',  # Default generico
+        'requirements': [],  # Da completare manualmente
+        'qa_pairs': []  # Generati dopo
+    }
+
+def new_crawl_state(start_url=CATALOGUE_URL):
+    """Stato iniziale del crawl: coda pagine, pagine visitate, pagina corrente."""
+    return {'queue': deque([start_url]), 'visited': set(), 'current': None}
+
+async def iter_catalogue_services(page, start_url=CATALOGUE_URL, max_pages=None, follow_categories=True,
+                                  state=None, render_stats=None):
+    """
+    Percorre il catalogo servizi e restituisce i servizi uno alla volta.
+
+    Segue i link di paginazione e, se `follow_categories` è attivo, le
+    pagine di categoria interne al catalogo. Ogni servizio viene prodotto
+    appena estratto, senza accumulare l'intero catalogo in memoria.
+
+    Args:
+        page: Pagina Playwright (async) usata per le pagine di elenco
+        start_url: Pagina iniziale del catalogo
+        max_pages: Numero massimo di pagine di elenco da visitare
+        follow_categories: Visita anche le sottopagine di categoria
+        state: Stato del crawl (vedi new_crawl_state), aggiornato durante
+            la visita; permette di salvare e riprendere la frontiera
+        render_stats: RenderStats della pagina (vedi apply_render_profile)
+
+    Yields:
+        dict: Record servizio
+    """
+    if state is None:
+        state = new_crawl_state(start_url)
+    queue = state['queue']
+    visited = state['visited']
+    seen_services = set()
+    idx = 0
+
+    while queue:
+        if max_pages and len(visited) >= max_pages:
+            break
+
+        url = queue.popleft()
+        key = _normalize_url(url)
+        if key in visited:
+            continue
+        visited.add(key)
+        state['current'] = url
+
+        print(f"\nPagina catalogo {len(visited)}: {url}")
+
+        if render_stats is not None:
+            render_stats.reset(url)
+
+        try:
+            await page.goto(url, wait_until='domcontentloaded')
+            # Attendi che Angular renderizzi le card (non tutta la rete)
+            await page.wait_for_selector(SERVICE_SELECTOR, timeout=LISTING_READY_TIMEOUT)
+        except Exception as e:
+            print(f"  ⚠️  Nessun servizio trovato: {e}")
+            continue
+
+        cards = await page.evaluate(EXTRACT_CARDS_JS, SERVICE_SELECTOR)
+        pagination = await page.evaluate(EXTRACT_LINKS_JS, PAGINATION_SELECTOR)
+
+        print(f"  Trovati {len(cards)} elementi potenziali")
+        if render_stats is not None:
+            print(f"  ⚡ {render_stats.summary()}")
+            render_totals.add(render_stats)
+
+        for card in cards:
+            service_key = _normalize_url(card['url']) if card['url'] else card['title']
+            if service_key in seen_services:
+                continue
+            seen_services.add(service_key)
+
+            idx += 1
+            service = _build_service(card, idx)
+            if service:
+                yield service
+
+            # Le card di categoria rimandano ad altri elenchi di servizi
+            if follow_categories and card['url'] and _is_category_url(card['url']):
+                queue.append(card['url'])
+
+        # Le pagine successive del catalogo hanno la precedenza sulle categorie
+        next_pages = [
+            link for link in pagination
+            if _is_catalogue_url(link) and _normalize_url(link) not in visited
+        ]
+        queue.extendleft(reversed(next_pages))
+
+async def _collect_services(max_services=None, max_pages=1, profile=DEFAULT_PROFILE):
+    """Raccoglie i servizi del catalogo in una lista."""
+    services = []
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        render_stats = await apply_render_profile(page, profile)
+
+        crawl = iter_catalogue_services(
+            page, max_pages=max_pages, follow_categories=max_pages != 1, render_stats=render_stats
+        )
+        async with aclosing(crawl):
+            async for service in crawl:
+                services.append(service)
+                print(f"✓ {len(services)}. {service['service_name'][:50]}...")
+                if max_services and len(services) >= max_services:
+                    break
+
+        await browser.close()
+
+    return services
+
+def scrape_services_with_playwright(max_services=None, max_pages=1, profile=DEFAULT_PROFILE):
+    """
+    Scrape servizi usando Playwright.
+
+    Args:
+        max_services: Numero massimo di servizi (None = tutti)
+        max_pages: Pagine di elenco da visitare (None = tutto il catalogo)
+        profile: Profilo di rendering ('light' o 'full')
+    """
 
     if not PLAYWRIGHT_AVAILABLE:
         print("ERRORE: Playwright richiesto ma non installato")
@@ -33,133 +233,201 @@ def scrape_services_with_playwright():
     print("="*60)
     print()
 
-    url = "https://www.comune.codroipo.ud.it/it/servizi-224003"
-
-    print(f"URL: {url}")
+    print(f"URL: {CATALOGUE_URL}")
     print("Avvio browser headless...")
-    print()
 
-    services = []
+    services = asyncio.run(_collect_services(max_services, max_pages, profile))
 
-    with sync_playwright() as p:
-        # Avvia browser
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    print()
+    print(f"OK Estratti {len(services)} servizi")
+    return services
 
-        print("Caricamento pagina...")
-        page.goto(url, wait_until='networkidle')
+async def _extract_details(page):
+    """
+    Estrae requisiti, orari e costo da una pagina di dettaglio già caricata.
+
+    Testo e nodi candidati arrivano con un solo page.evaluate; la
+    classificazione avviene in Python (extraction.classify_nodes).
+    """
+    data = await page.evaluate(EXTRACT_NODES_JS, NODE_SELECTOR)
+    return classify_nodes(data['text'], data['nodes'])
+
+async def _load_and_extract(page, url, timeout_ms):
+    """
+    Carica una pagina di dettaglio ed estrae i dati.
+
+    Invece di attendere `networkidle` si aspetta il primo blocco di
+    contenuto; se non compare entro il budget si estrae comunque ciò che c'è.
+    """
+    await page.goto(url, wait_until='domcontentloaded', timeout=timeout_ms)
+    try:
+        await page.wait_for_selector(DETAIL_READY_SELECTOR, timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        pass
+    return await _extract_details(page)
+
+async def _open_page_pool(context, size, profile=DEFAULT_PROFILE):
+    """
+    Crea un pool di `size` pagine riutilizzabili nello stesso contesto.
+
+    Ogni elemento è una coppia (pagina, RenderStats).
+    """
+    pool = asyncio.Queue()
+    for _ in range(max(1, size)):
+        page = await context.new_page()
+        pool.put_nowait((page, await apply_render_profile(page, profile)))
+    return pool
+
+async def _scrape_detail_from_pool(pool, url, timeout_ms, fetcher=None, validators=None):
+    """
+    Prende una pagina libera dal pool, estrae i dettagli e la restituisce.
+
+    Il timeout è un budget complessivo per pagina (navigazione + estrazione):
+    una pagina lenta non blocca le altre.
+    """
+    page, render_stats = await pool.get()
+    render_stats.reset(url)
+    details = None
+    try:
+        details = await asyncio.wait_for(
+            _load_and_extract(page, url, timeout_ms),
+            timeout=timeout_ms / 1000
+        )
+        print(f"  ⚡ {url[:50]}... {render_stats.summary()}")
+        return details
+    except asyncio.TimeoutError:
+        print(f"  ⚠️  Timeout ({timeout_ms} ms): {url[:60]}...")
+        return None
+    except Exception as e:
+        print(f"  ⚠️  Errore: {url[:60]}... {e}")
+        return None
+    finally:
+        render_totals.add(render_stats)
+        pool.put_nowait((page, render_stats))
+        if fetcher is not None:
+            fetcher.store(url, details, validators)
+
+async def _fetch_without_browser(fetcher, urls, concurrency):
+    """
+    Risolve in parallelo gli URL che non richiedono il browser
+    (cache o HTML statico).
+
+    Returns:
+        tuple: (dettagli per URL risolto, validatori per gli URL da renderizzare)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    resolved, validators = {}, {}
+
+    async def fetch(url):
+        async with semaphore:
+            details, url_validators = await asyncio.to_thread(fetcher.fetch, url)
+        if details is not None:
+            resolved[url] = details
+        else:
+            validators[url] = url_validators
+
+    await asyncio.gather(*(fetch(url) for url in urls))
+    return resolved, validators
+
+async def scrape_service_details(urls, concurrency=DEFAULT_CONCURRENCY, timeout_ms=DEFAULT_PAGE_TIMEOUT,
+                                 fetcher=None, profile=DEFAULT_PROFILE):
+    """
+    Scrape dei dettagli di più servizi in parallelo.
+
+    Usa un solo browser e un solo contesto; le pagine sono riutilizzate
+    tramite un pool limitato a `concurrency` elementi. Con un `fetcher`,
+    le pagine in cache o leggibili dall'HTML statico non passano dal
+    browser, che viene avviato solo se resta qualcosa da renderizzare.
+
+    Args:
+        urls: Lista di URL delle pagine di dettaglio
+        concurrency: Numero massimo di pagine caricate in contemporanea
+        timeout_ms: Budget di tempo per ogni pagina (millisecondi)
+        fetcher: TieredFetcher opzionale (cache + HTML statico)
+        profile: Profilo di rendering ('light' o 'full')
+
+    Returns:
+        dict: URL -> dettagli (None se l'estrazione è fallita)
+    """
+    if not urls:
+        return {}
+
+    results = {}
+    validators = {}
+
+    if fetcher is not None:
+        results, validators = await _fetch_without_browser(fetcher, urls, concurrency)
+        if results:
+            print(f"  ✓ {len(results)}/{len(urls)} pagine risolte senza browser")
+        urls = [url for url in urls if url not in results]
+        if not urls:
+            return results
 
-        # Attendi che Angular carichi il contenuto
-        print("Attendo rendering Angular...")
-        page.wait_for_selector('.service-card, .servizio, article, .card', timeout=10000)
+    if not PLAYWRIGHT_AVAILABLE:
+        return results
 
-        # Estrai servizi
-        print("Estrazione servizi...")
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        context.set_default_timeout(timeout_ms)
 
-        # Strategia: cerca vari selettori comuni per servizi
-        service_elements = page.query_selector_all('article, .service-card, .servizio, .card')
+        pool = await _open_page_pool(context, min(concurrency, len(urls)), profile)
+        done = 0
 
-        print(f"Trovati {len(service_elements)} elementi potenziali")
-        print()
+        async def worker(url):
+            nonlocal done
+            results[url] = await _scrape_detail_from_pool(
+                pool, url, timeout_ms, fetcher, validators.get(url)
+            )
+            done += 1
+            status = "✓" if results[url] else "✗"
+            print(f"  {status} [{done}/{len(urls)}] {url[:60]}...")
 
-        for idx, element in enumerate(service_elements[:10], 1):  # Max 10 servizi
-            try:
-                # Estrai titolo
-                title_elem = element.query_selector('h1, h2, h3, .title, .titolo')
-                title = title_elem.inner_text().strip() if title_elem else f"Servizio {idx}"
-
-                # Estrai descrizione
-                desc_elem = element.query_selector('p, .description, .descrizione')
-                description = desc_elem.inner_text().strip() if desc_elem else ""
-
-                # Estrai link
-                link_elem = element.query_selector('a')
-                service_url = link_elem.get_attribute('href') if link_elem else ""
-                if service_url and not service_url.startswith('http'):
-                    service_url = f"https://www.comune.codroipo.ud.it{service_url}"
-
-                # Se abbiamo dati validi, aggiungi
-                if title and len(title) > 3:
-                    service = {
-                        'service_name': title,
-                        'description': description[:500] if description else f"Servizio {title} del Comune di Codroipo",
-                        'url': service_url,
-                        'office_hours': 'Lunedì-Venerdì: 8:30-12:30',  # Default generico
-                        'requirements': [],  # Da completare manualmente
-                        'qa_pairs': []  # Generati dopo
-                    }
-
-                    services.append(service)
-                    print(f"✓ {idx}. {title[:50]}...")
-
-            except Exception as e:
-                print(f"✗ Errore elemento {idx}: {e}")
-                continue
+        await asyncio.gather(*(worker(url) for url in urls))
 
-        browser.close()
+        await browser.close()
 
-    print()
-    print(f"OK Estratti {len(services)} servizi")
-    return services
+    return results
 
-def scrape_service_detail(url):
+def scrape_service_detail(url, timeout_ms=DEFAULT_PAGE_TIMEOUT, fetcher=None):
     """Scrape dettagli di un singolo servizio."""
 
-    if not PLAYWRIGHT_AVAILABLE:
+    if not PLAYWRIGHT_AVAILABLE and fetcher is None:
         return None
 
     print(f"\nEstrazione dettagli da: {url[:60]}...")
 
-    details = {
-        'requirements': [],
-        'office_hours': '',
-        'cost': '',
-        'how_to': ''
-    }
+    results = asyncio.run(scrape_service_details([url], concurrency=1, timeout_ms=timeout_ms, fetcher=fetcher))
+    return results.get(url)
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+def apply_details(service, details):
+    """Applica i dettagli estratti al servizio."""
+    service['requirements'] = details.get('requirements', [])[:5]
+    if details.get('office_hours'):
+        service['office_hours'] = details['office_hours']
+    if details.get('cost'):
+        service['cost'] = details['cost']
 
-        try:
-            page.goto(url, wait_until='networkidle', timeout=15000)
-            page.wait_for_timeout(2000)  # Attendi caricamento completo
-
-            # Estrai tutto il testo della pagina
-            content = page.inner_text('body')
-
-            # Cerca sezioni comuni
-            if 'documenti necessari' in content.lower() or 'requisiti' in content.lower():
-                # Trova paragrafi dopo "documenti" o "requisiti"
-                paragraphs = page.query_selector_all('p, li')
-                for p in paragraphs[:20]:
-                    text = p.inner_text().strip()
-                    if len(text) > 10 and len(text) < 200:
-                        if any(keyword in text.lower() for keyword in ['documento', 'carta', 'codice', 'certificato', 'identità']):
-                            details['requirements'].append(text)
-
-            # Cerca orari
-            if 'orari' in content.lower() or 'apertura' in content.lower():
-                for p in page.query_selector_all('p, li, .orari, .hours'):
-                    text = p.inner_text().strip()
-                    if any(day in text.lower() for day in ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì']):
-                        details['office_hours'] = text
-                        break
-
-            # Cerca costo
-            if '€' in content or 'euro' in content.lower() or 'costo' in content.lower():
-                for p in page.query_selector_all('p, li'):
-                    text = p.inner_text().strip()
-                    if '€' in text or 'euro' in text.lower():
-                        details['cost'] = text
-                        break
+def enrich_services(services, concurrency=DEFAULT_CONCURRENCY, timeout_ms=DEFAULT_PAGE_TIMEOUT, fetcher=None,
+                    profile=DEFAULT_PROFILE):
+    """Arricchisce tutti i servizi con i dettagli delle rispettive pagine."""
 
-        except Exception as e:
-            print(f"  ⚠️  Errore: {e}")
+    urls = list(dict.fromkeys(s['url'] for s in services if s.get('url')))
+    print(f"\nEstrazione dettagli da {len(urls)} pagine ({concurrency} in parallelo)...")
 
-        browser.close()
+    start = time.perf_counter()
+    results = asyncio.run(scrape_service_details(urls, concurrency, timeout_ms, fetcher, profile))
+    elapsed = time.perf_counter() - start
 
-    return details
+    enriched = 0
+    for service in services:
+        details = results.get(service.get('url'))
+        if details:
+            apply_details(service, details)
+            enriched += 1
+
+    print(f"\n✓ {enriched}/{len(services)} servizi arricchiti in {elapsed:.1f}s")
+    return enriched
 
 def generate_qa_pairs(service):
     """Genera Q&A pairs basate sul servizio."""
@@ -202,8 +470,303 @@ def save_to_json(services, output_file):
 
     print(f"\n✓ Dati salvati in: {output_path}")
 
-def main():
-    """Main."""
+def load_jsonl_urls(output_path):
+    """URL dei servizi già presenti in un file JSONL (per la ripresa)."""
+    urls = set()
+    if not output_path.exists():
+        return urls
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Riga troncata da un'interruzione
+            if record.get('url'):
+                urls.add(_normalize_url(record['url']))
+
+    return urls
+
+def append_jsonl(f, record):
+    """Scrive un record JSONL e lo rende subito persistente."""
+    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    f.flush()
+
+async def _crawl_worker(queue, pool, f, timeout_ms, stats, fetcher=None, on_done=None):
+    """Completa i servizi in coda (dettagli + Q&A) e li scrive su disco."""
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        source_page, service = item
+
+        if pool is not None and service.get('url'):
+            details, validators = None, None
+            if fetcher is not None:
+                details, validators = await asyncio.to_thread(fetcher.fetch, service['url'])
+            if details is None:
+                details = await _scrape_detail_from_pool(
+                    pool, service['url'], timeout_ms, fetcher, validators
+                )
+            if details:
+                apply_details(service, details)
+                stats['enriched'] += 1
+
+        service['qa_pairs'] = generate_qa_pairs(service)
+        append_jsonl(f, service)
+        stats['written'] += 1
+        print(f"✓ {stats['written']}. {service['service_name'][:50]}...")
+
+        if on_done:
+            on_done(source_page)
+
+async def crawl_catalogue(output_file, details=True, concurrency=DEFAULT_CONCURRENCY,
+                          timeout_ms=DEFAULT_PAGE_TIMEOUT, resume=False, max_pages=None,
+                          max_services=None, fetcher=None, checkpoint=None, profile=DEFAULT_PROFILE):
+    """
+    Crawl completo del catalogo con scrittura in streaming su JSONL.
+
+    I servizi passano dalla pagina di elenco ai worker tramite una coda
+    limitata: la memoria usata non dipende dalla dimensione del catalogo.
+    Ogni record è scritto appena completato, quindi con `resume` un crawl
+    interrotto riparte saltando i servizi già presenti nel file. Se c'è un
+    `checkpoint`, la ripresa parte anche dalla frontiera salvata invece che
+    dalla prima pagina del catalogo.
+
+    Returns:
+        dict: Statistiche (written, enriched, skipped)
+    """
+    output_path = Path(__file__).parent / output_file
+    done_urls = load_jsonl_urls(output_path) if resume else set()
+    if done_urls:
+        print(f"↻ Ripresa: {len(done_urls)} servizi già presenti in {output_file}")
+
+    stats = {'written': 0, 'enriched': 0, 'skipped': 0}
+
+    # Frontiera del crawl (eventualmente ripresa dal checkpoint)
+    state = new_crawl_state()
+    if checkpoint is not None:
+        saved = checkpoint.load() if resume else None
+        if saved and saved.get('pending_pages'):
+            state['queue'] = deque(saved['pending_pages'])
+            state['visited'] = set(saved['visited_pages'])
+            print(f"↻ Checkpoint: {len(state['queue'])} pagine di elenco da completare")
+
+    # Servizi in coda non ancora scritti, per pagina di elenco
+    outstanding = Counter()
+
+    def save_checkpoint(force=False):
+        if checkpoint is None:
+            return
+        pending = [page for page, count in outstanding.items() if count > 0]
+        if state['current'] and state['current'] not in pending:
+            pending.append(state['current'])
+        pending.extend(page for page in state['queue'] if page not in pending)
+        visited = state['visited'] - {_normalize_url(page) for page in pending}
+        checkpoint.save(pending, visited, force=force)
+
+    def on_done(source_page):
+        outstanding[source_page] -= 1
+        save_checkpoint()
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        context.set_default_timeout(timeout_ms)
+
+        listing_page = await context.new_page()
+        listing_stats = await apply_render_profile(listing_page, profile)
+        pool = await _open_page_pool(context, concurrency, profile) if details else None
+        queue = asyncio.Queue(maxsize=concurrency * 2)
+
+        with open(output_path, 'a' if resume else 'w', encoding='utf-8') as f:
+            workers = [
+                asyncio.create_task(_crawl_worker(queue, pool, f, timeout_ms, stats, fetcher, on_done))
+                for _ in range(concurrency)
+            ]
+
+            crawl = iter_catalogue_services(
+                listing_page, max_pages=max_pages, state=state, render_stats=listing_stats
+            )
+            queued = 0
+            try:
+                async with aclosing(crawl):
+                    async for service in crawl:
+                        if service['url'] and _normalize_url(service['url']) in done_urls:
+                            stats['skipped'] += 1
+                            continue
+                        outstanding[state['current']] += 1
+                        await queue.put((state['current'], service))
+                        queued += 1
+                        if max_services and queued >= max_services:
+                            break
+
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                save_checkpoint(force=True)
+                if fetcher is not None:
+                    fetcher.save()
+
+        await browser.close()
+
+    # Crawl completato: il checkpoint non serve più
+    if checkpoint is not None and not max_services and not max_pages:
+        checkpoint.clear()
+
+    print(f"\n✓ Dati salvati in: {output_path}")
+    return stats
+
+def parse_args(argv=None):
+    """Argomenti da linea di comando."""
+    parser = argparse.ArgumentParser(
+        description='Scraping servizi dal sito del Comune di Codroipo'
+    )
+
+    details_group = parser.add_mutually_exclusive_group()
+    details_group.add_argument(
+        '--details',
+        action='store_true',
+        help='Estrai i dettagli di ogni servizio senza chiedere conferma'
+    )
+    details_group.add_argument(
+        '--no-details',
+        action='store_true',
+        help='Salta l\'estrazione dei dettagli senza chiedere conferma'
+    )
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Pagine di dettaglio caricate in parallelo (default: {DEFAULT_CONCURRENCY})'
+    )
+
+    parser.add_argument(
+        '--page-timeout',
+        type=int,
+        default=DEFAULT_PAGE_TIMEOUT,
+        help=f'Budget di tempo per pagina in ms (default: {DEFAULT_PAGE_TIMEOUT})'
+    )
+
+    parser.add_argument(
+        '--crawl',
+        action='store_true',
+        help='Crawl completo del catalogo (paginazione + categorie) con output JSONL in streaming'
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Con --crawl: riprende un crawl interrotto saltando i servizi già salvati'
+    )
+
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        help='Numero massimo di pagine di elenco da visitare (default: 1, tutte con --crawl)'
+    )
+
+    parser.add_argument(
+        '--max-services',
+        type=int,
+        help='Numero massimo di servizi da estrarre (default: tutti)'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Ignora la cache delle pagine e renderizza tutto da zero'
+    )
+
+    parser.add_argument(
+        '--no-static',
+        action='store_true',
+        help='Usa sempre il browser, senza tentare prima l\'HTML statico'
+    )
+
+    parser.add_argument(
+        '--render-profile',
+        choices=PROFILES,
+        default=DEFAULT_PROFILE,
+        help='light: blocca immagini/font/CSS/analytics; full: carica tutto (default: light)'
+    )
+
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=DEFAULT_TTL_HOURS,
+        help=f'Ore di validità della cache prima della rivalidazione (default: {DEFAULT_TTL_HOURS})'
+    )
+
+    return parser.parse_args(argv)
+
+def build_fetcher(args):
+    """Fetcher a livelli (cache + HTML statico) secondo gli argomenti."""
+    session = create_session(pool_size=max(args.concurrency, 10))
+    cache = None if args.no_cache else PageCache(ttl_hours=args.cache_ttl, session=session)
+    return TieredFetcher(cache=cache, session=session, static=not args.no_static)
+
+def ask_details(args):
+    """Decide se estrarre i dettagli (da argomenti o chiedendo all'utente)."""
+    if args.details:
+        return True
+    if args.no_details:
+        return False
+    return input("\nVuoi estrarre dettagli da ogni servizio? [s/N]: ").lower() == 's'
+
+def print_render_summary(profile):
+    """Totali del rendering e risparmio per pagina."""
+    print(f"✓ Rendering ({profile}): {render_totals.pages} pagine, {render_totals.summary()}")
+    for line in render_totals.page_report():
+        print(f"    {line}")
+
+def run_crawl(args):
+    """Crawl completo del catalogo in streaming su services_data_real.jsonl."""
+
+    print("="*60)
+    print("CRAWL CATALOGO SERVIZI - Comune di Codroipo")
+    print("="*60)
+
+    details = ask_details(args)
+    fetcher = build_fetcher(args)
+
+    start = time.perf_counter()
+    stats = asyncio.run(crawl_catalogue(
+        'services_data_real.jsonl',
+        details=details,
+        concurrency=args.concurrency,
+        timeout_ms=args.page_timeout,
+        resume=args.resume,
+        max_pages=args.max_pages,
+        max_services=args.max_services,
+        fetcher=fetcher,
+        checkpoint=Checkpoint(),
+        profile=args.render_profile
+    ))
+    elapsed = time.perf_counter() - start
+
+    print("\n" + "="*60)
+    print("CRAWL COMPLETATO!")
+    print("="*60)
+    print(f"\n✓ {stats['written']} servizi salvati in {elapsed:.1f}s")
+    if details:
+        print(f"✓ {stats['enriched']} servizi arricchiti con i dettagli")
+    if stats['skipped']:
+        print(f"↻ {stats['skipped']} servizi già presenti (saltati)")
+    if details:
+        print(f"✓ {fetcher.summary()}")
+    print_render_summary(args.render_profile)
+    print("\nProssimo step:")
+    print("  python scraper/generate_knowledge_base.py services_data_real.jsonl")
+
+    return True
+
+def main(argv=None):
+    """Main (argv permette di richiamarlo in-process, es. dalla pipeline)."""
+
+    args = parse_args(argv)
 
     if not PLAYWRIGHT_AVAILABLE:
         print("\n❌ Impossibile continuare senza Playwright")
@@ -213,27 +776,28 @@ def main():
         print("  3. Riesegui: python scraper/scrape_real.py")
         return False
 
+    if args.crawl:
+        return run_crawl(args)
+
     # Scrape servizi principali
-    services = scrape_services_with_playwright()
+    services = scrape_services_with_playwright(
+        max_services=args.max_services,
+        max_pages=args.max_pages or 1,
+        profile=args.render_profile
+    )
 
     if not services:
         print("\n❌ Nessun servizio estratto")
         return False
 
-    # Arricchisci con dettagli (opzionale - può essere lento)
-    enrich = input("\nVuoi estrarre dettagli da ogni servizio? (lento, 1-2min) [s/N]: ").lower()
-
-    if enrich == 's':
-        print("\nEstrazione dettagli...")
-        for service in services[:5]:  # Max 5 per non essere troppo lento
-            if service.get('url'):
-                details = scrape_service_detail(service['url'])
-                if details:
-                    service['requirements'] = details.get('requirements', [])[:5]
-                    if details.get('office_hours'):
-                        service['office_hours'] = details['office_hours']
-                    if details.get('cost'):
-                        service['cost'] = details['cost']
+    # Arricchisci con dettagli (opzionale)
+    if ask_details(args):
+        fetcher = build_fetcher(args)
+        enrich_services(services, args.concurrency, args.page_timeout, fetcher, args.render_profile)
+        fetcher.save()
+        print(f"✓ {fetcher.summary()}")
+
+    print_render_summary(args.render_profile)
 
     # Genera Q&A pairs
     print("\nGenerazione Q&A pairs...")
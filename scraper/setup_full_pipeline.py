@@ -8,30 +8,37 @@ Workflow completo:
 3. Upload file su Vapi.ai
 4. Collegamento knowledge base all'assistente
 
-Tutto automatico in un unico comando!
+Tutto automatico in un unico comando, in-process e senza prompt
+(eseguibile da cron). Gli stadi sono un DAG: validazione e generazione
+partono insieme dopo lo scraping, e ogni file Markdown viene caricato
+mentre si genera il successivo.
 """
 
-import subprocess
+import argparse
+import importlib.util
+import queue
 import sys
 from pathlib import Path
 
-def run_command(cmd, description):
-    """Esegue comando e mostra output."""
-    print("\n" + "="*60)
-    print(f"⚙️  {description}")
-    print("="*60)
-    print()
+from pipeline_runner import Stage, run_pipeline
 
-    result = subprocess.run(cmd, shell=True)
+ROOT_DIR = Path(__file__).parent.parent
+SCRAPER_DIR = Path(__file__).parent
+SCRIPTS_DIR = ROOT_DIR / 'scripts'
 
-    if result.returncode != 0:
-        print(f"\n❌ Errore durante: {description}")
-        return False
+# Moduli condivisi degli script Vapi (vapi_client, state_store)
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
 
-    print(f"\n✅ Completato: {description}")
-    return True
+def load_upload_module():
+    """Importa scripts/3_upload_knowledge_base.py (nome non importabile direttamente)."""
+    path = SCRIPTS_DIR / '3_upload_knowledge_base.py'
+    spec = importlib.util.spec_from_file_location('upload_knowledge_base', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
 
-def check_prerequisites():
+def check_prerequisites(need_playwright=True, need_env=True):
     """Verifica prerequisiti."""
     print("="*60)
     print("CONTROLLO PREREQUISITI")
@@ -44,35 +51,174 @@ def check_prerequisites():
         print("✓ Playwright installato")
     except ImportError:
         print("✗ Playwright NON installato")
-        print("\nInstalla con:")
-        print("  pip install playwright")
-        print("  playwright install chromium")
-        return False
+        if need_playwright:
+            print("\nInstalla con:")
+            print("  pip install playwright")
+            print("  playwright install chromium")
+            return False
 
     # Check .env
     env_file = Path(__file__).parent.parent / '.env'
     if env_file.exists():
         print("✓ File .env trovato")
+    elif not need_env:
+        print("⚠️  File .env NON trovato (upload disabilitato)")
     else:
         print("✗ File .env NON trovato")
         print("\nCrea .env con:")
         print("  VAPI_API_KEY=your_key_here")
         return False
 
-    # Check .assistant-id
-    id_file = Path(__file__).parent.parent / '.assistant-id'
-    if id_file.exists():
-        print("✓ File .assistant-id trovato")
+    # Check assistente configurato
+    from state_store import get_assistant_id
+    if get_assistant_id():
+        print("✓ Assistente configurato")
     else:
-        print("⚠️  File .assistant-id NON trovato")
-        print("   (Sarà creato durante il setup)")
+        print("⚠️  Nessun assistente configurato")
+        print("   (Crealo con: python scripts/0_create_assistant.py)")
 
     print()
     return True
 
+def stage_prerequisites(ctx):
+    """Stadio: verifica prerequisiti."""
+    return check_prerequisites(
+        need_playwright=ctx['args'].scrape,
+        need_env=ctx['args'].upload
+    )
+
+def stage_scrape(ctx):
+    """Stadio: scraping servizi (in-process)."""
+    import scrape_real
+
+    args = ctx['args']
+    argv = ['--details' if args.details else '--no-details',
+            '--concurrency', str(args.concurrency)]
+    if args.crawl:
+        argv.append('--crawl')
+    if args.resume:
+        argv.append('--resume')
+
+    return scrape_real.main(argv)
+
+def stage_validate(ctx):
+    """Stadio: validazione dati estratti."""
+    import validate_data
+
+    valid, _, _ = validate_data.validate_json_file(SCRAPER_DIR / ctx['data_file'])
+    return valid
+
+def stage_generate(ctx):
+    """Stadio: generazione Markdown, con ogni file passato subito all'upload."""
+    import generate_knowledge_base as gkb
+
+    try:
+        if ctx['args'].clean:
+            gkb.clean_knowledge_base()
+        for filepath in gkb.iter_generate(SCRAPER_DIR / ctx['data_file']):
+            ctx['generated'].put(filepath)
+        return True
+    finally:
+        ctx['generated'].put(None)  # Fine stream: sblocca sempre l'upload
+
+def stage_upload(ctx):
+    """
+    Stadio: upload su Vapi.ai dei file man mano che vengono generati.
+
+    Solo i file nuovi o modificati vengono caricati (manifest con hash).
+    Quando la generazione termina controlla anche gli altri .md già
+    presenti in knowledge-base/ (es. schede scritte a mano).
+
+    Il manifest viene salvato qui, anche con upload falliti: i nuovi ID e
+    le versioni da cancellare restano nello stato anche se il link viene
+    saltato, e la sincronizzazione successiva li ritrova.
+    """
+    upload = ctx['upload_module']
+    manifest, legacy_ids, stale_ids = upload.load_manifest()
+    seen = set()
+
+    def pending_files():
+        if ctx['args'].generate:
+            while (filepath := ctx['generated'].get()) is not None:
+                seen.add(filepath.name)
+                yield filepath
+
+        for filepath in sorted(upload.KB_DIR.glob('*.md')):
+            if filepath.name not in seen:
+                seen.add(filepath.name)
+                yield filepath
+
+    results = upload.sync_files(
+        pending_files(), manifest, stale_ids,
+        concurrency=ctx['args'].upload_concurrency
+    )
+    upload.print_sync_summary(results)
+
+    file_ids, stale_ids = upload.save_sync(
+        manifest, sorted(seen), stale_ids, legacy_ids, failed=results['failed']
+    )
+    ctx['sync'] = {
+        'file_ids': file_ids,
+        'stale_ids': stale_ids,
+        'changed': results['uploaded'] > 0 or bool(legacy_ids),
+    }
+    return not results['failed']
+
+def stage_link(ctx):
+    """Stadio: link all'assistente e pulizia delle versioni sostituite."""
+    sync = ctx['sync']
+    upload = ctx['upload_module']
+    linked = upload.relink(sync['file_ids'], sync['stale_ids'], sync['changed'])
+    upload.get_client().print_metrics()
+    return linked
+
+def parse_args():
+    """Argomenti da linea di comando (nessun prompt: adatto a cron)."""
+    parser = argparse.ArgumentParser(
+        description='Pipeline completa knowledge base (scraping → generazione → validazione → upload)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Esempi d'uso:
+
+  # Pipeline completa, crawl di tutto il catalogo con dettagli
+  python scraper/setup_full_pipeline.py --crawl --details
+
+  # Solo rigenerazione e upload dai dati già estratti
+  python scraper/setup_full_pipeline.py --skip-scrape
+
+  # Scraping e generazione, senza upload
+  python scraper/setup_full_pipeline.py --skip-upload
+        """
+    )
+
+    parser.add_argument('--skip-scrape', dest='scrape', action='store_false',
+                        help='Usa i dati già estratti invece di riscrapare')
+    parser.add_argument('--skip-generate', dest='generate', action='store_false',
+                        help='Non rigenerare i file Markdown')
+    parser.add_argument('--skip-upload', dest='upload', action='store_false',
+                        help='Non caricare né linkare la knowledge base')
+    parser.add_argument('--crawl', action='store_true',
+                        help='Crawl completo del catalogo (output JSONL)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Con --crawl: riprende un crawl interrotto')
+    parser.add_argument('--details', action='store_true',
+                        help='Estrai i dettagli di ogni servizio')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Pagine di dettaglio in parallelo (default: 4)')
+    parser.add_argument('--upload-concurrency', type=int, default=8,
+                        help='Upload su Vapi.ai in parallelo (default: 8)')
+    parser.add_argument('--clean', action='store_true',
+                        help='Rimuovi i file esistenti in knowledge-base/ prima di generare')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Stadi eseguiti in parallelo (default: 4)')
+
+    return parser.parse_args()
+
 def main():
     """Main pipeline."""
 
+    args = parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════╗
 ║                                                          ║
@@ -81,40 +227,31 @@ def main():
 ╚══════════════════════════════════════════════════════════╝
 """)
 
-    # 1. Check prerequisiti
-    if not check_prerequisites():
-        print("\n❌ Prerequisiti mancanti. Impossibile continuare.")
-        return False
+    ctx = {
+        'args': args,
+        'data_file': 'services_data_real.jsonl' if args.crawl else 'services_data_real.json',
+        'generated': queue.Queue(),
+        'upload_module': load_upload_module() if args.upload else None,
+    }
 
-    print("\nPrerequisiti OK! Avvio pipeline completa...\n")
-    input("Premi INVIO per continuare...")
+    # Scraping → (validazione ‖ generazione ‖ upload in streaming) → link
+    stages = [
+        Stage('prerequisiti', stage_prerequisites,
+              description="Controllo prerequisiti"),
+        Stage('scrape', stage_scrape, deps=['prerequisiti'], enabled=args.scrape,
+              description="Scraping servizi dal sito web"),
+        Stage('validate', stage_validate, deps=['scrape'],
+              description="Validazione dati estratti"),
+        Stage('generate', stage_generate, deps=['scrape'], enabled=args.generate,
+              description="Generazione file Markdown knowledge base"),
+        Stage('upload', stage_upload, deps=['scrape'], enabled=args.upload,
+              description="Upload knowledge base su Vapi.ai"),
+        Stage('link', stage_link, deps=['upload', 'generate', 'validate'], enabled=args.upload,
+              description="Collegamento knowledge base all'assistente"),
+    ]
 
-    # 2. Scraping
-    if not run_command(
-        "python scraper/scrape_real.py",
-        "Step 1/4: Scraping servizi dal sito web"
-    ):
-        return False
-
-    # 3. Generazione KB
-    if not run_command(
-        "python scraper/generate_knowledge_base.py",
-        "Step 2/4: Generazione file Markdown knowledge base"
-    ):
-        return False
-
-    # 4. Upload KB
-    if not run_command(
-        "python scripts/upload_knowledge_base.py",
-        "Step 3/4: Upload knowledge base su Vapi.ai"
-    ):
-        return False
-
-    # 5. Link KB
-    if not run_command(
-        "python scripts/link_knowledge_base.py",
-        "Step 4/4: Collegamento knowledge base all'assistente"
-    ):
+    if not run_pipeline(stages, ctx, max_workers=args.workers):
+        print("\n❌ Pipeline non completata")
         return False
 
     # Success!
@@ -122,11 +259,6 @@ def main():
     print("🎉 SETUP COMPLETATO CON SUCCESSO!")
     print("="*60)
     print("""
-✅ Servizi scraped dal sito reale
-✅ Knowledge base generata
-✅ File caricati su Vapi.ai
-✅ Knowledge base collegata all'assistente
-
 Prossimi step opzionali:
   1. Aggiorna system prompt:
      python scripts/update_assistant.py --type prompt
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Fetch "leggero" delle pagine di dettaglio, senza browser.
+
+Ordine dei tentativi (TieredFetcher):
+1. Cache pagine (crawl_state.PageCache), se abilitata
+2. GET HTTP con sessione condivisa + parsing BeautifulSoup
+3. Playwright, solo se l'HTML statico non contiene il contenuto atteso
+   (es. shell vuota dell'app Angular): gestito da scrape_real.py
+"""
+
+import threading
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from crawl_state import USER_AGENT, content_hash
+from extraction import NODE_SELECTOR, classify_nodes
+
+STATIC_TIMEOUT = 10          # secondi
+MIN_CONTENT_CHARS = 300      # Sotto questa soglia la pagina è una shell JS
+MIN_CONTENT_BLOCKS = 3       # Paragrafi/voci di elenco minimi attesi
+
+
+def create_session(pool_size=10):
+    """Sessione HTTP con connessioni keep-alive riutilizzate tra i thread."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+
+def has_service_content(soup):
+    """
+    True se l'HTML statico contiene già il testo della pagina servizio.
+
+    Una SPA non renderizzata lato server ha un body quasi vuoto
+    (solo <app-root> e script): in quel caso serve il browser.
+    """
+    body = soup.body
+    if body is None:
+        return False
+
+    text = body.get_text(' ', strip=True)
+    blocks = body.find_all(['p', 'li'])
+    return len(text) >= MIN_CONTENT_CHARS and len(blocks) >= MIN_CONTENT_BLOCKS
+
+
+def extract_details_from_html(html):
+    """
+    Estrae requisiti, orari e costo dall'HTML statico.
+
+    Returns:
+        dict: Dettagli, oppure None se l'HTML non contiene il contenuto atteso
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+
+    if not has_service_content(soup):
+        return None
+
+    content = soup.body.get_text(' ', strip=True)
+    nodes = [
+        {'tag': el.name, 'text': el.get_text(' ', strip=True)}
+        for el in soup.select(NODE_SELECTOR)
+    ]
+    return classify_nodes(content, nodes)
+
+
+class TieredFetcher:
+    """
+    Risolve i dettagli di una pagina con il metodo più economico disponibile.
+
+    fetch() prova cache e HTML statico; se restituisce None la pagina va
+    renderizzata con Playwright e il risultato salvato con store().
+    I metodi sono thread-safe: scrape_real.py li chiama da asyncio.to_thread.
+    """
+
+    def __init__(self, cache=None, session=None, static=True):
+        self.cache = cache
+        self.session = session or (cache.session if cache else create_session())
+        self.static = static
+        self.stats = {'cache': 0, 'static': 0, 'browser': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _get(self, url):
+        """GET dell'HTML statico e relativi validatori per la cache."""
+        try:
+            response = self.session.get(url, timeout=STATIC_TIMEOUT)
+        except requests.RequestException:
+            return None, {}
+
+        if response.status_code != 200:
+            return None, {}
+
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash(response.content),
+        }
+        return response.text, validators
+
+    def fetch(self, url):
+        """
+        Prova cache e fetch statico.
+
+        Returns:
+            tuple: (dettagli o None, validatori da passare a store())
+        """
+        html, validators = None, {}
+
+        if self.cache is not None:
+            details, validators, html = self.cache.lookup(url)
+            if details is not None:
+                self._count('cache')
+                return details, {}
+
+        if not self.static:
+            return None, validators
+
+        if html is None:
+            html, validators = self._get(url)
+
+        details = extract_details_from_html(html) if html else None
+        if details is not None:
+            self._count('static')
+            self.store(url, details, validators, tier=None)
+            return details, {}
+
+        return None, validators
+
+    def store(self, url, details, validators=None, tier='browser'):
+        """Registra i dettagli ottenuti (di default dal browser) in cache."""
+        if tier:
+            self._count(tier if details else 'failed')
+        if self.cache is not None and details:
+            self.cache.store(url, details, validators)
+
+    def save(self):
+        """Salva la cache su disco."""
+        if self.cache is not None:
+            self.cache.save()
+
+    def summary(self):
+        """Riepilogo di come sono state risolte le pagine."""
+        lines = [
+            "Pagine: {cache} da cache, {static} HTML statico, "
+            "{browser} browser, {failed} fallite".format(**self.stats)
+        ]
+        if self.cache is not None:
+            lines.append(self.cache.summary())
+        return "\n✓ ".join(lines)
@@ -6,6 +6,7 @@ Verifica che i dati estratti da scraping siano completi e validi.
 Uso:
   python scraper/validate_data.py                    # Valida services_data_real.json
   python scraper/validate_data.py services_data.json # Valida file specifico
+  python scraper/validate_data.py services_data_real.jsonl  # Output di --crawl
 """
 
 import json
@@ -84,7 +85,10 @@ def validate_json_file(filepath):
     # Leggi file
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+            if Path(filepath).suffix == '.jsonl':
+                data = [json.loads(line) for line in f if line.strip()]
+            else:
+                data = json.load(f)
     except json.JSONDecodeError as e:
         print("❌ ERRORE parsing JSON: {}".format(e))
         return False, 0, 0
@@ -207,7 +211,6 @@ def main():
         print("\n✅ TUTTO OK!")
         print("\nPronto per:")
         print("  python scripts/upload_knowledge_base.py")
-        print("  python scripts/link_knowledge_base.py")
         return True
     elif json_valid and not kb_valid:
         print("\n⚠️  JSON OK ma Knowledge Base mancante/incompleta")
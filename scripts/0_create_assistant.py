@@ -4,7 +4,6 @@ Crea un nuovo assistente su Vapi.ai con configurazione completa.
 Da usare solo per setup iniziale o per creare nuovi assistenti.
 """
 
-import requests
 import json
 import os
 import sys
@@ -18,8 +17,11 @@ try:
 except ImportError:
     pass
 
+from compile_prompt import load_compiled_prompt
+from state_store import get_assistant_id, save_assistant_id
+from vapi_client import get_client
+
 VAPI_API_KEY = os.getenv('VAPI_API_KEY')
-VAPI_BASE_URL = 'https://api.vapi.ai'
 
 def load_template_config():
     """Carica la configurazione template da assistant-existing.json."""
@@ -34,7 +36,7 @@ def load_template_config():
         return json.load(f)
 
 def load_system_prompt():
-    """Carica il system prompt dal file."""
+    """Carica il system prompt dal file, compilato entro PROMPT_TOKEN_BUDGET."""
     prompt_path = Path(__file__).parent.parent / 'config' / 'vapi-system-prompt-with-tools.txt'
 
     if not prompt_path.exists():
@@ -43,17 +45,7 @@ def load_system_prompt():
         print("  Usando prompt di default...")
         return "Sei un assistente virtuale per il Comune di Codroipo. Aiuti i cittadini con informazioni sui servizi comunali."
 
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read()
-
-def save_assistant_id(assistant_id):
-    """Salva l'ID dell'assistente in .assistant-id."""
-    id_file = Path(__file__).parent.parent / '.assistant-id'
-
-    with open(id_file, 'w') as f:
-        f.write(assistant_id)
-
-    print("\nID assistente salvato in: {}".format(id_file))
+    return load_compiled_prompt(prompt_path)
 
 def create_assistant(name=None, voice_provider=None):
     """
@@ -129,18 +121,9 @@ def create_assistant(name=None, voice_provider=None):
 
     print()
 
-    headers = {
-        'Authorization': 'Bearer {}'.format(VAPI_API_KEY),
-        'Content-Type': 'application/json'
-    }
-
     print("Invio richiesta a Vapi.ai...")
 
-    response = requests.post(
-        '{}/assistant'.format(VAPI_BASE_URL),
-        headers=headers,
-        json=config
-    )
+    response = get_client().post('/assistant', json=config)
 
     if response.status_code == 201:
         assistant = response.json()
@@ -160,6 +143,7 @@ def create_assistant(name=None, voice_provider=None):
 
         # Salva ID
         save_assistant_id(assistant_id)
+        print("\nID assistente salvato in .vapi-state.db")
 
         # Salva config completa
         save_config(assistant)
@@ -182,17 +166,16 @@ def save_config(assistant):
 
 def check_existing_assistant():
     """Controlla se esiste già un assistente configurato."""
-    id_file = Path(__file__).parent.parent / '.assistant-id'
+    assistant_id = get_assistant_id()
 
-    if id_file.exists():
-        assistant_id = id_file.read_text().strip()
+    if assistant_id:
         print("\n" + "="*60)
         print("ATTENZIONE: Assistente già configurato!")
         print("="*60)
         print("ID esistente: {}".format(assistant_id))
         print()
         print("Se procedi, verrà creato un NUOVO assistente.")
-        print("L'ID esistente verrà sovrascritto in .assistant-id")
+        print("L'ID esistente verrà sovrascritto in .vapi-state.db")
         print()
 
         response = input("Vuoi continuare? (s/N): ").strip().lower()
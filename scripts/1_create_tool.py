@@ -1,23 +1,37 @@
 #!/usr/bin/env python3
 """
 Crea TUTTI i tool custom su Vapi.ai in una volta:
-- Email tool (con autenticazione Bearer)
-- Calendar check tool
-- Calendar create tool
+- Email tool (con autenticazione Bearer, oppure relay del tool server con
+  EMAIL_DELIVERY=relay: coda su disco e invio in background, vedi
+  server/email_relay.py)
+- Calendar check tool (Google Calendar, oppure server locale con
+  CALENDAR_AVAILABILITY=local, vedi server/availability.py)
+- Calendar create tool (con CALENDAR_AVAILABILITY=local: motore di
+  prenotazione locale, più il tool di blocco slot; vedi server/booking.py)
+- Search services tool (server webhook locale, vedi server/tool_server.py)
+- Service info tool (documenti per servizio, stesso server webhook)
 
 Automazioni:
 - Crea credential Mailtrap se non esiste
 - Linka credential al tool email
-- Se esiste .assistant-id, linka automaticamente i tool all'assistente
+- Se è configurato un assistente, linka automaticamente i tool
+
+Upsert idempotente e in parallelo: ogni tool viene cercato su Vapi (per ID
+salvato nello stato locale o per nome funzione); se la configurazione
+non è cambiata viene saltato, se è cambiata viene aggiornato in place,
+altrimenti viene creato. Rieseguire lo script non crea duplicati.
 """
 
+import argparse
+import hashlib
 import json
 import os
 import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import requests
-
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 try:
@@ -27,30 +41,88 @@ try:
 except ImportError:
     pass
 
+import state_store
+from state_store import get_assistant_id, get_secret_id, save_secret_id
+from vapi_client import get_client
+
 VAPI_API_KEY = os.getenv("VAPI_API_KEY")
 MAILTRAP_API_TOKEN = os.getenv("MAILTRAP_API_TOKEN")
-VAPI_BASE_URL = "https://api.vapi.ai"
+TOOL_SERVER_URL = os.getenv("TOOL_SERVER_URL")
+TOOL_SERVER_SECRET = os.getenv("TOOL_SERVER_SECRET")
+LOCAL_CALENDAR = os.getenv("CALENDAR_AVAILABILITY", "google").lower() == "local"
+EMAIL_RELAY = os.getenv("EMAIL_DELIVERY", "mailtrap").lower() == "relay"
 
-# Configurazione dei 3 tool
+_print_lock = threading.Lock()
+
+# Configurazione dei tool
 TOOLS_CONFIG = {
     "email": {
         "file": "vapi-tools-config.json",
+        "relay_file": "vapi-send_email-relay-tools-config.json",
         "name": "Email Confirmation Tool",
         "use_secret": True
     },
     "calendar-check": {
         "file": "vapi-check_calendar-tools-config.json",
+        "local_file": "vapi-check_calendar-local-tools-config.json",
         "name": "Calendar Availability Check Tool",
         "use_secret": False
     },
     "calendar-create": {
         "file": "vapi-send_calendar-tools-config.json",
+        "local_file": "vapi-send_calendar-local-tools-config.json",
         "name": "Calendar Event Creation Tool",
         "use_secret": False
+    },
+    "calendar-hold": {
+        "file": "vapi-hold_slot-tools-config.json",
+        "name": "Calendar Slot Hold Tool",
+        "use_secret": False,
+        "use_tool_server": True,
+        "local_only": True
+    },
+    "search-services": {
+        "file": "vapi-search_services-tools-config.json",
+        "name": "Search Services Tool",
+        "use_secret": False,
+        "use_tool_server": True
+    },
+    "service-info": {
+        "file": "vapi-get_service_info-tools-config.json",
+        "name": "Service Info Tool",
+        "use_secret": False,
+        "use_tool_server": True
     }
 }
 
 
+def active_tools():
+    """Voci di TOOLS_CONFIG da gestire (i tool local_only solo con il calendario locale)."""
+    return {
+        tool_key: spec for tool_key, spec in TOOLS_CONFIG.items()
+        if LOCAL_CALENDAR or not spec.get("local_only")
+    }
+
+
+def tool_variant(spec):
+    """Variante del tool con la configurazione corrente (per i riepiloghi)."""
+    if EMAIL_RELAY and "relay_file" in spec:
+        return "relay del tool server"
+    if LOCAL_CALENDAR and "local_file" in spec:
+        return "tool server locale"
+    if spec.get("use_tool_server"):
+        return "tool server"
+    if spec["use_secret"]:
+        return "credential Mailtrap"
+    return "Google Calendar"
+
+
+def log(message):
+    """Print thread-safe (gli upsert girano in parallelo)."""
+    with _print_lock:
+        print(message)
+
+
 def load_tool_config(config_file):
     """Carica la configurazione tool dal file JSON."""
     config_path = Path(__file__).parent.parent / "config" / config_file
@@ -71,36 +143,6 @@ def load_tool_config(config_file):
     return config
 
 
-def save_secret_id(secret_id, name):
-    """Salva l'ID del secret in .secret-ids.json."""
-    secrets_file = Path(__file__).parent.parent / ".secret-ids.json"
-
-    secrets = {}
-    if secrets_file.exists():
-        with open(secrets_file, "r") as f:
-            secrets = json.load(f)
-
-    secrets[name] = secret_id
-
-    with open(secrets_file, "w") as f:
-        json.dump(secrets, f, indent=2)
-
-    return secrets_file
-
-
-def get_secret_id(name="mailtrap_token"):
-    """Recupera l'ID del secret salvato."""
-    secrets_file = Path(__file__).parent.parent / ".secret-ids.json"
-
-    if not secrets_file.exists():
-        return None
-
-    with open(secrets_file, "r") as f:
-        secrets = json.load(f)
-
-    return secrets.get(name)
-
-
 def create_secret(name="mailtrap_token"):
     """Crea una Bearer Token credential su Vapi.ai."""
 
@@ -109,11 +151,6 @@ def create_secret(name="mailtrap_token"):
         print("         Aggiungi: MAILTRAP_API_TOKEN=your_token")
         return None
 
-    headers = {
-        "Authorization": f"Bearer {VAPI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     # Configurazione Bearer Token credential
     secret_config = {
         "provider": "webhook",
@@ -129,12 +166,7 @@ def create_secret(name="mailtrap_token"):
     print(f"\n      🔄 Chiamata API Vapi per credential '{name}'...")
 
     try:
-        response = requests.post(
-            f"{VAPI_BASE_URL}/credential",
-            headers=headers,
-            json=secret_config,
-            timeout=10
-        )
+        response = get_client().post("/credential", json=secret_config, timeout=10)
 
         if response.status_code == 201:
             secret = response.json()
@@ -145,7 +177,7 @@ def create_secret(name="mailtrap_token"):
 
             # Salva ID
             save_secret_id(secret_id, name)
-            print(f"         Salvata in .secret-ids.json")
+            print(f"         Salvata in .vapi-state.db")
 
             return secret_id
         else:
@@ -181,24 +213,27 @@ def ensure_secret():
     return new_secret_id
 
 
-def get_assistant_id():
-    """Legge l'ID dell'assistente se presente."""
-    id_file = Path(__file__).parent.parent / ".assistant-id"
-    if not id_file.exists():
-        return None
+def apply_tool_server(tool_config):
+    """
+    Punta un tool al server webhook locale (TOOL_SERVER_URL).
 
-    with open(id_file, "r") as f:
-        return f.read().strip()
+    Returns:
+        bool: False se TOOL_SERVER_URL non è configurato
+    """
+    if not TOOL_SERVER_URL:
+        return False
+
+    server = dict(tool_config.get("server") or {})
+    server["url"] = TOOL_SERVER_URL.rstrip("/") + "/webhook"
+    if TOOL_SERVER_SECRET:
+        server["secret"] = TOOL_SERVER_SECRET
+    tool_config["server"] = server
+    return True
 
 
 def get_current_config(assistant_id):
     """Fetch della configurazione corrente dell'assistente."""
-    headers = {"Authorization": f"Bearer {VAPI_API_KEY}"}
-
-    response = requests.get(
-        f"{VAPI_BASE_URL}/assistant/{assistant_id}",
-        headers=headers
-    )
+    response = get_client().get(f"/assistant/{assistant_id}")
 
     if response.status_code != 200:
         print(f"⚠️  Impossibile recuperare config assistente: {response.status_code}")
@@ -207,29 +242,66 @@ def get_current_config(assistant_id):
     return response.json()
 
 
-def get_tool_ids():
-    """Legge gli ID dei tool da .tool-ids."""
-    tool_file = Path(__file__).parent.parent / ".tool-ids"
+def load_tool_manifest():
+    """Tool gestiti salvati nello stato locale: chiave tool → {id, hash}."""
+    entries = state_store.get_store().all(state_store.TOOL)
+    tools = active_tools()
+    return {key: entry for key, entry in entries.items() if key in tools}
+
+
+def save_tool_manifest(manifest):
+    """
+    Salva i tool gestiti nello stato locale, in un'unica transazione.
+
+    Le voci non più in TOOLS_CONFIG (es. ID importati dal vecchio .tool-ids)
+    o non attive vengono rimosse: all'assistente vengono linkati solo questi tool.
+    """
+    state_store.get_store().replace_all(state_store.TOOL, manifest)
+
+
+def config_hash(tool_config):
+    """Hash della configurazione di un tool (JSON canonico)."""
+    canonical = json.dumps(tool_config, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def tool_function_name(tool):
+    """Nome della funzione di un tool (chiave per riconoscerlo su Vapi)."""
+    return (tool.get("function") or {}).get("name")
+
+
+def list_remote_tools():
+    """
+    Tool esistenti su Vapi.ai, raggruppati per nome funzione.
 
-    if not tool_file.exists():
-        return []
+    Returns:
+        dict: nome funzione → lista di tool (più recente per primo),
+            oppure None se la lista non è disponibile
+    """
+    response = get_client().get("/tool", params={"limit": 1000})
 
-    with open(tool_file, "r") as f:
-        tool_ids = [line.strip() for line in f.readlines() if line.strip()]
+    if response.status_code != 200:
+        print(f"⚠️  Impossibile elencare i tool esistenti: {response.status_code}")
+        return None
 
-    return tool_ids
+    by_name = {}
+    tools = sorted(response.json(), key=lambda t: t.get("createdAt", ""), reverse=True)
+    for tool in tools:
+        name = tool_function_name(tool)
+        if name:
+            by_name.setdefault(name, []).append(tool)
+    return by_name
 
 
-def link_to_assistant():
-    """Linka i tool all'assistente se presente .assistant-id."""
+def link_to_assistant(tool_ids):
+    """Linka i tool all'assistente, se configurato."""
     assistant_id = get_assistant_id()
 
     if not assistant_id:
-        print("\n⏭️  .assistant-id non trovato, skip auto-linking")
+        print("\n⏭️  Nessun assistente configurato, skip auto-linking")
         print("   Usa: python scripts/update_assistant.py")
         return False
 
-    tool_ids = get_tool_ids()
     if not tool_ids:
         print("\n⏭️  Nessun tool da linkare")
         return False
@@ -243,17 +315,15 @@ def link_to_assistant():
 
     # Prepara update solo per model.toolIds
     model_config = current_config.get("model", {})
+    if model_config.get("toolIds") == tool_ids:
+        print(f"✓ Tools già linkati ({len(tool_ids)} tool)")
+        return True
+
     model_config["toolIds"] = tool_ids
 
     # PATCH all'assistente
-    headers = {
-        "Authorization": f"Bearer {VAPI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.patch(
-        f"{VAPI_BASE_URL}/assistant/{assistant_id}",
-        headers=headers,
+    response = get_client().patch(
+        f"/assistant/{assistant_id}",
         json={"model": model_config}
     )
 
@@ -266,95 +336,84 @@ def link_to_assistant():
         return False
 
 
-def create_single_tool(tool_key, config_file, tool_name, use_secret=False):
+def find_existing_tool(tool_key, tool_config, manifest, remote_tools):
     """
-    Crea un singolo tool su Vapi.ai.
+    Cerca su Vapi il tool corrispondente a una voce di TOOLS_CONFIG.
 
-    Args:
-        tool_key: Chiave identificativa (email, calendar-check, calendar-create)
-        config_file: Nome file configurazione
-        tool_name: Nome descrittivo del tool
-        use_secret: Se True, usa il secret per autenticazione Bearer
+    Prima per ID salvato nel manifest, poi per nome funzione. Solo tool
+    dello stesso tipo: il tipo non è modificabile, quindi passando da
+    Google Calendar al server locale (e viceversa) ognuno ha il suo tool.
 
     Returns:
-        str: Tool ID se successo, None altrimenti
+        tuple: (tool remoto o None, numero di duplicati con lo stesso nome)
     """
-    print(f"\n📤 Creazione {tool_name}...")
-    print("-" * 60)
-
-    # Carica configurazione
-    tool_config = load_tool_config(config_file)
-    if not tool_config:
-        return None
-
-    # Se usa secret, assicurati che esista e linkalo
-    if use_secret:
-        secret_id = ensure_secret()
-        if secret_id:
-            tool_config["credentialId"] = secret_id
-            print(f"✓ Credential collegata: {secret_id}")
-        else:
-            print("❌ Impossibile creare/trovare credential")
-            print("   Tool creato SENZA autenticazione!")
-            print("   Aggiungi MAILTRAP_API_TOKEN in .env e ricrea il tool")
-
-    # Dettagli tool
-    func_name = tool_config.get('function', {}).get('name', 'N/A')
-    print(f"Nome funzione: {func_name}")
-
-    if tool_key == "email":
-        print(f"URL: {tool_config.get('url', 'N/A')}")
-    else:
-        cal_id = tool_config.get('metadata', {}).get('calendarId', 'N/A')
-        print(f"Calendar ID: {cal_id[:20]}..." if len(cal_id) > 20 else cal_id)
-
-    # Crea tool
-    headers = {
-        "Authorization": f"Bearer {VAPI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    candidates = [
+        tool for tool in remote_tools.get(tool_function_name(tool_config), [])
+        if tool.get("type") == tool_config.get("type")
+    ]
+    known_id = manifest.get(tool_key, {}).get("id")
 
-    response = requests.post(
-        f"{VAPI_BASE_URL}/tool",
-        headers=headers,
-        json=tool_config
-    )
-
-    if response.status_code == 201:
-        tool_data = response.json()
-        tool_id = tool_data.get("id")
-
-        print(f"✅ Tool creato: {tool_id}")
+    for tool in candidates:
+        if tool.get("id") == known_id:
+            return tool, len(candidates) - 1
 
-        # Salva ID (append)
-        ids_file = Path(__file__).parent.parent / ".tool-ids"
+    if candidates:
+        return candidates[0], len(candidates) - 1
+    return None, 0
 
-        existing_ids = []
-        if ids_file.exists():
-            with open(ids_file, "r") as f:
-                existing_ids = [line.strip() for line in f.readlines() if line.strip()]
 
-        if tool_id not in existing_ids:
-            existing_ids.append(tool_id)
+def upsert_tool(tool_key, tool_config, manifest, remote_tools):
+    """
+    Crea o aggiorna un singolo tool su Vapi.ai (idempotente).
 
-        with open(ids_file, "w") as f:
-            f.write("\n".join(existing_ids))
+    - invariato (stesso hash nel manifest): nessuna richiesta
+    - esistente ma diverso: PATCH in place
+    - assente: POST
 
-        return tool_id
+    Returns:
+        tuple: (tool ID o None, azione: 'unchanged' | 'updated' | 'created' | 'failed')
+    """
+    tool_name = TOOLS_CONFIG[tool_key]["name"]
+    digest = config_hash(tool_config)
+    existing, duplicates = find_existing_tool(tool_key, tool_config, manifest, remote_tools)
+
+    if duplicates:
+        log(f"⚠️  {tool_name}: {duplicates} duplicati su Vapi con lo stesso nome funzione "
+              f"(non linkati, eliminabili dalla dashboard)")
+
+    if existing:
+        tool_id = existing["id"]
+        entry = manifest.get(tool_key, {})
+        if entry.get("id") == tool_id and entry.get("hash") == digest:
+            log(f"✓ {tool_name}: invariato ({tool_id})")
+            return tool_id, "unchanged"
+
+        # Il tipo di un tool non è modificabile
+        update_config = {k: v for k, v in tool_config.items() if k != "type"}
+        response = get_client().patch(f"/tool/{tool_id}", json=update_config)
+        if response.status_code == 200:
+            log(f"🔄 {tool_name}: aggiornato ({tool_id})")
+            return tool_id, "updated"
     else:
-        print(f"❌ Errore: {response.status_code}")
-        print(response.text)
-        return None
+        response = get_client().post("/tool", json=tool_config)
+        if response.status_code == 201:
+            tool_id = response.json().get("id")
+            log(f"✅ {tool_name}: creato ({tool_id})")
+            return tool_id, "created"
+
+    log(f"❌ {tool_name}: errore {response.status_code}")
+    log(f"   {response.text}")
+    return None, "failed"
 
 
 def create_all_tools():
-    """Crea tutti e 3 i tool in una volta."""
+    """Crea o aggiorna tutti i tool in parallelo (upsert idempotente)."""
     if not VAPI_API_KEY:
         print("❌ VAPI_API_KEY non trovata in .env")
         return False
 
     print("=" * 60)
-    print("CREAZIONE TOOLS SU VAPI.AI")
+    print("PROVISIONING TOOLS SU VAPI.AI")
     print("=" * 60)
     print()
 
@@ -362,71 +421,131 @@ def create_all_tools():
     print("📋 Verifica configurazione:")
     print(f"   VAPI_API_KEY: {'✓ presente' if VAPI_API_KEY else '❌ mancante'}")
     print(f"   MAILTRAP_API_TOKEN: {'✓ presente' if MAILTRAP_API_TOKEN else '❌ mancante'}")
-    print()
+    print(f"   TOOL_SERVER_URL: {TOOL_SERVER_URL or '❌ mancante'}")
+    print(f"   CALENDAR_AVAILABILITY: {'local (tool server)' if LOCAL_CALENDAR else 'google'}")
+    print(f"   EMAIL_DELIVERY: {'relay (tool server)' if EMAIL_RELAY else 'mailtrap'}")
+
+    # Configurazioni complete, prima di qualsiasi upsert. La credential è
+    # verificata una sola volta (in parallelo verrebbe creata più volte)
+    configs = {}
+    tools = active_tools()
+    for tool_key, spec in tools.items():
+        local = LOCAL_CALENDAR and "local_file" in spec
+        relay = EMAIL_RELAY and "relay_file" in spec
+        if relay:
+            tool_config = load_tool_config(spec["relay_file"])
+        else:
+            tool_config = load_tool_config(spec["local_file"] if local else spec["file"])
+        if not tool_config:
+            continue
+
+        if spec["use_secret"] and not relay:
+            secret_id = ensure_secret()
+            if secret_id:
+                tool_config["credentialId"] = secret_id
+            else:
+                print("❌ Impossibile creare/trovare credential")
+                print("   Tool senza autenticazione!")
+                print("   Aggiungi MAILTRAP_API_TOKEN in .env e riesegui")
+
+        if (spec.get("use_tool_server") or local or relay) and not apply_tool_server(tool_config):
+            print(f"\n⚠️  {spec['name']} saltato: TOOL_SERVER_URL non trovato in .env")
+            print("   Aggiungi: TOOL_SERVER_URL=https://your-tool-server.example.com")
+            continue
+
+        configs[tool_key] = tool_config
+
+    remote_tools = list_remote_tools()
+    if remote_tools is None:
+        return False
+
+    manifest = load_tool_manifest()
+    print(f"\n📤 Upsert di {len(configs)} tool in parallelo...")
+    print("-" * 60)
 
-    results = {}
+    with ThreadPoolExecutor(max_workers=len(configs) or 1) as executor:
+        futures = {
+            tool_key: executor.submit(upsert_tool, tool_key, config, manifest, remote_tools)
+            for tool_key, config in configs.items()
+        }
+        results = {tool_key: future.result() for tool_key, future in futures.items()}
 
-    # Crea tutti i tool
-    for tool_key, config in TOOLS_CONFIG.items():
-        tool_id = create_single_tool(
-            tool_key,
-            config["file"],
-            config["name"],
-            config["use_secret"]
-        )
-        results[tool_key] = tool_id
+    for tool_key, (tool_id, action) in results.items():
+        if tool_id:
+            manifest[tool_key] = {"id": tool_id, "hash": config_hash(configs[tool_key])}
+    save_tool_manifest(manifest)
+
+    tool_ids = state_store.get_tool_ids()
 
     # Riepilogo
     print("\n" + "=" * 60)
     print("RIEPILOGO")
     print("=" * 60)
 
-    success_count = 0
-    for tool_key, tool_id in results.items():
-        status = "✅" if tool_id else "❌"
-        tool_name = TOOLS_CONFIG[tool_key]["name"]
-        print(f"{status} {tool_name}")
-        if tool_id:
-            print(f"   ID: {tool_id}")
-            success_count += 1
+    labels = {"created": "creato", "updated": "aggiornato", "unchanged": "invariato", "failed": "fallito"}
+    for tool_key, spec in tools.items():
+        if tool_key not in results:
+            print(f"  ❌ {spec['name']}: saltato")
+            continue
+        tool_id, action = results[tool_key]
+        marker = "❌" if action == "failed" else "✓"
+        print(f"  {marker} {spec['name']} ({tool_variant(spec)}): {labels.get(action, action)}"
+              + (f" [{tool_id}]" if tool_id else ""))
+
+    actions = Counter(action for _, action in results.values())
+    actions["failed"] += len(tools) - len(configs)
+    print("Creati {created}, aggiornati {updated}, invariati {unchanged}, falliti {failed}".format(
+        **{key: actions[key] for key in ("created", "updated", "unchanged", "failed")}
+    ))
+    get_client().print_metrics()
 
-    print(f"\n{success_count}/{len(TOOLS_CONFIG)} tool creati con successo")
+    if not tool_ids:
+        print("\n❌ Nessun tool disponibile")
+        return False
 
-    if success_count > 0:
-        # Auto-link se esiste assistente
-        linked = link_to_assistant()
+    # Auto-link se esiste assistente
+    linked = link_to_assistant(tool_ids)
 
-        if success_count == len(TOOLS_CONFIG):
-            print("\n✅ Tutti i tool sono stati creati!")
-        else:
-            print("\n⚠️  Alcuni tool sono stati creati")
+    if actions["failed"]:
+        print("\n⚠️  Alcuni tool non sono stati creati/aggiornati")
+    else:
+        print("\n✅ Tutti i tool sono allineati!")
 
-        if not linked:
-            print("\n📋 Prossimo step:")
-            print("   python scripts/update_assistant.py")
+    if not linked:
+        print("\n📋 Prossimo step:")
+        print("   python scripts/update_assistant.py")
 
-        return True
-    else:
-        print("\n❌ Nessun tool creato")
-        return False
+    return not actions["failed"]
 
 
 def main():
-    """Main - Crea tutti e 3 i tool."""
+    """Main - Crea o aggiorna tutti i tool attivi con la configurazione corrente."""
+    parser = argparse.ArgumentParser(
+        description="Crea o aggiorna i tool su Vapi.ai (upsert idempotente)"
+    )
+    parser.add_argument(
+        "--yes", "-y",
+        action="store_true",
+        help="Non chiedere conferma (es. deploy automatici)"
+    )
+    args = parser.parse_args()
+
     print("🛠️  CREATE TOOLS")
     print()
-    print("Questo script crea TUTTI e 3 i tool:")
-    print("  1. Email tool (crea credential Mailtrap se necessario)")
-    print("  2. Calendar check tool")
-    print("  3. Calendar create tool")
-    print()
-    print("⚙️  Verifica automatica credential Mailtrap...")
+    tools = active_tools()
+    print(f"Questo script crea o aggiorna {len(tools)} tool:")
+    for i, spec in enumerate(tools.values(), 1):
+        print(f"  {i}. {spec['name']} ({tool_variant(spec)})")
     print()
-
-    response = input("Vuoi procedere? [S/n] ")
-    if response.lower() not in ["", "s", "y", "si", "yes"]:
-        print("Operazione annullata.")
-        sys.exit(0)
+    if any(spec["use_secret"] and not (EMAIL_RELAY and "relay_file" in spec) for spec in tools.values()):
+        print("⚙️  Verifica automatica credential Mailtrap...")
+        print()
+
+    if not args.yes:
+        response = input("Vuoi procedere? [S/n] ")
+        if response.lower() not in ["", "s", "y", "si", "yes"]:
+            print("Operazione annullata.")
+            sys.exit(0)
 
     success = create_all_tools()
     sys.exit(0 if success else 1)
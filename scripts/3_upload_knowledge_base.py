@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
 """
 Carica i file della knowledge base su Vapi.ai.
-Se esiste .assistant-id, linka automaticamente i file all'assistente.
+Se è configurato un assistente, linka automaticamente i file.
+
+Upload incrementale: il manifest nello stato locale (state_store) associa
+ogni file all'hash del contenuto e all'ID remoto. Vengono caricati solo i file nuovi
+o modificati, quelli rimossi vengono cancellati anche su Vapi.ai e gli ID
+dei file invariati restano gli stessi. Le versioni sostituite vengono
+cancellate solo dopo che l'assistente è stato linkato ai nuovi file.
+
+Gli upload avvengono in parallelo (--concurrency) tramite il client
+condiviso vapi_client (sessione keep-alive, timeout, retry, rate limit).
 """
 
+import argparse
+import hashlib
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import requests
@@ -19,28 +33,30 @@ try:
 except ImportError:
     pass
 
+import state_store
+from state_store import get_assistant_id
+from vapi_client import get_client
+
 VAPI_API_KEY = os.getenv("VAPI_API_KEY")
-VAPI_BASE_URL = "https://api.vapi.ai"
 
+ROOT_DIR = Path(__file__).parent.parent
+KB_DIR = ROOT_DIR / "knowledge-base"
 
-def get_assistant_id():
-    """Legge l'ID dell'assistente se presente."""
-    id_file = Path(__file__).parent.parent / ".assistant-id"
-    if not id_file.exists():
-        return None
+DEFAULT_CONCURRENCY = 8
 
-    with open(id_file, "r") as f:
-        return f.read().strip()
+_print_lock = threading.Lock()
+_manifest_lock = threading.Lock()
+
+
+def log(message):
+    """Print thread-safe (gli upload girano in parallelo)."""
+    with _print_lock:
+        print(message)
 
 
 def get_current_config(assistant_id):
     """Fetch della configurazione corrente dell'assistente."""
-    headers = {"Authorization": f"Bearer {VAPI_API_KEY}"}
-
-    response = requests.get(
-        f"{VAPI_BASE_URL}/assistant/{assistant_id}",
-        headers=headers
-    )
+    response = get_client().get(f"/assistant/{assistant_id}")
 
     if response.status_code != 200:
         print(f"⚠️  Impossibile recuperare config assistente: {response.status_code}")
@@ -50,11 +66,11 @@ def get_current_config(assistant_id):
 
 
 def link_to_assistant(file_ids):
-    """Linka i file KB all'assistente se presente .assistant-id."""
+    """Linka i file KB all'assistente, se configurato."""
     assistant_id = get_assistant_id()
 
     if not assistant_id:
-        print("\n⏭️  .assistant-id non trovato, skip auto-linking")
+        print("\n⏭️  Nessun assistente configurato, skip auto-linking")
         print("   Usa: python scripts/update_assistant.py")
         return False
 
@@ -73,14 +89,8 @@ def link_to_assistant(file_ids):
     }
 
     # PATCH all'assistente
-    headers = {
-        "Authorization": f"Bearer {VAPI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    response = requests.patch(
-        f"{VAPI_BASE_URL}/assistant/{assistant_id}",
-        headers=headers,
+    response = get_client().patch(
+        f"/assistant/{assistant_id}",
         json={"model": model_config}
     )
 
@@ -100,65 +110,327 @@ def upload_file(filepath):
         print("ERRORE: VAPI_API_KEY non trovata!")
         return None
 
-    headers = {"Authorization": "Bearer {}".format(VAPI_API_KEY)}
-
     filename = Path(filepath).name
-    print("Caricamento {}...".format(filename))
+    content = Path(filepath).read_bytes()
 
-    with open(filepath, "rb") as f:
-        files = {"file": (filename, f, "text/markdown")}
-
-        response = requests.post(
-            "{}/file".format(VAPI_BASE_URL), headers=headers, files=files
+    # Il contenuto è letto una volta sola: ogni retry reinvia gli stessi byte
+    try:
+        response = get_client().post(
+            "/file",
+            files={"file": (filename, content, "text/markdown")}
         )
+    except requests.RequestException as e:
+        log("  ERRORE {}: {}".format(filename, e))
+        return None
 
     if response.status_code == 201:
         file_data = response.json()
-        print("  OK File ID: {}".format(file_data["id"]))
+        log("✓ {} → {}".format(filename, file_data["id"]))
         return file_data["id"]
     else:
-        print("  ERRORE: {}".format(response.status_code))
-        print("  {}".format(response.text))
+        log("  ERRORE {}: {}".format(filename, response.status_code))
+        log("  {}".format(response.text))
         return None
 
 
-def upload_all():
-    """Carica tutti i file della knowledge base."""
+def file_hash(filepath):
+    """Hash SHA-256 del contenuto di un file."""
+    return hashlib.sha256(Path(filepath).read_bytes()).hexdigest()
 
-    kb_path = Path(__file__).parent.parent / "knowledge-base"
-    md_files = sorted(kb_path.glob("*.md"))
 
-    if not md_files:
-        print("ERRORE: Nessun file .md trovato in knowledge-base/")
-        return
+def load_manifest():
+    """
+    Legge il manifest {nome file: {"hash": ..., "file_id": ...}}.
+
+    Gli ID importati dal vecchio .knowledge-base-ids senza manifest non sono
+    associabili ai file: vengono restituiti come "legacy" per cancellarli
+    dopo il nuovo upload, invece di lasciarli orfani su Vapi.ai. Le versioni
+    sostituite e non ancora cancellate (link non riuscito) vengono
+    restituite per riprovare la cancellazione.
 
-    print("Trovati {} file da caricare\n".format(len(md_files)))
+    Returns:
+        tuple: (manifest, ID legacy, ID delle versioni sostituite)
+    """
+    manifest, legacy_ids, stale_ids = {}, [], []
+    for name, entry in state_store.get_store().all(state_store.KB_FILE).items():
+        if name.startswith(state_store.LEGACY_PREFIX):
+            legacy_ids.append(entry["id"])
+        elif name.startswith(state_store.STALE_PREFIX):
+            stale_ids.append(entry["id"])
+        else:
+            manifest[name] = {"hash": entry["hash"], "file_id": entry["id"]}
 
-    file_ids = []
-    for md_file in md_files:
-        file_id = upload_file(md_file)
-        if file_id:
-            file_ids.append(file_id)
+    return manifest, legacy_ids, stale_ids
 
-    if file_ids:
-        print("\n✅ Caricati {}/{} file".format(len(file_ids), len(md_files)))
 
-        # Salva gli ID
-        ids_file = Path(__file__).parent.parent / ".knowledge-base-ids"
-        with open(ids_file, "w") as f:
-            f.write("\n".join(file_ids))
+def save_manifest(manifest, legacy_ids=(), stale_ids=()):
+    """
+    Salva il manifest nello stato locale (una transazione).
 
-        print("✓ IDs salvati in .knowledge-base-ids")
+    Gli ID legacy e le versioni sostituite non ancora cancellati restano
+    nello stato, per essere cancellati in seguito.
 
-        # Auto-link se esiste assistente
-        linked = link_to_assistant(file_ids)
+    Returns:
+        list: ID dei file del manifest da linkare, ordinati per nome
+    """
+    entries = {
+        name: {"id": entry["file_id"], "hash": entry["hash"]}
+        for name, entry in manifest.items()
+    }
+    entries.update({f"{state_store.LEGACY_PREFIX}{file_id}": {"id": file_id} for file_id in legacy_ids})
+    entries.update({f"{state_store.STALE_PREFIX}{file_id}": {"id": file_id} for file_id in stale_ids})
+    state_store.get_store().replace_all(state_store.KB_FILE, entries)
+    return [manifest[name]["file_id"] for name in sorted(manifest)]
+
+
+def delete_file(file_id):
+    """Cancella un file dalla knowledge base remota."""
+    try:
+        response = get_client().delete(f"/file/{file_id}")
+    except requests.RequestException as e:
+        log(f"  ⚠️  Impossibile rimuovere {file_id}: {e}")
+        return False
 
-        if not linked:
-            print("\n📋 Prossimo step:")
-            print("   python scripts/update_assistant.py")
+    # 404: già cancellato, va bene comunque
+    if response.status_code in (200, 204, 404):
+        log(f"  🗑️  Rimosso file remoto: {file_id}")
+        return True
+
+    log(f"  ⚠️  Impossibile rimuovere {file_id}: {response.status_code}")
+    return False
+
+
+def sync_file(filepath, manifest, stale_ids, force=False):
+    """
+    Carica un file solo se nuovo o modificato rispetto al manifest.
+
+    Se il file era già caricato con un contenuto diverso, il vecchio ID
+    viene aggiunto a `stale_ids` per essere cancellato dopo il link.
+
+    Returns:
+        str: Stato ('unchanged', 'uploaded', 'failed')
+    """
+    filepath = Path(filepath)
+    name = filepath.name
+    digest = file_hash(filepath)
+    with _manifest_lock:
+        entry = manifest.get(name)
+
+    if entry and entry["hash"] == digest and not force:
+        return "unchanged"
+
+    file_id = upload_file(filepath)
+    if not file_id:
+        return "failed"
+
+    with _manifest_lock:
+        if entry:
+            stale_ids.append(entry["file_id"])
+        manifest[name] = {"hash": digest, "file_id": file_id}
+    return "uploaded"
+
+
+def sync_files(filepaths, manifest, stale_ids, force=False, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Sincronizza più file in parallelo.
+
+    `filepaths` può essere un iterabile "lento" (es. file prodotti man mano
+    dalla generazione): ogni file viene inviato appena arriva.
+
+    Returns:
+        dict: Conteggi per stato, più names (file visti), bytes ed elapsed
+    """
+    get_client(pool_size=concurrency)
+    results = {"unchanged": 0, "uploaded": 0, "failed": 0, "names": [], "bytes": 0}
+    start = time.perf_counter()
+
+    def sync_one(filepath):
+        status = sync_file(filepath, manifest, stale_ids, force)
+        with _manifest_lock:
+            results[status] += 1
+            if status == "uploaded":
+                results["bytes"] += Path(filepath).stat().st_size
+            done = results["unchanged"] + results["uploaded"] + results["failed"]
+        if status != "unchanged":
+            log("  [{}] {} {}".format(done, status, Path(filepath).name))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for filepath in filepaths:
+            results["names"].append(Path(filepath).name)
+            futures.append(executor.submit(sync_one, filepath))
+        for future in futures:
+            future.result()
+
+    results["elapsed"] = time.perf_counter() - start
+    return results
+
+
+def print_sync_summary(results):
+    """Riepilogo avanzamento e throughput della sincronizzazione."""
+    elapsed = max(results["elapsed"], 1e-6)
+    print("\n✅ Caricati {uploaded}, invariati {unchanged}, falliti {failed}".format(**results))
+    if results["uploaded"]:
+        print("   {:.1f}s, {:.1f} file/s, {:.1f} KB/s".format(
+            elapsed,
+            results["uploaded"] / elapsed,
+            results["bytes"] / 1024 / elapsed
+        ))
+
+
+def save_sync(manifest, present_names, stale_ids, legacy_ids=(), failed=0):
+    """
+    Salva nello stato locale l'esito di una sincronizzazione.
+
+    I file rimossi localmente e gli ID legacy (senza nome, importati dal
+    vecchio .knowledge-base-ids) passano tra le versioni da cancellare solo
+    se nessun upload è fallito: altrimenti restano nello stato e su
+    Vapi.ai, e la KB remota non perde file che non sono stati sostituiti.
+
+    Args:
+        stale_ids: ID delle versioni sostituite da un upload riuscito
+        legacy_ids: ID legacy da cancellare a sincronizzazione completa
+        failed: Numero di upload falliti in questa sincronizzazione
+
+    Returns:
+        tuple: (ID da linkare, ID da cancellare dopo il link)
+    """
+    stale_ids = list(stale_ids)
+    legacy_ids = list(legacy_ids)
+    removed = sorted(set(manifest) - set(present_names))
+    if failed:
+        if removed or legacy_ids:
+            print("⚠️  {} upload falliti: {} file rimossi e {} file legacy non cancellati "
+                  "(alla prossima sincronizzazione)".format(failed, len(removed), len(legacy_ids)))
     else:
+        for name in removed:
+            print("Rimosso localmente: {}".format(name))
+            stale_ids.append(manifest.pop(name)["file_id"])
+        stale_ids += legacy_ids
+        legacy_ids = []
+
+    file_ids = save_manifest(manifest, legacy_ids, stale_ids)
+    print("✓ Manifest salvato in .vapi-state.db")
+    return file_ids, stale_ids
+
+
+def relink(file_ids, stale_ids, changed):
+    """
+    Linka la KB all'assistente e poi cancella le versioni sostituite.
+
+    Le versioni sostituite vengono cancellate solo dopo un link riuscito
+    (o se non c'è un assistente che le usa): se il link fallisce restano
+    su Vapi.ai e nello stato, l'assistente continua a usare i file
+    precedenti e la cancellazione viene ritentata alla prossima
+    sincronizzazione.
+
+    Args:
+        file_ids: ID dei file del manifest
+        stale_ids: ID da cancellare dopo il link
+        changed: True se l'elenco dei file è cambiato
+
+    Returns:
+        bool: True se la knowledge base remota è allineata
+    """
+    if not file_ids:
         print("\n❌ Nessun file caricato con successo")
+        return False
+
+    if not changed and not stale_ids:
+        print("\n✓ Knowledge Base già allineata, nessun link necessario")
+        return True
+
+    # Auto-link se esiste assistente
+    if get_assistant_id():
+        if not link_to_assistant(file_ids):
+            if stale_ids:
+                print("⚠️  {} versioni precedenti mantenute fino al prossimo link riuscito".format(
+                    len(stale_ids)))
+            return False
+    else:
+        link_to_assistant(file_ids)
+        print("\n📋 Prossimo step:")
+        print("   python scripts/update_assistant.py")
+
+    store = state_store.get_store()
+    for file_id in stale_ids:
+        if delete_file(file_id):
+            store.delete(state_store.KB_FILE, f"{state_store.STALE_PREFIX}{file_id}")
+    return True
+
+
+def finalize_sync(manifest, present_names, stale_ids, changed, legacy_ids=(), failed=0):
+    """
+    Chiude una sincronizzazione: salva il manifest, linka la KB
+    all'assistente se l'elenco dei file è cambiato e infine cancella su
+    Vapi.ai le versioni sostituite (vedi save_sync e relink).
+
+    Returns:
+        bool: True se la knowledge base remota è allineata
+    """
+    file_ids, stale_ids = save_sync(manifest, present_names, stale_ids, legacy_ids, failed)
+    return relink(file_ids, stale_ids, changed)
+
+
+def upload_all(force=False, concurrency=DEFAULT_CONCURRENCY):
+    """Sincronizza i file della knowledge base (solo nuovi/modificati)."""
+
+    if not VAPI_API_KEY:
+        print("ERRORE: VAPI_API_KEY non trovata!")
+        return False
+
+    md_files = sorted(KB_DIR.glob("*.md"))
+
+    if not md_files:
+        print("ERRORE: Nessun file .md trovato in knowledge-base/")
+        return False
+
+    manifest, legacy_ids, stale_ids = load_manifest()
+    if legacy_ids:
+        print("⚠️  Manifest assente: {} file caricati in precedenza verranno sostituiti".format(len(legacy_ids)))
+
+    print("Trovati {} file in knowledge-base/ ({} upload in parallelo)\n".format(len(md_files), concurrency))
+
+    results = sync_files(md_files, manifest, stale_ids, force, concurrency)
+    print_sync_summary(results)
+
+    # Un file fallito resta nel manifest con la versione precedente, ancora
+    # valida; con upload falliti i file rimossi e legacy non vengono cancellati
+    synced = finalize_sync(
+        manifest,
+        [f.name for f in md_files],
+        stale_ids,
+        changed=results["uploaded"] > 0 or bool(legacy_ids),
+        legacy_ids=legacy_ids,
+        failed=results["failed"]
+    )
+
+    get_client().print_metrics()
+
+    return synced and not results["failed"]
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(
+        description="Carica la knowledge base su Vapi.ai (solo file nuovi o modificati)"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ricarica tutti i file ignorando il manifest"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Upload in parallelo (default: {DEFAULT_CONCURRENCY})"
+    )
+    args = parser.parse_args()
+
+    success = upload_all(force=args.force, concurrency=args.concurrency)
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":
-    upload_all()
+    main()
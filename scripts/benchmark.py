@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end degli script Vapi contro il server mock locale.
+
+Per ogni dimensione della knowledge base (default 10/100/1000 file) avvia
+un mock pulito, con stato locale in una directory temporanea, e misura:
+- upload_all: primo caricamento, rilancio senza modifiche, 10% modificati
+- create_all_tools: prima creazione e rilancio (upsert idempotente)
+- update_assistant: primo allineamento e rilancio (già in sync)
+
+Non tocca né la rete né i file del progetto. I risultati si possono
+salvare in JSON e confrontare con un'esecuzione precedente per
+individuare regressioni.
+
+Uso:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --sizes 10 100 --latency 30 --save bench.json
+    python scripts/benchmark.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+ROOT_DIR = SCRIPTS_DIR.parent
+KB_SAMPLES_DIR = ROOT_DIR / 'knowledge-base'
+
+DEFAULT_SIZES = (10, 100, 1000)
+MODIFIED_SHARE = 0.1
+MIN_REGRESSION_SECONDS = 0.05   # Sotto questa differenza è rumore di misura
+
+
+def load_script(filename, module_name):
+    """Importa uno script di scripts/ (anche con nome non importabile)."""
+    spec = importlib.util.spec_from_file_location(module_name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_knowledge_base(kb_dir, count):
+    """Genera `count` file Markdown a partire dai file reali di knowledge-base/."""
+    samples = [path.read_text(encoding='utf-8') for path in sorted(KB_SAMPLES_DIR.glob('*.md'))]
+    if not samples:
+        samples = ["# Servizio\n\nDescrizione del servizio comunale.\n" * 20]
+
+    kb_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        content = samples[i % len(samples)]
+        (kb_dir / f"servizio-{i:04d}.md").write_text(f"{content}\n<!-- {i} -->\n", encoding='utf-8')
+
+
+def modify_files(kb_dir, share):
+    """Modifica una quota dei file (nuova versione da caricare)."""
+    files = sorted(kb_dir.glob('*.md'))
+    step = max(1, round(1 / share))
+    for path in files[::step]:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("\nAggiornamento.\n")
+
+
+class Benchmark:
+    """Esegue gli scenari e raccoglie i risultati."""
+
+    def __init__(self, client_module, verbose=False):
+        self.client_module = client_module
+        self.verbose = verbose
+        self.results = []
+
+    def run(self, scenario, files, func):
+        """Esegue uno scenario, misurando tempo e richieste API."""
+        client = self.client_module.get_client()
+        client.reset_metrics()
+
+        output = io.StringIO()
+        redirect = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(output)
+        start = time.perf_counter()
+        with redirect:
+            ok = bool(func())
+        elapsed = time.perf_counter() - start
+
+        metrics = client.metrics.values()
+        result = {
+            'scenario': scenario,
+            'files': files,
+            'seconds': round(elapsed, 4),
+            'requests': sum(m.requests for m in metrics),
+            'retries': sum(m.retries for m in metrics),
+            'ok': ok,
+        }
+        self.results.append(result)
+
+        status = '✓' if ok else '✗'
+        print(f"  {status} {scenario:<32} {elapsed:>8.2f}s {result['requests']:>6} rich. "
+              f"{result['retries']:>4} retry")
+        return result
+
+
+def run_size(bench, count, server, concurrency):
+    """Tutti gli scenari per una knowledge base di `count` file."""
+    import state_store
+    import vapi_client
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ['VAPI_STATE_DB'] = str(tmp / 'state.db')
+        state_store.reset_store()
+        vapi_client.reset_client()
+        server.state.reset()
+
+        upload = load_script('3_upload_knowledge_base.py', 'bench_upload')
+        tools = load_script('1_create_tool.py', 'bench_tools')
+        update = load_script('update_assistant.py', 'bench_update')
+
+        upload.KB_DIR = tmp / 'knowledge-base'
+        write_knowledge_base(upload.KB_DIR, count)
+
+        # Assistente di partenza, creato dal template come fa 0_create_assistant.py
+        template = update.load_template_config() or {'name': 'Benchmark'}
+        template.get('model', {}).pop('knowledgeBase', None)
+        response = vapi_client.get_client().post('/assistant', json=template)
+        state_store.save_assistant_id(response.json()['id'])
+
+        print(f"\n📦 {count} file")
+        bench.run('upload_all (primo caricamento)', count,
+                  lambda: upload.upload_all(concurrency=concurrency))
+        bench.run('upload_all (nessuna modifica)', count,
+                  lambda: upload.upload_all(concurrency=concurrency))
+        modify_files(upload.KB_DIR, MODIFIED_SHARE)
+        bench.run(f'upload_all ({MODIFIED_SHARE:.0%} modificati)', count,
+                  lambda: upload.upload_all(concurrency=concurrency))
+
+        bench.run('create_all_tools (creazione)', count, tools.create_all_tools)
+        bench.run('create_all_tools (rilancio)', count, tools.create_all_tools)
+
+        # Deriva della config live: nome e prompt diversi dal template
+        client = vapi_client.get_client()
+        assistant_id = state_store.get_assistant_id()
+        live = client.get(f'/assistant/{assistant_id}').json()
+        live_model = dict(live.get('model', {}), messages=[])
+        client.patch(f'/assistant/{assistant_id}', json={'name': 'Da allineare', 'model': live_model})
+
+        bench.run('update_assistant (allineamento)', count, update.update_assistant)
+        bench.run('update_assistant (già in sync)', count, update.update_assistant)
+
+        state_store.reset_store()
+
+
+def compare_with_baseline(results, baseline_path, tolerance):
+    """
+    Confronta tempi e numero di richieste con un'esecuzione precedente.
+
+    Un tempo conta come regressione solo se supera la tolleranza e anche
+    MIN_REGRESSION_SECONDS; più richieste API della baseline contano sempre.
+
+    Returns:
+        list: Scenari più lenti della baseline oltre la tolleranza
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['scenario'], r['files']): r for r in json.load(f)['results']}
+
+    regressions = []
+    print(f"\n📊 Confronto con {baseline_path} (tolleranza {tolerance:.0%})")
+    for result in results:
+        previous = baseline.get((result['scenario'], result['files']))
+        if not previous:
+            continue
+        ratio = result['seconds'] / previous['seconds'] if previous['seconds'] else 1.0
+        slower = result['seconds'] - previous['seconds'] > MIN_REGRESSION_SECONDS
+        regressed = (ratio > 1 + tolerance and slower) or result['requests'] > previous['requests']
+        marker = '❌' if regressed else '  '
+        print(f"{marker} {result['scenario']:<32} {result['files']:>5} file "
+              f"{previous['seconds']:>8.2f}s → {result['seconds']:>8.2f}s ({ratio - 1:+.0%}), "
+              f"{previous['requests']} → {result['requests']} rich.")
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Benchmark degli script Vapi sul server mock')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='Numero di file KB per esecuzione (default: 10 100 1000)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Upload in parallelo (default: 8)')
+    parser.add_argument('--latency', type=float, default=20,
+                        help='Latenza del mock in ms (default: 20)')
+    parser.add_argument('--jitter', type=float, default=10,
+                        help='Jitter del mock in ms (default: 10)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Probabilità di errore 500/503 del mock (default: 0)')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='Rate limit del mock in richieste/s (default: nessuno)')
+    parser.add_argument('--client-rate', type=float, default=0,
+                        help='Rate limit del client in richieste/s (default: nessuno)')
+    parser.add_argument('--save', metavar='FILE', help='Salva i risultati in JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Confronta con risultati salvati')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Rallentamento ammesso rispetto alla baseline (default: 0.2)')
+    parser.add_argument('--verbose', action='store_true', help="Mostra l'output degli script")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from mock_vapi_server import MockServer, create_app
+    import vapi_client
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.rate_limit, seed=42)
+    with MockServer(app) as server:
+        # Prima di importare gli script: leggono l'ambiente all'import
+        os.environ.update({
+            'VAPI_BASE_URL': server.url,
+            'VAPI_API_KEY': 'mock-key',
+            'MAILTRAP_API_TOKEN': 'mock-token',
+            'TOOL_SERVER_URL': 'http://127.0.0.1:8080',
+            'VAPI_RATE_LIMIT': str(args.client_rate),
+        })
+
+        print("=" * 72)
+        print("BENCHMARK SCRIPT VAPI (server mock)")
+        print("=" * 72)
+        print(f"Mock: {server.url}, latenza {args.latency:.0f}±{args.jitter:.0f}ms, "
+              f"errori {args.error_rate:.0%}, rate limit {args.rate_limit or '-'}")
+
+        bench = Benchmark(vapi_client, verbose=args.verbose)
+        for count in args.sizes:
+            run_size(bench, count, server, args.concurrency)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': bench.results}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Risultati salvati in {args.save}")
+
+    failed = [r for r in bench.results if not r['ok']]
+    regressions = compare_with_baseline(bench.results, args.baseline, args.tolerance) if args.baseline else []
+
+    if failed:
+        print(f"\n❌ {len(failed)} scenari falliti")
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressioni oltre la tolleranza")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
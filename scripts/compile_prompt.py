@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Compila il system prompt dell'assistente entro un budget di token.
+
+Il prompt (config/vapi-system-prompt-with-tools.txt) viene inviato come
+messaggio di sistema a ogni turno della conversazione: ogni token in più
+si paga in latenza prima della prima parola al telefono.
+
+Fasi:
+1. Divide il prompt in sezioni (titoli "TITOLO:", sottosezioni numerate
+   "1. TITOLO", blocchi "**Titolo:**", esempi "Esempio N - ...:")
+2. Stima i token di ogni sezione
+3. Cerca gli esempi ripetuti: stesse domande dell'utente ("Utente: ...")
+   di un esempio precedente, confrontate senza parole vuote
+4. Se il prompt supera il budget, rimuove prima gli esempi ripetuti e poi
+   le parti sacrificabili per livelli: gli esempi, poi i dettagli sui servizi già presenti
+   nella knowledge base (raggiungibili con search_services), infine la
+   conversazione di esempio completa. Le regole non vengono mai toccate.
+
+Se non viene rimosso nulla il testo resta identico byte per byte
+all'originale. Le regole da sole valgono circa 4700 token (stima senza
+tiktoken): è il budget minimo raggiungibile, sotto il quale vanno
+spostati altri dettagli nella knowledge base.
+
+Il conteggio usa tiktoken se installato, altrimenti una stima
+(circa 4 caratteri per token, simboli ed emoji contati a parte).
+
+Uso:
+    python scripts/compile_prompt.py --report
+    python scripts/compile_prompt.py --budget 3500 --output /tmp/prompt.txt
+
+update_assistant.py e 0_create_assistant.py compilano il prompt con il
+budget di PROMPT_TOKEN_BUDGET (0 o non impostato = nessun limite: il
+prompt viene inviato così com'è, gli esempi ripetuti sono solo segnalati).
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('o200k_base')
+except Exception:
+    _ENCODING = None
+
+PROMPT_PATH = Path(__file__).parent.parent / 'config' / 'vapi-system-prompt-with-tools.txt'
+
+SECTION_RE = re.compile(r"^[A-ZÀ-Ý][A-ZÀ-Ý0-9 '\-]*:$")
+SUBSECTION_RE = re.compile(r"^\d+\. [A-ZÀ-Ý][A-ZÀ-Ý0-9 '\-]*$")
+BLOCK_RE = re.compile(r"^\*\*(.+?):?\*\*:?$")
+EXAMPLE_RE = re.compile(r"^(Esempio \d+ - .*):$")
+INLINE_EXAMPLE_RE = re.compile(r"^\s+Esempio( \w+)?:$")
+
+WORD_RE = re.compile(r"\w+|[^\w\s]")
+USER_LINE_RE = re.compile(r"^\s*Utente:\s*(.*)$")
+DUPLICATE_THRESHOLD = 0.8     # Jaccard minimo tra le parole di due esempi
+# Parole che non distinguono un esempio dall'altro (articoli, preposizioni,
+# verbi di servizio, lessico comune a tutti gli esempi del prompt)
+STOPWORDS = frozenset("""
+a ad al alla alle allo anche che chi ci come con cosa da dal dalla dei del della delle di e è
+gli ha hai ho i il in la le lo ma mi ne nel nella non o per più può posso puoi se si sono su
+sul sulla ti tu un una uno vuoi voglio vorrei utente kb consulta grazie sì
+""".split())
+
+# Livelli di rimozione, dal primo sacrificato all'ultimo (match sul titolo)
+DROP_LEVELS = [
+    ('esempi', re.compile(r"^(Esempio \d+|ESEMPI |Domanda \d+)")),
+    ('dettagli KB', re.compile(r"^(SERVIZI DISPONIBILI NELLA KB|COSA ESTRARRE DALLA KNOWLEDGE BASE)")),
+    ('conversazione di esempio', re.compile(r"^ESEMPIO CONVERSAZIONE")),
+]
+EXAMPLE_LEVEL = 'esempi'
+
+
+def get_budget():
+    """Budget di token da PROMPT_TOKEN_BUDGET (0 = nessun limite)."""
+    try:
+        return max(0, int(os.getenv('PROMPT_TOKEN_BUDGET', '0')))
+    except ValueError:
+        print("⚠️  PROMPT_TOKEN_BUDGET non valido, nessun limite applicato")
+        return 0
+
+
+def count_tokens(text):
+    """Token del testo (tiktoken se disponibile, altrimenti stima)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+
+    tokens = 0
+    for piece in WORD_RE.findall(text):
+        if piece[0].isalnum() or piece[0] == '_':
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1 if piece.isascii() else 2
+    return tokens
+
+
+def parse_sections(text):
+    """
+    Divide il prompt in sezioni.
+
+    Returns:
+        list[dict]: Sezioni in ordine, con title, level (0 = introduzione,
+        1 = titolo, 2 = sottosezione numerata, 3 = blocco, 4 = esempio),
+        lines (titolo compreso) ed end (indice dopo l'ultima sottosezione)
+    """
+    sections = [{'title': '', 'level': 0, 'lines': []}]
+    for line in text.splitlines():
+        stripped = line.rstrip()
+        match = BLOCK_RE.match(stripped)
+        example = EXAMPLE_RE.match(stripped)
+        if SECTION_RE.match(stripped):
+            title, level = stripped[:-1], 1
+        elif SUBSECTION_RE.match(stripped):
+            title, level = stripped, 2
+        elif match:
+            title, level = match.group(1).rstrip(':'), 3
+        elif example:
+            title, level = example.group(1), 4
+        else:
+            sections[-1]['lines'].append(stripped)
+            continue
+        sections.append({'title': title, 'level': level, 'lines': [stripped]})
+
+    for i, section in enumerate(sections):
+        end = i + 1
+        while end < len(sections) and sections[end]['level'] > section['level'] > 0:
+            end += 1
+        section['end'] = end
+        section['tokens'] = count_tokens('\n'.join(section['lines']))
+    return sections
+
+
+def _words(lines):
+    """Parole significative di un esempio: solo le righe "Utente:", se ci sono."""
+    user_lines = [match.group(1) for match in map(USER_LINE_RE.match, lines) if match]
+    words = re.findall(r"\w+", ' '.join(user_lines or lines).lower())
+    return {word for word in words if len(word) > 1 and word not in STOPWORDS}
+
+
+def find_duplicate_examples(sections):
+    """
+    Indici degli esempi che ripetono un esempio precedente.
+
+    Un esempio è un duplicato se la similarità di Jaccard tra le sue parole
+    significative (domande dell'utente, senza STOPWORDS) e quelle di un
+    singolo esempio precedente è almeno DUPLICATE_THRESHOLD.
+    """
+    pattern = dict(DROP_LEVELS)[EXAMPLE_LEVEL]
+    seen, duplicates = [], []
+    for i, section in enumerate(sections):
+        if section['level'] < 3 or not pattern.match(section['title']):
+            continue
+        words = _words(section['lines'][1:])
+        if not words:
+            continue
+        if any(len(words & previous) / len(words | previous) >= DUPLICATE_THRESHOLD for previous in seen):
+            duplicates.append(i)
+        else:
+            seen.append(words)
+    return duplicates
+
+
+def strip_inline_examples(lines):
+    """Rimuove gli esempi indentati ("   Esempio:" fino alla riga vuota)."""
+    kept, skipping = [], False
+    for line in lines:
+        if INLINE_EXAMPLE_RE.match(line):
+            skipping = True
+        elif skipping and not line.strip():
+            skipping = False
+        if not skipping:
+            kept.append(line)
+    return kept
+
+
+def render(sections, dropped):
+    """Testo del prompt senza le sezioni rimosse (e i loro figli)."""
+    out = []
+    i = 0
+    while i < len(sections):
+        section = sections[i]
+        if i in dropped:
+            i = section['end'] if section['level'] else i + 1
+            continue
+        out.extend(section['lines'])
+        i += 1
+
+    text = re.sub(r"\n{3,}", "\n\n", '\n'.join(out)).strip()
+    return text + '\n'
+
+
+def _drop_empty_headers(sections, dropped):
+    """Rimuove i titoli rimasti senza contenuto (tutti i figli rimossi)."""
+    for i, section in enumerate(sections):
+        if i in dropped or any(line.strip() for line in section['lines'][1:]):
+            continue
+        children = range(i + 1, section['end'])
+        if children and all(child in dropped for child in children):
+            dropped.add(i)
+
+
+def compile_prompt(text, budget=0):
+    """
+    Compila il prompt entro `budget` token (0 = nessun limite).
+
+    Returns:
+        dict: text, tokens, original_tokens, budget, sections, duplicates
+        (titoli degli esempi ripetuti), deduplicated (True se sono stati
+        rimossi: solo con il budget superato), dropped (livello, titolo) e
+        over_budget (True se anche rimuovendo tutto il sacrificabile
+        il budget non è rispettato: tokens è allora il minimo raggiungibile)
+    """
+    sections = parse_sections(text)
+    original_tokens = count_tokens(text)
+
+    duplicates = find_duplicate_examples(sections)
+    deduplicated = bool(budget) and original_tokens > budget and bool(duplicates)
+    dropped = set(duplicates) if deduplicated else set()
+    _drop_empty_headers(sections, dropped)
+    removed = []
+
+    # Senza rimozioni il testo resta quello originale, spazi compresi
+    result = render(sections, dropped) if dropped else text
+    tokens = count_tokens(result)
+
+    for level, pattern in DROP_LEVELS:
+        if not budget or tokens <= budget:
+            break
+
+        if level == EXAMPLE_LEVEL:
+            for section in sections:
+                section['lines'] = strip_inline_examples(section['lines'])
+                section['tokens'] = count_tokens('\n'.join(section['lines']))
+            removed.append((level, 'esempi indentati'))
+            result = render(sections, dropped)
+            tokens = count_tokens(result)
+
+        candidates = [
+            i for i, section in enumerate(sections)
+            if i not in dropped and section['level'] and pattern.match(section['title'])
+        ]
+        candidates.sort(key=lambda i: -sum(s['tokens'] for s in sections[i:sections[i]['end']]))
+        for i in candidates:
+            if tokens <= budget:
+                break
+            if i in dropped:
+                continue
+            dropped.add(i)
+            dropped.update(range(i + 1, sections[i]['end']))
+            _drop_empty_headers(sections, dropped)
+            removed.append((level, sections[i]['title']))
+            result = render(sections, dropped)
+            tokens = count_tokens(result)
+
+    return {
+        'text': result,
+        'tokens': tokens,
+        'original_tokens': original_tokens,
+        'budget': budget,
+        'sections': sections,
+        'duplicates': [sections[i]['title'] for i in duplicates],
+        'deduplicated': deduplicated,
+        'dropped': removed,
+        'over_budget': bool(budget) and tokens > budget,
+    }
+
+
+def load_compiled_prompt(path=PROMPT_PATH, budget=None):
+    """
+    Legge e compila il prompt (budget da PROMPT_TOKEN_BUDGET se None).
+
+    Returns:
+        str: Prompt compilato
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        compiled = compile_prompt(f.read(), get_budget() if budget is None else budget)
+
+    print("📝 System prompt: {} → {} token".format(compiled['original_tokens'], compiled['tokens']))
+    if compiled['over_budget']:
+        print("⚠️  Budget di {} token superato anche rimuovendo le parti sacrificabili "
+              "(minimo raggiungibile: {} token)".format(compiled['budget'], compiled['tokens']))
+    return compiled['text']
+
+
+def print_report(compiled):
+    """Tabella dei token per sezione."""
+    print(f"\n{'Token':>6}  Sezione")
+    print(f"{'-' * 6}  {'-' * 60}")
+    for section in compiled['sections']:
+        title = section['title'] or '(introduzione)'
+        indent = '  ' * max(0, section['level'] - 1)
+        print(f"{section['tokens']:>6}  {indent}{title[:60 - len(indent)]}")
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Compila il system prompt entro un budget di token')
+    parser.add_argument('--prompt', default=str(PROMPT_PATH), help='File del prompt sorgente')
+    parser.add_argument('--budget', type=int, default=None,
+                        help='Budget di token (default: PROMPT_TOKEN_BUDGET, 0 = nessun limite)')
+    parser.add_argument('--output', help='Scrive il prompt compilato su questo file')
+    parser.add_argument('--report', action='store_true', help='Mostra i token per sezione')
+    args = parser.parse_args()
+
+    with open(args.prompt, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    budget = get_budget() if args.budget is None else args.budget
+    compiled = compile_prompt(text, budget)
+
+    print("=" * 60)
+    print("COMPILAZIONE SYSTEM PROMPT")
+    print("=" * 60)
+    print(f"Conteggio: {'tiktoken (o200k_base)' if _ENCODING else 'stima ~4 caratteri/token'}")
+
+    if args.report:
+        print_report(compiled)
+
+    print()
+    for title in compiled['duplicates']:
+        if compiled['deduplicated']:
+            print(f"♻️  Esempio ripetuto rimosso: {title}")
+        else:
+            print(f"♻️  Esempio simile a uno precedente (non rimosso, budget non superato): {title}")
+    for level, title in compiled['dropped']:
+        print(f"✂️  Rimosso ({level}): {title}")
+
+    saved = compiled['original_tokens'] - compiled['tokens']
+    print(f"\nToken: {compiled['original_tokens']} → {compiled['tokens']} (-{saved})"
+          + (f", budget {budget}" if budget else ''))
+    print(f"Caratteri: {len(text)} → {len(compiled['text'])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(compiled['text'])
+        print(f"✓ Prompt compilato salvato in {args.output}")
+
+    if compiled['over_budget']:
+        print(f"\n⚠️  Budget di {budget} token non rispettato: restano solo regole non sacrificabili "
+              f"(minimo raggiungibile: {compiled['tokens']} token)")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,6 @@ Mostra informazioni sull'assistente configurato.
 Utile per verificare lo stato corrente.
 """
 
-import requests
 import os
 import sys
 import json
@@ -18,17 +17,10 @@ try:
 except ImportError:
     pass
 
-VAPI_API_KEY = os.getenv('VAPI_API_KEY')
-VAPI_BASE_URL = 'https://api.vapi.ai'
-
-def get_assistant_id():
-    """Legge l'ID dell'assistente salvato."""
-    id_file = Path(__file__).parent.parent / '.assistant-id'
-    if not id_file.exists():
-        return None
+from state_store import get_assistant_id
+from vapi_client import get_client
 
-    with open(id_file, 'r') as f:
-        return f.read().strip()
+VAPI_API_KEY = os.getenv('VAPI_API_KEY')
 
 def get_assistant_info():
     """Recupera info sull'assistente da Vapi.ai."""
@@ -39,22 +31,15 @@ def get_assistant_info():
 
     assistant_id = get_assistant_id()
     if not assistant_id:
-        print("ERRORE: File .assistant-id non trovato")
+        print("ERRORE: Nessun assistente configurato")
         print("Esegui prima: python scripts/create_assistant.py")
         return None
 
-    headers = {
-        'Authorization': 'Bearer {}'.format(VAPI_API_KEY)
-    }
-
     print("Recupero informazioni assistente...")
     print("ID: {}".format(assistant_id))
     print()
 
-    response = requests.get(
-        '{}/assistant/{}'.format(VAPI_BASE_URL, assistant_id),
-        headers=headers
-    )
+    response = get_client().get('/assistant/{}'.format(assistant_id))
 
     if response.status_code == 200:
         return response.json()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Server mock locale delle API Vapi.ai, per provare gli script senza rete.
+
+Emula gli endpoint usati dagli script (/assistant, /tool, /file,
+/credential) con dati in memoria, più:
+- latenza configurabile (fissa + jitter)
+- errori casuali 500/503 con probabilità configurabile
+- rate limit token bucket con risposta 429 + Retry-After
+
+Endpoint di servizio:
+    GET  /_mock/stats    Richieste ricevute per endpoint, byte caricati
+    POST /_mock/reset    Svuota dati e statistiche
+
+Uso:
+    python scripts/mock_vapi_server.py --port 8787 --latency 50 --error-rate 0.02
+    VAPI_BASE_URL=http://127.0.0.1:8787 python scripts/3_upload_knowledge_base.py
+"""
+
+import argparse
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+from vapi_client import TokenBucket, endpoint_key
+
+RESOURCES = ('assistant', 'tool', 'file', 'credential')
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class MockState:
+    """Dati in memoria e statistiche del server mock."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.resources = {name: {} for name in RESOURCES}
+            self.requests = Counter()
+            self.bytes_uploaded = 0
+
+
+def create_app(latency_ms=0, jitter_ms=0, error_rate=0.0, rate_limit=0, seed=None):
+    """
+    Crea l'app Flask del mock.
+
+    Args:
+        latency_ms: Latenza aggiunta a ogni risposta
+        jitter_ms: Variazione casuale massima della latenza
+        error_rate: Probabilità (0-1) di rispondere 500/503
+        rate_limit: Richieste/secondo accettate (0 = nessun limite)
+        seed: Seed per errori e jitter riproducibili
+    """
+    app = Flask(__name__)
+    state = MockState()
+    rng = random.Random(seed)
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    app.config['MOCK_STATE'] = state
+
+    @app.before_request
+    def simulate_network():
+        if request.path.startswith('/_mock/'):
+            return None
+
+        with state.lock:
+            state.requests[endpoint_key(request.method, request.path)] += 1
+            delay = latency_ms + rng.uniform(0, jitter_ms)
+            fail = rng.random() < error_rate
+            status = rng.choice((500, 503))
+
+        if delay:
+            time.sleep(delay / 1000)
+
+        if not request.headers.get('Authorization', '').startswith('Bearer '):
+            return jsonify({'message': 'Unauthorized'}), 401
+
+        if limiter and not limiter.try_acquire():
+            response = jsonify({'message': 'Too Many Requests'})
+            response.headers['Retry-After'] = '1'
+            return response, 429
+
+        if fail:
+            return jsonify({'message': 'Simulated server error'}), status
+        return None
+
+    def store(name):
+        return state.resources[name]
+
+    def not_found(name, resource_id):
+        return jsonify({'message': f'{name} {resource_id} not found'}), 404
+
+    def create(name, data):
+        resource = dict(data)
+        resource.update({
+            'id': str(uuid.uuid4()),
+            'orgId': 'mock-org',
+            'createdAt': _now(),
+            'updatedAt': _now(),
+        })
+        with state.lock:
+            store(name)[resource['id']] = resource
+        return jsonify(resource), 201
+
+    def list_resources(name):
+        with state.lock:
+            items = list(store(name).values())
+        limit = request.args.get('limit', type=int)
+        return jsonify(items[:limit] if limit else items)
+
+    def get_one(name, resource_id):
+        with state.lock:
+            resource = store(name).get(resource_id)
+        return jsonify(resource) if resource else not_found(name, resource_id)
+
+    def update(name, resource_id):
+        data = request.get_json(silent=True) or {}
+        with state.lock:
+            resource = store(name).get(resource_id)
+            if resource is None:
+                return not_found(name, resource_id)
+            # Come l'API reale: i campi di primo livello sono sostituiti per intero
+            resource.update(data)
+            resource['updatedAt'] = _now()
+            return jsonify(resource)
+
+    def delete(name, resource_id):
+        with state.lock:
+            resource = store(name).pop(resource_id, None)
+        return jsonify(resource) if resource else not_found(name, resource_id)
+
+    for name in ('assistant', 'tool', 'credential'):
+        def collection(name=name):
+            if request.method == 'POST':
+                return create(name, request.get_json(silent=True) or {})
+            return list_resources(name)
+
+        def item(resource_id, name=name):
+            if request.method == 'PATCH':
+                return update(name, resource_id)
+            if request.method == 'DELETE':
+                return delete(name, resource_id)
+            return get_one(name, resource_id)
+
+        app.add_url_rule(f'/{name}', f'{name}_collection', collection, methods=['GET', 'POST'])
+        app.add_url_rule(f'/{name}/<resource_id>', f'{name}_item', item,
+                         methods=['GET', 'PATCH', 'DELETE'])
+
+    @app.route('/file', methods=['GET', 'POST'])
+    def file_collection():
+        if request.method == 'GET':
+            return list_resources('file')
+
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'message': 'file is required'}), 400
+
+        content = upload.read()
+        with state.lock:
+            state.bytes_uploaded += len(content)
+        return create('file', {
+            'name': upload.filename,
+            'mimetype': upload.mimetype,
+            'bytes': len(content),
+            'status': 'done',
+        })
+
+    @app.route('/file/<resource_id>', methods=['GET', 'DELETE'])
+    def file_item(resource_id):
+        if request.method == 'DELETE':
+            return delete('file', resource_id)
+        return get_one('file', resource_id)
+
+    @app.route('/_mock/stats')
+    def stats():
+        with state.lock:
+            return jsonify({
+                'requests': dict(state.requests),
+                'total_requests': sum(state.requests.values()),
+                'bytes_uploaded': state.bytes_uploaded,
+                'resources': {name: len(items) for name, items in state.resources.items()},
+            })
+
+    @app.route('/_mock/reset', methods=['POST'])
+    def reset():
+        state.reset()
+        return jsonify({'ok': True})
+
+    return app
+
+
+class MockServer:
+    """Server mock in un thread in background (per benchmark e prove)."""
+
+    def __init__(self, app, host='127.0.0.1', port=0, quiet=True):
+        if quiet:
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        self.app = app
+        self._server = make_server(host, port, app, threaded=True)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def state(self):
+        return self.app.config['MOCK_STATE']
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._thread.join()
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Server mock delle API Vapi.ai')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Latenza per risposta in ms (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0,
+                        help='Jitter massimo in ms (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Probabilità di errore 500/503, 0-1 (default: 0)')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='Richieste/secondo prima di rispondere 429 (default: nessun limite)')
+    parser.add_argument('--seed', type=int, help='Seed per errori/jitter riproducibili')
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.rate_limit, args.seed)
+    print(f"🧪 Mock Vapi su http://{args.host}:{args.port}")
+    print(f"   export VAPI_BASE_URL=http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Stato locale degli script: ID delle risorse remote su Vapi.ai.
+
+Un unico database SQLite (.vapi-state.db nella root del progetto) sostituisce
+.assistant-id, .tool-ids, .knowledge-base-ids, .secret-ids.json e i manifest
+JSON. Ogni risorsa è una riga (tipo, chiave) → ID remoto, hash della
+configurazione/contenuto e timestamp.
+
+- Scritture transazionali (niente file riscritti a metà)
+- WAL + busy timeout: più script possono girare in contemporanea
+- Cache in-process, invalidata quando un altro processo modifica il DB
+  (PRAGMA data_version)
+
+Al primo avvio i vecchi file vengono importati automaticamente (e lasciati
+al loro posto, non vengono più letti).
+
+Uso da linea di comando:
+    python scripts/state_store.py                        # Tutte le risorse
+    python scripts/state_store.py tool                   # Solo un tipo
+    python scripts/state_store.py --set-assistant ID     # Usa un assistente esistente
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+DEFAULT_DB_FILE = ROOT_DIR / '.vapi-state.db'
+
+# Tipi di risorsa
+ASSISTANT = 'assistant'
+TOOL = 'tool'
+KB_FILE = 'kb_file'
+CREDENTIAL = 'credential'
+
+DEFAULT_KEY = 'default'       # Chiave dell'assistente (uno per progetto)
+LEGACY_PREFIX = 'legacy:'     # File KB importati senza manifest (nome ignoto)
+STALE_PREFIX = 'stale:'       # Versioni KB sostituite, da cancellare dopo il link
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    kind        TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    remote_id   TEXT NOT NULL,
+    hash        TEXT,
+    created_at  REAL NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+
+class StateStore:
+    """Database SQLite delle risorse remote; thread-safe."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.getenv('VAPI_STATE_DB') or DEFAULT_DB_FILE)
+        is_new = not self.path.exists()
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        self._cache = {}
+        self._data_version = None
+
+        if is_new:
+            self._migrate_legacy_files()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Transazioni e cache ---
+
+    @contextmanager
+    def transaction(self):
+        """Transazione atomica (BEGIN IMMEDIATE: un solo scrittore alla volta)."""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            else:
+                self._conn.execute('COMMIT')
+            finally:
+                self._cache.clear()
+
+    def _rows(self, kind):
+        """Risorse di un tipo, dalla cache se il DB non è cambiato."""
+        with self._lock:
+            version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            if version != self._data_version:
+                self._cache.clear()
+                self._data_version = version
+
+            if kind not in self._cache:
+                rows = self._conn.execute(
+                    'SELECT key, remote_id, hash, created_at, updated_at '
+                    'FROM resources WHERE kind = ? ORDER BY key', (kind,)
+                ).fetchall()
+                self._cache[kind] = {
+                    row['key']: {
+                        'id': row['remote_id'],
+                        'hash': row['hash'],
+                        'created_at': row['created_at'],
+                        'updated_at': row['updated_at'],
+                    }
+                    for row in rows
+                }
+            return self._cache[kind]
+
+    # --- Query ---
+
+    def get(self, kind, key):
+        """Risorsa {id, hash, created_at, updated_at}, o None."""
+        entry = self._rows(kind).get(key)
+        return dict(entry) if entry else None
+
+    def get_id(self, kind, key):
+        """ID remoto di una risorsa, o None."""
+        entry = self._rows(kind).get(key)
+        return entry['id'] if entry else None
+
+    def all(self, kind):
+        """Tutte le risorse di un tipo: chiave → {id, hash, ...}."""
+        return {key: dict(entry) for key, entry in self._rows(kind).items()}
+
+    def ids(self, kind):
+        """ID remoti di un tipo, ordinati per chiave."""
+        return [entry['id'] for entry in self._rows(kind).values()]
+
+    # --- Scritture ---
+
+    def _upsert(self, conn, kind, key, remote_id, hash_value, now):
+        conn.execute(
+            'INSERT INTO resources (kind, key, remote_id, hash, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (kind, key) DO UPDATE SET '
+            'remote_id = excluded.remote_id, hash = excluded.hash, updated_at = excluded.updated_at',
+            (kind, key, remote_id, hash_value, now, now)
+        )
+
+    def set(self, kind, key, remote_id, hash_value=None):
+        """Crea o aggiorna una risorsa."""
+        with self.transaction() as conn:
+            self._upsert(conn, kind, key, remote_id, hash_value, time.time())
+
+    def delete(self, kind, key):
+        """Rimuove una risorsa."""
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM resources WHERE kind = ? AND key = ?', (kind, key))
+
+    def replace_all(self, kind, entries):
+        """
+        Sostituisce tutte le risorse di un tipo in un'unica transazione.
+
+        Args:
+            entries: dict chiave → {id, hash}
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                'DELETE FROM resources WHERE kind = ? AND key NOT IN (%s)'
+                % ','.join('?' * len(entries)),
+                (kind, *entries)
+            )
+            for key, entry in entries.items():
+                self._upsert(conn, kind, key, entry['id'], entry.get('hash'), now)
+
+    # --- Migrazione dai vecchi file ---
+
+    def _migrate_legacy_files(self):
+        """Importa .assistant-id, .tool-*, .knowledge-base-*, .secret-ids.json."""
+        imported = {}
+
+        def read_lines(name):
+            path = self.path.parent / name
+            if not path.exists():
+                return []
+            return [line.strip() for line in path.read_text().splitlines() if line.strip()]
+
+        def read_json(name):
+            path = self.path.parent / name
+            if not path.exists():
+                return {}
+            try:
+                return json.loads(path.read_text(encoding='utf-8'))
+            except (json.JSONDecodeError, OSError):
+                return {}
+
+        assistant = read_lines('.assistant-id')
+        if assistant:
+            imported[ASSISTANT] = {DEFAULT_KEY: {'id': assistant[0]}}
+
+        tools = read_json('.tool-manifest.json')
+        if not tools:
+            tools = {f"{LEGACY_PREFIX}{i:02d}": {'id': tool_id}
+                     for i, tool_id in enumerate(read_lines('.tool-ids'))}
+        if tools:
+            imported[TOOL] = {key: {'id': e['id'], 'hash': e.get('hash')} for key, e in tools.items()}
+
+        kb_files = read_json('.knowledge-base-manifest.json').get('files', {})
+        if kb_files:
+            imported[KB_FILE] = {name: {'id': e['file_id'], 'hash': e.get('hash')}
+                                 for name, e in kb_files.items()}
+        else:
+            legacy = read_lines('.knowledge-base-ids')
+            if legacy:
+                imported[KB_FILE] = {f"{LEGACY_PREFIX}{file_id}": {'id': file_id} for file_id in legacy}
+
+        secrets = read_json('.secret-ids.json')
+        if secrets:
+            imported[CREDENTIAL] = {name: {'id': secret_id} for name, secret_id in secrets.items()}
+
+        for kind, entries in imported.items():
+            self.replace_all(kind, entries)
+
+        if imported:
+            counts = ', '.join(f"{kind} {len(entries)}" for kind, entries in imported.items())
+            print(f"✓ Stato importato dai vecchi file in {self.path.name} ({counts})")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Store condiviso del processo (aperto alla prima chiamata)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = StateStore()
+        return _store
+
+
+def reset_store():
+    """Chiude lo store condiviso (es. dopo aver cambiato VAPI_STATE_DB)."""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = None
+
+
+# --- Scorciatoie usate dagli script ---
+
+def get_assistant_id():
+    """ID dell'assistente configurato, o None."""
+    return get_store().get_id(ASSISTANT, DEFAULT_KEY)
+
+
+def save_assistant_id(assistant_id):
+    """Salva l'ID dell'assistente."""
+    get_store().set(ASSISTANT, DEFAULT_KEY, assistant_id)
+
+
+def get_tool_ids():
+    """ID dei tool da linkare all'assistente."""
+    return get_store().ids(TOOL)
+
+
+def get_knowledge_base_ids():
+    """
+    ID dei file della knowledge base da linkare all'assistente.
+
+    Gli ID legacy valgono solo finché non esiste un manifest; le versioni
+    sostituite in attesa di cancellazione non vengono mai linkate.
+    """
+    entries = get_store().all(KB_FILE)
+    named = [entry['id'] for key, entry in entries.items()
+             if not key.startswith((LEGACY_PREFIX, STALE_PREFIX))]
+    return named or [entry['id'] for key, entry in entries.items() if key.startswith(LEGACY_PREFIX)]
+
+
+def get_secret_id(name):
+    """ID di una credential salvata, o None."""
+    return get_store().get_id(CREDENTIAL, name)
+
+
+def save_secret_id(secret_id, name):
+    """Salva l'ID di una credential."""
+    get_store().set(CREDENTIAL, name, secret_id)
+
+
+def print_state(kind=None):
+    """Stampa le risorse salvate."""
+    store = get_store()
+    kinds = [kind] if kind else [ASSISTANT, TOOL, KB_FILE, CREDENTIAL]
+
+    print(f"Stato: {store.path}")
+    for current in kinds:
+        entries = store.all(current)
+        print(f"\n{current} ({len(entries)})")
+        print("-" * 60)
+        for key, entry in entries.items():
+            updated = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['updated_at']))
+            digest = (entry['hash'] or '')[:10]
+            print(f"  {key:<34} {entry['id']:<38} {digest:<10} {updated}")
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Mostra o modifica lo stato locale degli script Vapi')
+    parser.add_argument('kind', nargs='?', choices=[ASSISTANT, TOOL, KB_FILE, CREDENTIAL],
+                        help='Mostra solo un tipo di risorsa')
+    parser.add_argument('--set-assistant', metavar='ID',
+                        help="Imposta l'ID di un assistente già esistente su Vapi.ai")
+    args = parser.parse_args()
+
+    if args.set_assistant:
+        save_assistant_id(args.set_assistant)
+        print(f"✓ Assistente impostato: {args.set_assistant}")
+        return
+
+    print_state(args.kind)
+
+
+if __name__ == '__main__':
+    main()
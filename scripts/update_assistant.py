@@ -3,13 +3,19 @@
 Aggiorna l'assistente Vapi.ai con:
 - System prompt
 - Configurazioni (voice, settings)
-- Knowledge Base (se .knowledge-base-ids esiste)
-- Tools (se .tool-ids esiste)
+- Knowledge Base (se ci sono file caricati)
+- Tools (se ci sono tool creati)
+
+Gli ID vengono letti dallo stato locale (state_store, .vapi-state.db).
 
 Preserva automaticamente tutte le altre configurazioni.
+
+Invia solo i campi che differiscono dalla configurazione live
+(diff strutturale, stampato a video); se l'assistente è già allineato
+non invia nessuna richiesta.
 """
 
-import requests
+import copy
 import json
 import os
 import sys
@@ -23,8 +29,11 @@ try:
 except ImportError:
     pass
 
+import state_store
+from compile_prompt import load_compiled_prompt
+from vapi_client import get_client
+
 VAPI_API_KEY = os.getenv('VAPI_API_KEY')
-VAPI_BASE_URL = 'https://api.vapi.ai'
 
 def load_template_config():
     """Carica la configurazione template da assistant-existing.json."""
@@ -39,70 +48,108 @@ def load_template_config():
         return json.load(f)
 
 def load_system_prompt():
-    """Carica il system prompt dal file."""
+    """Carica il system prompt dal file, compilato entro PROMPT_TOKEN_BUDGET."""
     prompt_path = Path(__file__).parent.parent / 'config' / 'vapi-system-prompt-with-tools.txt'
-    with open(prompt_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    return load_compiled_prompt(prompt_path)
 
 def get_assistant_id():
     """Legge l'ID dell'assistente salvato."""
-    id_file = Path(__file__).parent.parent / '.assistant-id'
-    if not id_file.exists():
-        print("❌ File .assistant-id non trovato")
+    assistant_id = state_store.get_assistant_id()
+    if not assistant_id:
+        print("❌ Nessun assistente configurato")
         print("Esegui prima: python scripts/create_assistant.py")
+    return assistant_id
+
+
+def get_current_config(assistant_id):
+    """Fetch della configurazione corrente dell'assistente."""
+    response = get_client().get(f'/assistant/{assistant_id}')
+
+    if response.status_code != 200:
+        print(f"❌ Impossibile recuperare configurazione assistente: {response.status_code}")
+        print(response.text)
         return None
 
-    with open(id_file, 'r') as f:
-        return f.read().strip()
+    return response.json()
 
+# Campi del model gestiti dallo script: se mancano nella config desiderata
+# ma sono presenti su Vapi vanno rimossi (es. KB o tool scollegati)
+MANAGED_MODEL_FIELDS = ('knowledgeBase', 'toolIds')
 
-def get_knowledge_base_ids():
-    """Legge gli ID dei file knowledge base se esistono."""
-    kb_file = Path(__file__).parent.parent / '.knowledge-base-ids'
+_MISSING = object()
 
-    if not kb_file.exists():
-        return None
 
-    with open(kb_file, 'r') as f:
-        file_ids = [line.strip() for line in f.readlines() if line.strip()]
+def diff_config(current, desired, path=''):
+    """
+    Diff strutturale tra configurazione live e desiderata.
 
-    return file_ids if file_ids else None
+    Confronta solo le chiavi presenti in `desired`: i campi che Vapi
+    aggiunge con valori di default non contano come differenze.
 
+    Returns:
+        list: Tuple (path, valore live, valore desiderato)
+    """
+    if isinstance(desired, dict) and isinstance(current, dict):
+        changes = []
+        for key, value in desired.items():
+            child = f"{path}.{key}" if path else key
+            changes.extend(diff_config(current.get(key, _MISSING), value, child))
+        return changes
 
-def get_tool_ids():
-    """Legge gli ID dei tool se esistono."""
-    tool_file = Path(__file__).parent.parent / '.tool-ids'
+    if current != desired:
+        return [(path, current, desired)]
+    return []
 
-    if not tool_file.exists():
-        return None
 
-    with open(tool_file, 'r') as f:
-        tool_ids = [line.strip() for line in f.readlines() if line.strip()]
+def format_value(value, limit=60):
+    """Valore compatto per la stampa del diff."""
+    if value is _MISSING:
+        return '∅'
+    if isinstance(value, str) and len(value) > limit:
+        return f"<testo di {len(value)} caratteri>"
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
 
-    return tool_ids if tool_ids else None
 
+def print_diff(changes):
+    """Stampa le differenze trovate."""
+    for path, old, new in changes:
+        print(f"   ~ {path}: {format_value(old)} → {format_value(new)}")
 
-def get_current_config(assistant_id, headers):
-    """Fetch della configurazione corrente dell'assistente."""
-    response = requests.get(
-        f'{VAPI_BASE_URL}/assistant/{assistant_id}',
-        headers=headers
-    )
 
-    if response.status_code != 200:
-        print(f"❌ Impossibile recuperare configurazione assistente: {response.status_code}")
-        print(response.text)
-        return None
+def build_minimal_patch(current_config, desired):
+    """
+    Calcola il PATCH minimo verso la configurazione desiderata.
 
-    return response.json()
+    Il diff è per campo di primo livello: il model è un unico oggetto per
+    le API (un PATCH parziale sostituirebbe l'intero blocco), quindi viene
+    inviato per intero solo se qualcosa al suo interno è cambiato.
 
-def update_assistant(update_type='all'):
+    Returns:
+        tuple: (dict del PATCH, lista delle differenze)
+    """
+    changes = diff_config(current_config, desired)
+
+    current_model = current_config.get('model', {})
+    desired_model = desired.get('model')
+    if desired_model is not None:
+        for field in MANAGED_MODEL_FIELDS:
+            if field in current_model and field not in desired_model:
+                changes.append((f"model.{field}", current_model[field], _MISSING))
+
+    changed_fields = {path.split('.')[0] for path, _, _ in changes}
+    patch = {field: desired[field] for field in desired if field in changed_fields}
+    return patch, changes
+
+
+def update_assistant(update_type='all', dry_run=False):
     """
     Aggiorna l'assistente su Vapi.ai usando il template assistant-existing.json.
     Linka automaticamente KB e tools se presenti.
 
     Args:
         update_type: 'all', 'prompt', 'config'
+        dry_run: Se True mostra solo il diff, senza inviare nulla
     """
 
     if not VAPI_API_KEY:
@@ -113,13 +160,8 @@ def update_assistant(update_type='all'):
     if not assistant_id:
         return False
 
-    headers = {
-        'Authorization': f'Bearer {VAPI_API_KEY}',
-        'Content-Type': 'application/json'
-    }
-
     print(f"\n📡 Fetch configurazione corrente...")
-    current_config = get_current_config(assistant_id, headers)
+    current_config = get_current_config(assistant_id)
     if not current_config:
         return False
 
@@ -156,7 +198,8 @@ def update_assistant(update_type='all'):
     if template_config and 'model' in template_config:
         model_config = template_config['model'].copy()
     else:
-        model_config = current_config.get('model', {})
+        # Copia: la config live serve intatta per il diff
+        model_config = copy.deepcopy(current_config.get('model', {}))
 
     # Aggiorna system prompt se richiesto
     if update_type in ['all', 'prompt']:
@@ -167,8 +210,8 @@ def update_assistant(update_type='all'):
         }]
         print("✓ System prompt aggiornato")
 
-    # Linka Knowledge Base se esiste .knowledge-base-ids
-    kb_ids = get_knowledge_base_ids()
+    # Linka Knowledge Base se ci sono file caricati
+    kb_ids = state_store.get_knowledge_base_ids()
     if kb_ids:
         print(f"\n📚 Link Knowledge Base ({len(kb_ids)} file)...")
         model_config['knowledgeBase'] = {
@@ -182,8 +225,8 @@ def update_assistant(update_type='all'):
         if 'knowledgeBase' in model_config:
             del model_config['knowledgeBase']
 
-    # Linka Tools se esiste .tool-ids
-    tool_ids = get_tool_ids()
+    # Linka Tools se ci sono tool creati
+    tool_ids = state_store.get_tool_ids()
     if tool_ids:
         print(f"\n🛠️  Link Tools ({len(tool_ids)} tool)...")
         model_config['toolIds'] = tool_ids
@@ -197,12 +240,27 @@ def update_assistant(update_type='all'):
     # Aggiungi model config al patch
     patch_config["model"] = model_config
 
+    # Invia solo ciò che è cambiato rispetto alla config live
+    minimal_patch, changes = build_minimal_patch(current_config, patch_config)
+
+    if not changes:
+        print("\n✅ Assistente già allineato, nessun aggiornamento necessario")
+        return True
+
+    print(f"\n🔍 Differenze ({len(changes)}):")
+    print_diff(changes)
+
+    full_size = len(json.dumps(patch_config, ensure_ascii=False).encode('utf-8'))
+    patch_size = len(json.dumps(minimal_patch, ensure_ascii=False).encode('utf-8'))
+    print(f"\n   Campi inviati: {', '.join(sorted(minimal_patch))}")
+    print(f"   Payload: {patch_size / 1024:.1f} KB (invece di {full_size / 1024:.1f} KB)")
+
+    if dry_run:
+        print("\n⏭️  --dry-run: nessuna modifica inviata")
+        return True
+
     print(f"\n📤 Invio aggiornamenti a Vapi.ai...")
-    response = requests.patch(
-        f'{VAPI_BASE_URL}/assistant/{assistant_id}',
-        headers=headers,
-        json=patch_config
-    )
+    response = get_client().patch(f'/assistant/{assistant_id}', json=minimal_patch)
 
     if response.status_code == 200:
         print("\n" + "=" * 60)
@@ -251,11 +309,15 @@ Esempi d'uso:
   # Aggiorna solo config da template (preserva prompt, KB, tools)
   python scripts/update_assistant.py --type config
 
+  # Mostra le differenze senza inviare nulla
+  python scripts/update_assistant.py --dry-run
+
 Note:
   - Usa il template assistant-existing.json per aggiornare i campi
-  - Se esiste .knowledge-base-ids, linka automaticamente KB
-  - Se esiste .tool-ids, linka automaticamente tutti i tool
+  - Se ci sono file KB caricati, linka automaticamente la KB
+  - Se ci sono tool creati, linka automaticamente tutti i tool
   - Preserva sempre le configurazioni non specificate
+  - Invia solo i campi cambiati; se già allineato non invia nulla
         """
     )
 
@@ -266,6 +328,12 @@ Note:
         help='Tipo di aggiornamento: all (tutto), prompt (solo prompt), config (solo config da template)'
     )
 
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Mostra le differenze con la config live senza inviare nulla'
+    )
+
     args = parser.parse_args()
 
     print("=" * 60)
@@ -273,7 +341,7 @@ Note:
     print("=" * 60)
     print()
 
-    success = update_assistant(args.type)
+    success = update_assistant(args.type, dry_run=args.dry_run)
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Client HTTP condiviso per le API di Vapi.ai.
+
+Usato da tutti gli script in scripts/:
+- una sola requests.Session con pool di connessioni keep-alive
+  (niente handshake TLS ripetuti)
+- timeout su ogni richiesta
+- retry con backoff esponenziale su 429/5xx ed errori di rete,
+  rispettando l'header Retry-After
+- rate limiter token bucket, per restare sotto i limiti delle API
+  anche nelle operazioni in blocco (upload, creazione tool)
+- metriche di tempo per endpoint (richieste, errori, retry, latenza)
+
+Configurazione da variabili d'ambiente:
+    VAPI_API_KEY      Chiave API (obbligatoria)
+    VAPI_BASE_URL     Default https://api.vapi.ai (es. per un server mock)
+    VAPI_RATE_LIMIT   Richieste al secondo (default 10)
+"""
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = 'https://api.vapi.ai'
+DEFAULT_TIMEOUT = 30        # secondi per richiesta
+DEFAULT_RATE = 10.0         # richieste/secondo
+DEFAULT_POOL_SIZE = 10
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5          # secondi, raddoppia a ogni tentativo
+MAX_BACKOFF = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Rate limiter token bucket, thread-safe.
+
+    Il secchio si riempie di `rate` token al secondo fino a `burst`;
+    ogni richiesta consuma un token e attende se il secchio è vuoto.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Prende un token; restituisce i secondi di attesa."""
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self):
+        """Prende un token senza attendere; False se il secchio è vuoto."""
+        if self.rate <= 0:
+            return True
+
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class EndpointMetrics:
+    """Contatori e tempi di un endpoint (es. 'PATCH /assistant/{id}')."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.throttled = 0.0
+
+    def record(self, elapsed, ok):
+        self.requests += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        if not ok:
+            self.errors += 1
+
+    @property
+    def avg(self):
+        return self.total / self.requests if self.requests else 0.0
+
+
+def endpoint_key(method, path):
+    """Normalizza il path: gli ID diventano {id} (metriche per endpoint)."""
+    parts = path.strip('/').split('/')
+    if len(parts) > 1:
+        parts[1] = '{id}'
+    return f"{method.upper()} /{'/'.join(parts)}"
+
+
+class VapiClient:
+    """Client per le API Vapi.ai; thread-safe, condivisibile tra thread."""
+
+    def __init__(self, api_key=None, base_url=None, timeout=DEFAULT_TIMEOUT,
+                 rate=None, pool_size=DEFAULT_POOL_SIZE, max_retries=MAX_RETRIES):
+        self.api_key = api_key or os.getenv('VAPI_API_KEY')
+        self.base_url = (base_url or os.getenv('VAPI_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        if rate is None:
+            rate = float(os.getenv('VAPI_RATE_LIMIT', DEFAULT_RATE))
+        self.limiter = TokenBucket(rate)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Authorization'] = f'Bearer {self.api_key}'
+
+        self.metrics = defaultdict(EndpointMetrics)
+        self._metrics_lock = threading.Lock()
+
+    def _backoff(self, attempt, response=None):
+        """Attesa prima del prossimo tentativo (Retry-After se presente)."""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            try:
+                return min(float(retry_after), MAX_BACKOFF)
+            except ValueError:
+                pass
+        wait = min(BACKOFF_BASE * (2 ** attempt), MAX_BACKOFF)
+        return wait + random.uniform(0, wait / 4)
+
+    def request(self, method, path, timeout=None, **kwargs):
+        """
+        Richiesta alle API con rate limit, timeout e retry.
+
+        Args:
+            method: Metodo HTTP
+            path: Path relativo (es. '/assistant/123')
+            timeout: Override del timeout di default
+            **kwargs: Argomenti di requests (json, files, params...)
+
+        Returns:
+            requests.Response: Ultima risposta (anche se di errore)
+
+        Raises:
+            requests.RequestException: Errore di rete dopo tutti i retry
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        stats_key = endpoint_key(method, path)
+        timeout = timeout or self.timeout
+        throttled = 0.0
+        retries = 0
+
+        for attempt in range(self.max_retries + 1):
+            throttled += self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(stats_key, time.perf_counter() - start, False)
+                if attempt == self.max_retries:
+                    self._record_retries(stats_key, retries, throttled)
+                    raise
+                wait = self._backoff(attempt)
+            else:
+                elapsed = time.perf_counter() - start
+                ok = response.status_code < 400
+                self._record(stats_key, elapsed, ok)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    self._record_retries(stats_key, retries, throttled)
+                    return response
+                wait = self._backoff(attempt, response)
+
+            retries += 1
+            time.sleep(wait)
+
+    def _record(self, key, elapsed, ok):
+        with self._metrics_lock:
+            self.metrics[key].record(elapsed, ok)
+
+    def _record_retries(self, key, retries, throttled):
+        with self._metrics_lock:
+            self.metrics[key].retries += retries
+            self.metrics[key].throttled += throttled
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request('PATCH', path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request('DELETE', path, **kwargs)
+
+    def reset_metrics(self):
+        with self._metrics_lock:
+            self.metrics.clear()
+
+    def print_metrics(self):
+        """Stampa le metriche per endpoint."""
+        with self._metrics_lock:
+            items = sorted(self.metrics.items())
+
+        if not items:
+            return
+
+        print("\n" + "=" * 72)
+        print("METRICHE API VAPI")
+        print("=" * 72)
+        print(f"{'Endpoint':<26} {'Rich.':>6} {'Err.':>5} {'Retry':>6} {'Media':>8} {'Max':>8} {'Attesa':>7}")
+        print("-" * 72)
+        for key, m in items:
+            print(f"{key:<26} {m.requests:>6} {m.errors:>5} {m.retries:>6} "
+                  f"{m.avg * 1000:>6.0f}ms {m.max * 1000:>6.0f}ms {m.throttled:>6.1f}s")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Client condiviso del processo (creato alla prima chiamata).
+
+    Va chiamato dopo load_dotenv(), così legge VAPI_API_KEY dal .env.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = VapiClient(pool_size=pool_size)
+        return _client
+
+
+def reset_client():
+    """Scarta il client condiviso (es. dopo aver cambiato VAPI_BASE_URL)."""
+    global _client
+    with _client_lock:
+        _client = None
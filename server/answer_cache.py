@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Cache domanda → risposta per le domande ricorrenti dei cittadini.
+
+- Chiave: domanda normalizzata con la tokenizzazione di kb_search
+  (minuscole, accenti rimossi, stopword tolte, stemming), più tutti i
+  numeri anche di una cifra ("Servizio 6"), termini ordinati
+- Match esatto sulla chiave, poi fuzzy su trigrammi di caratteri
+  (similarità di Jaccard sopra una soglia), solo tra chiavi con gli
+  stessi numeri: "servizio 7" non riceve mai la risposta di "servizio 6"
+- Pre-caricata con le FAQ della knowledge base (### domanda nelle sezioni
+  "Domande Frequenti"): queste voci non scadono e non vengono rimosse.
+  Due FAQ con la stessa chiave e risposte diverse non vengono caricate
+  (la domanda passa dalla ricerca)
+- Le altre risposte sono in LRU con TTL
+- Metriche: hit esatti/fuzzy, miss, rimozioni, hit rate
+
+Quando l'indice della knowledge base viene ricaricato la cache viene
+svuotata e ricaricata con le nuove FAQ.
+
+Uso da linea di comando:
+    python server/answer_cache.py "quanto costa la carta d'identità"
+    python server/answer_cache.py --check    # ogni FAQ restituisce la propria risposta
+"""
+
+import argparse
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import kb_search
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL = 3600.0          # secondi, solo per le risposte non FAQ
+DEFAULT_THRESHOLD = 0.8       # similarità minima per un match fuzzy
+FAQ_SECTION = 'Domande Frequenti'
+NUMBER_RE = re.compile(r'\d+')
+
+logger = logging.getLogger('answer_cache')
+
+
+def normalize_question(text):
+    """
+    Chiave di cache: termini normalizzati, senza duplicati, in ordine.
+
+    I numeri restano nella chiave anche se di una cifra (tokenize li
+    scarta): distinguono servizi con le stesse domande ("Servizio 6").
+    """
+    return ' '.join(sorted(set(kb_search.tokenize(text)) | set(NUMBER_RE.findall(text))))
+
+
+def key_numbers(key):
+    """Numeri presenti in una chiave di cache."""
+    return frozenset(term for term in key.split() if term.isdigit())
+
+
+def trigrams(key):
+    """Trigrammi di caratteri della chiave (con bordi)."""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AnswerCache:
+    """Cache thread-safe con match esatto e fuzzy sulle domande normalizzate."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL,
+                 threshold=DEFAULT_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Svuota cache (FAQ comprese) e metriche."""
+        with self._lock:
+            self._pinned = {}               # chiave → risposta (FAQ)
+            self._entries = OrderedDict()   # chiave → (risposta, scadenza), in ordine LRU
+            self._grams = {}                # chiave → trigrammi
+            self._postings = {}             # trigramma → chiavi
+            self.hits = 0
+            self.fuzzy_hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.collisions = 0
+
+    # --- Indice dei trigrammi ---
+
+    def _index_key(self, key):
+        grams = trigrams(key)
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _unindex_key(self, key):
+        for gram in self._grams.pop(key, ()):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._unindex_key(key)
+
+    def _closest(self, key):
+        """Chiave in cache più simile (Jaccard sui trigrammi), o None sotto soglia."""
+        grams = trigrams(key)
+        numbers = key_numbers(key)
+        overlaps = {}
+        for gram in grams:
+            for candidate in self._postings.get(gram, ()):
+                overlaps[candidate] = overlaps.get(candidate, 0) + 1
+
+        best, best_score = None, self.threshold
+        for candidate, overlap in overlaps.items():
+            if key_numbers(candidate) != numbers:
+                continue   # Stessa domanda per un altro servizio/numero
+            score = overlap / (len(grams) + len(self._grams[candidate]) - overlap)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    # --- Lettura/scrittura ---
+
+    def _lookup(self, key, now):
+        """Risposta per una chiave esatta, o None (rimuove le voci scadute)."""
+        if key in self._pinned:
+            return self._pinned[key]
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        answer, expires = entry
+        if expires < now:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return answer
+
+    def get(self, question):
+        """
+        Risposta in cache per una domanda, o None.
+
+        Returns:
+            str | None
+        """
+        key = normalize_question(question)
+        if not key:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            answer = self._lookup(key, now)
+            if answer is not None:
+                self.hits += 1
+                return answer
+
+            closest = self._closest(key)
+            answer = self._lookup(closest, now) if closest else None
+            if answer is not None:
+                self.fuzzy_hits += 1
+                return answer
+
+            self.misses += 1
+            return None
+
+    def put(self, question, answer, pinned=False):
+        """Salva una risposta; `pinned` = senza TTL e mai rimossa (FAQ)."""
+        key = normalize_question(question)
+        if not key:
+            return
+
+        with self._lock:
+            if key in self._pinned:
+                return   # Le FAQ hanno la precedenza sulle risposte calcolate
+
+            if key in self._entries:
+                self._remove(key)
+            self._index_key(key)
+
+            if pinned:
+                self._pinned[key] = answer
+                return
+
+            self._entries[key] = (answer, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def warm(self, index):
+        """
+        Carica le FAQ dall'indice della knowledge base.
+
+        Le domande che danno la stessa chiave con risposte diverse (es. la
+        stessa FAQ in due servizi senza nome distintivo) non vengono
+        caricate: meglio la ricerca che la risposta di un altro servizio.
+
+        Returns:
+            int: Numero di domande caricate
+        """
+        faqs = {}
+        collisions = set()
+        for question, answer in iter_faqs(index):
+            key = normalize_question(question)
+            if not key:
+                continue
+            if key in faqs and faqs[key][1] != answer:
+                if key not in collisions:
+                    logger.warning("FAQ con la stessa chiave '%s' e risposte diverse, non in cache: %r, %r",
+                                   key, faqs[key][0], question)
+                collisions.add(key)
+            faqs.setdefault(key, (question, answer))
+
+        loaded = 0
+        for key, (question, answer) in faqs.items():
+            if key not in collisions:
+                self.put(question, answer, pinned=True)
+                loaded += 1
+        self.collisions = len(collisions)
+        return loaded
+
+    def stats(self):
+        """Metriche della cache."""
+        with self._lock:
+            lookups = self.hits + self.fuzzy_hits + self.misses
+            return {
+                'faq': len(self._pinned),
+                'faq_collisions': self.collisions,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'fuzzy_hits': self.fuzzy_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round((self.hits + self.fuzzy_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+def iter_faqs(index):
+    """(domanda, risposta) per ogni FAQ dell'indice della knowledge base."""
+    for doc_id in range(index.n_chunks):
+        chunk = index.chunk(doc_id)
+        faq, _, question = chunk['section'].partition(' > ')
+        if faq.startswith(FAQ_SECTION) and question:
+            yield question, f"{chunk['title']} — {question}\n{' '.join(chunk['text'].split())}"
+
+
+def check(cache, index):
+    """
+    Verifica che ogni FAQ in cache restituisca la propria risposta.
+
+    Returns:
+        list[tuple[str, str]]: (domanda, titolo della risposta sbagliata)
+    """
+    errors = []
+    for question, answer in iter_faqs(index):
+        if normalize_question(question) in cache._pinned:
+            cached = cache.get(question)
+            if cached != answer:
+                errors.append((question, (cached or 'nessuna risposta').split('\n')[0]))
+    return errors
+
+
+_cache = AnswerCache()
+_cache_identity = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Cache condivisa del processo, caricata con le FAQ dell'indice corrente.
+
+    Se l'indice è stato ricaricato (hot reload) la cache viene svuotata
+    e ricaricata: nessuna risposta resta legata alla KB precedente.
+    """
+    global _cache_identity
+    index = kb_search.get_index()
+    if index.identity != _cache_identity:
+        with _cache_lock:
+            if index.identity != _cache_identity:
+                _cache.clear()
+                _cache.warm(index)
+                _cache_identity = index.identity
+    return _cache
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Cache domanda → risposta della knowledge base')
+    parser.add_argument('question', nargs='?', help='Domanda da cercare in cache')
+    parser.add_argument('--check', action='store_true',
+                        help='Verifica che ogni FAQ restituisca la propria risposta')
+    args = parser.parse_args()
+    if not args.check and not args.question:
+        parser.error('domanda mancante (oppure --check)')
+
+    start = time.perf_counter()
+    cache = get_cache()
+    stats = cache.stats()
+    print(f"Cache: {stats['faq']} FAQ, {stats['faq_collisions']} chiavi ambigue escluse "
+          f"({(time.perf_counter() - start) * 1000:.1f}ms)")
+
+    if args.check:
+        errors = check(cache, kb_search.get_index())
+        for question, wrong in errors:
+            print(f"❌ {question} → {wrong}")
+        print(f"{'✅ Tutte le FAQ' if not errors else f'❌ {len(errors)} FAQ'} "
+              f"{'restituiscono la propria risposta' if not errors else 'con la risposta sbagliata'}")
+        sys.exit(1 if errors else 0)
+
+    start = time.perf_counter()
+    answer = cache.get(args.question)
+    elapsed = (time.perf_counter() - start) * 1e6
+    print(f"\nChiave: {normalize_question(args.question)}")
+    print(f"{'✓ Hit' if answer else '✗ Miss'} ({elapsed:.0f}µs)")
+    if answer:
+        print(f"\n{answer}")
+
+
+if __name__ == '__main__':
+    main()
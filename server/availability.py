@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Disponibilità degli uffici comunali calcolata in locale.
+
+Sostituisce la chiamata live a Google Calendar durante la telefonata:
+- orari di apertura per ufficio da config/office-hours.json
+- eventi esistenti dal feed iCal del calendario (indirizzo segreto
+  in formato iCal di Google Calendar, oppure un file .ics locale)
+- slot liberi precalcolati per ufficio e giorno (prossimi N giorni),
+  come liste ordinate: una query è una ricerca binaria in memoria
+- aggiornamento in background: nuovi eventi e nuovo giorno vengono
+  calcolati in un thread e sostituiti in modo atomico
+
+Configurazione da variabili d'ambiente:
+    CALENDAR_ICS_URL            URL o path del calendario in formato iCal
+    CALENDAR_REFRESH_SECONDS    Intervallo di aggiornamento (default 60)
+
+Limiti: gli eventi ricorrenti (RRULE) del feed non vengono espansi e
+sono ignorati (con un avviso nel log).
+
+Uso da linea di comando:
+    python server/availability.py 2025-11-17
+    python server/availability.py 2025-11-17 --office anagrafe --from 09:00 --to 11:00
+    python server/availability.py 2025-11-17 --ics calendario.ics
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, bisect_right
+from datetime import date as Date, datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import requests
+
+ROOT_DIR = Path(__file__).parent.parent
+DEFAULT_CONFIG_FILE = ROOT_DIR / 'config' / 'office-hours.json'
+DEFAULT_REFRESH_SECONDS = 60
+FETCH_TIMEOUT = 15
+DAY_MINUTES = 24 * 60
+
+WEEKDAYS = ('lunedi', 'martedi', 'mercoledi', 'giovedi', 'venerdi', 'sabato', 'domenica')
+WEEKDAY_NAMES = ('lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì', 'sabato', 'domenica')
+
+logger = logging.getLogger('availability')
+
+
+def fold(text):
+    """Minuscole senza accenti (confronto di nomi di uffici e testi)."""
+    normalized = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+def parse_minutes(value):
+    """'HH:MM' → minuti dalla mezzanotte."""
+    try:
+        hours, minutes = value.strip().split(':')
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Orario non valido: {value!r} (formato HH:MM)") from None
+    if not 0 <= total <= DAY_MINUTES:
+        raise ValueError(f"Orario non valido: {value!r}")
+    return total
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_date(value):
+    try:
+        return Date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Data non valida: {value!r} (formato YYYY-MM-DD)") from None
+
+
+def load_office_hours(path=DEFAULT_CONFIG_FILE):
+    """
+    Orari di apertura degli uffici.
+
+    Returns:
+        dict: {timezone, slot, horizon, default, offices: ufficio → [[(inizio, fine)] x 7]}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    offices = {}
+    for office, days in config['offices'].items():
+        week = [[] for _ in WEEKDAYS]
+        for day, intervals in days.items():
+            week[WEEKDAYS.index(fold(day))] = sorted(
+                (parse_minutes(start), parse_minutes(end)) for start, end in intervals
+            )
+        offices[office] = week
+
+    return {
+        'timezone': ZoneInfo(config.get('timeZone', 'Europe/Rome')),
+        'slot': int(config.get('slotMinutes', 30)),
+        'horizon': int(config.get('horizonDays', 30)),
+        'default': config.get('defaultOffice') or next(iter(offices)),
+        'offices': offices,
+    }
+
+
+# --- Eventi dal calendario (iCal) ---
+
+def _ics_datetime(value, params, tz):
+    """Valore DTSTART/DTEND → datetime nel fuso degli uffici."""
+    if params.get('VALUE') == 'DATE' or len(value) == 8:
+        return datetime.strptime(value[:8], '%Y%m%d').replace(tzinfo=tz)
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc).astimezone(tz)
+    source_tz = ZoneInfo(params['TZID']) if 'TZID' in params else tz
+    return datetime.strptime(value, '%Y%m%dT%H%M%S').replace(tzinfo=source_tz).astimezone(tz)
+
+
+def parse_ics(text, tz):
+    """
+    Eventi occupati di un calendario iCal.
+
+    Returns:
+        list: dict {start, end, text} (datetime nel fuso `tz`)
+    """
+    # Le righe lunghe continuano nelle righe che iniziano con uno spazio
+    lines = text.replace('\r\n', '\n').replace('\n ', '').replace('\n\t', '').split('\n')
+
+    events, event, recurring = [], None, 0
+    for line in lines:
+        if line == 'BEGIN:VEVENT':
+            event = {}
+        elif line == 'END:VEVENT' and event is not None:
+            if 'RRULE' in event:
+                recurring += 1
+            elif event.get('STATUS') != 'CANCELLED' and event.get('TRANSP') != 'TRANSPARENT':
+                try:
+                    start = _ics_datetime(*event['DTSTART'], tz)
+                    end = _ics_datetime(*event['DTEND'], tz) if 'DTEND' in event else start + timedelta(days=1)
+                except (KeyError, ValueError):
+                    logger.warning('Evento senza date valide ignorato')
+                else:
+                    summary = event.get('SUMMARY', ('', {}))[0]
+                    location = event.get('LOCATION', ('', {}))[0]
+                    events.append({'start': start, 'end': end, 'text': f"{summary} {location}"})
+            event = None
+        elif event is not None and ':' in line:
+            name, value = line.split(':', 1)
+            name, *raw_params = name.split(';')
+            params = dict(param.split('=', 1) for param in raw_params if '=' in param)
+            event[name.upper()] = (value, params) if name.upper() in ('DTSTART', 'DTEND') else value
+
+    if recurring:
+        logger.warning('%d eventi ricorrenti ignorati (RRULE non supportato)', recurring)
+    return events
+
+
+def fetch_events(source, tz):
+    """Eventi da URL o file .ics; nessun evento se la sorgente non è configurata."""
+    if not source:
+        return []
+    if source.startswith(('http://', 'https://', 'webcal://')):
+        response = requests.get(source.replace('webcal://', 'https://', 1), timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        return parse_ics(response.text, tz)
+    return parse_ics(Path(source).read_text(encoding='utf-8'), tz)
+
+
+# --- Slot precalcolati ---
+
+def merge_intervals(intervals):
+    """Intervalli (inizio, fine) ordinati e senza sovrapposizioni."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def busy_by_day(events, tz):
+    """Eventi → data → intervalli occupati in minuti (eventi su più giorni divisi)."""
+    days = {}
+    for event in events:
+        start, end = event['start'], event['end']
+        day = start.date()
+        while datetime.combine(day, datetime.min.time(), tz) < end:
+            day_start = datetime.combine(day, datetime.min.time(), tz)
+            begin = max(0, int((start - day_start).total_seconds() // 60))
+            finish = min(DAY_MINUTES, -int(-(end - day_start).total_seconds() // 60))
+            if finish > begin:
+                days.setdefault(day, []).append((begin, finish, event['text']))
+            day += timedelta(days=1)
+    return days
+
+
+def free_slots(opening, busy, slot):
+    """
+    Inizi degli slot liberi di un giorno.
+
+    Args:
+        opening: Intervalli di apertura [(inizio, fine)] in minuti
+        busy: Intervalli occupati, ordinati e fusi
+        slot: Durata di uno slot in minuti
+    """
+    busy_starts = [start for start, _ in busy]
+    starts = []
+    for open_start, open_end in opening:
+        for t in range(open_start, open_end - slot + 1, slot):
+            # Unico evento che può sovrapporsi: l'ultimo che inizia prima della fine dello slot
+            i = bisect_left(busy_starts, t + slot) - 1
+            if i < 0 or busy[i][1] <= t:
+                starts.append(t)
+    return starts
+
+
+def office_applies(office, text, offices):
+    """Un evento occupa l'ufficio citato nel titolo/luogo, o tutti se non ne cita nessuno."""
+    text = fold(text)
+    named = [name for name in offices if fold(name) in text]
+    return not named or office in named
+
+
+def compute_slots(config, events, first_day, days):
+    """
+    Slot liberi per ufficio e giorno.
+
+    Returns:
+        dict: ufficio → data → lista ordinata di inizi (minuti)
+    """
+    tz = config['timezone']
+    by_day = busy_by_day(events, tz)
+    slots = {office: {} for office in config['offices']}
+
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        day_events = by_day.get(day, [])
+        for office, week in config['offices'].items():
+            opening = week[day.weekday()]
+            if not opening:
+                continue
+            busy = merge_intervals((start, end) for start, end, text in day_events
+                                   if office_applies(office, text, config['offices']))
+            slots[office][day] = free_slots(opening, busy, config['slot'])
+    return slots
+
+
+class AvailabilityService:
+    """Slot liberi in memoria, ricalcolati in background; thread-safe."""
+
+    def __init__(self, config_path=DEFAULT_CONFIG_FILE, source=None,
+                 refresh_interval=DEFAULT_REFRESH_SECONDS):
+        self.config = load_office_hours(config_path)
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.state = (None, {})         # (primo giorno, slot): sostituito in blocco
+        self.refreshed_at = None
+        self.events = 0
+        self._thread = None
+        # Occupazioni locali non presenti nel calendario (es. motore di
+        # prenotazione): callable(ufficio, inizio, fine) → True se occupato
+        self.busy_filter = None
+
+    def now(self):
+        return datetime.now(self.config['timezone'])
+
+    def slot_window(self, day, start_minutes, end_minutes=None):
+        """Inizio e fine di uno slot come datetime nel fuso degli uffici."""
+        midnight = datetime.combine(day, datetime.min.time(), self.config['timezone'])
+        end_minutes = end_minutes or start_minutes + self.config['slot']
+        return midnight + timedelta(minutes=start_minutes), midnight + timedelta(minutes=end_minutes)
+
+    def refresh(self):
+        """Scarica gli eventi e ricalcola gli slot (sostituzione atomica)."""
+        start = time.perf_counter()
+        today = self.now().date()
+        events = fetch_events(self.source, self.config['timezone'])
+        slots = compute_slots(self.config, events, today, self.config['horizon'])
+
+        # Un solo assegnamento: le query leggono sempre uno stato coerente
+        self.state = (today, slots)
+        self.events = len(events)
+        self.refreshed_at = time.time()
+        logger.info('Disponibilità aggiornata: %d eventi, %d giorni (%.0fms)',
+                    len(events), self.config['horizon'], (time.perf_counter() - start) * 1000)
+
+    def start(self):
+        """
+        Primo calcolo sincrono, poi aggiornamento periodico in un thread.
+
+        Se il calendario non è raggiungibile all'avvio gli slot vengono
+        calcolati dai soli orari d'ufficio, senza eventi: il servizio parte
+        comunque e il thread riprova al prossimo aggiornamento.
+        """
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception('Calendario non disponibile: slot dai soli orari d\'ufficio')
+            today = self.now().date()
+            self.state = (today, compute_slots(self.config, [], today, self.config['horizon']))
+        if self._thread is None and self.refresh_interval > 0:
+            def loop():
+                while True:
+                    time.sleep(self.refresh_interval)
+                    try:
+                        self.refresh()
+                    except Exception:
+                        # Si continua a rispondere con gli ultimi slot calcolati
+                        logger.exception('Aggiornamento disponibilità fallito')
+
+            self._thread = threading.Thread(target=loop, name='availability-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def resolve_office(self, name=None):
+        """
+        Nome ufficio (anche parziale, es. 'anagrafe') → ufficio configurato.
+
+        Senza nome restituisce l'ufficio di default. Il nome esatto vince
+        sulle corrispondenze parziali, e un nome parziale deve indicare un
+        solo ufficio ('ufficio' è ambiguo).
+
+        Raises:
+            ValueError: Se il nome non corrisponde a nessun ufficio con agenda
+                o ne indica più di uno
+        """
+        if not name or not str(name).strip():
+            return self.config['default']
+        wanted = fold(str(name))
+        offices = {fold(office): office for office in self.config['offices']}
+        if wanted in offices:
+            return offices[wanted]
+        partial = [office for folded, office in offices.items() if wanted in folded or folded in wanted]
+        if len(partial) == 1:
+            return partial[0]
+        raise ValueError(f"Ufficio non trovato: {name!r}. Uffici con appuntamenti: "
+                         f"{', '.join(self.config['offices'])}")
+
+    def check(self, day, start_time=None, end_time=None, office=None):
+        """
+        Slot liberi di un giorno, eventualmente in una fascia oraria.
+
+        Args:
+            day: Data 'YYYY-MM-DD' o date
+            start_time, end_time: Fascia 'HH:MM' (default: tutto il giorno)
+            office: Nome (anche parziale) dell'ufficio
+
+        Returns:
+            dict: {office, date, slots, closed, out_of_range}
+
+        Raises:
+            ValueError: Data, orari o ufficio non validi
+        """
+        day = parse_date(day) if not isinstance(day, Date) else day
+        office = self.resolve_office(office)
+        slot = self.config['slot']
+        lower = parse_minutes(start_time) if start_time else 0
+        upper = parse_minutes(end_time) if end_time else DAY_MINUTES
+
+        now = self.now()
+        if day == now.date():
+            lower = max(lower, now.hour * 60 + now.minute)
+
+        first_day, slots = self.state
+        starts = slots.get(office, {}).get(day, [])
+        out_of_range = first_day is None or not first_day <= day < first_day + timedelta(days=self.config['horizon'])
+        if day < now.date():
+            starts = []
+
+        selected = starts[bisect_left(starts, lower):bisect_right(starts, upper - slot)]
+        if self.busy_filter is not None:
+            selected = [start for start in selected
+                        if not self.busy_filter(office, *self.slot_window(day, start))]
+        return {
+            'office': office,
+            'date': day,
+            'slots': [format_minutes(start) for start in selected],
+            'closed': not self.config['offices'][office][day.weekday()],
+            'out_of_range': out_of_range,
+        }
+
+    def is_bookable(self, day, start_time, end_time=None, office=None):
+        """True se tutti gli slot tra inizio e fine sono liberi."""
+        lower = parse_minutes(start_time)
+        upper = parse_minutes(end_time) if end_time else lower + self.config['slot']
+        if upper <= lower:
+            return False
+        free = set(self.check(day, start_time, format_minutes(upper), office)['slots'])
+        return all(format_minutes(t) in free for t in range(lower, upper, self.config['slot']))
+
+    def next_available(self, office=None, after=None, limit=3):
+        """Primi giorni con slot liberi: lista di (data, primo orario)."""
+        office = self.resolve_office(office)
+        now = self.now()
+        found = []
+        _, slots = self.state
+        for day, starts in sorted(slots.get(office, {}).items()):
+            if after and day <= after:
+                continue
+            if day == now.date():
+                starts = [s for s in starts if s >= now.hour * 60 + now.minute]
+            if self.busy_filter is not None:
+                starts = [s for s in starts if not self.busy_filter(office, *self.slot_window(day, s))]
+            if starts:
+                found.append((day, format_minutes(starts[0])))
+                if len(found) == limit:
+                    break
+        return found
+
+    def describe(self, day, start_time=None, end_time=None, office=None, max_slots=12):
+        """Risposta testuale per il tool (in italiano, pronta per il modello)."""
+        result = self.check(day, start_time, end_time, office)
+        day = result['date']
+        label = f"{WEEKDAY_NAMES[day.weekday()]} {day.isoformat()}"
+
+        if result['slots']:
+            shown = result['slots'][:max_slots]
+            more = len(result['slots']) - len(shown)
+            return (f"{result['office']}, {label}: orari liberi {', '.join(shown)}"
+                    f"{f' (e altri {more})' if more else ''}. "
+                    f"Durata appuntamento {self.config['slot']} minuti.")
+
+        if day < self.now().date():
+            reason = "la data è nel passato"
+        elif result['closed']:
+            reason = "l'ufficio è chiuso in questo giorno"
+        elif result['out_of_range']:
+            reason = "la data è oltre il periodo prenotabile"
+        else:
+            reason = "nessun orario libero"
+        text = f"{result['office']}, {label}: {reason}."
+
+        alternatives = self.next_available(result['office'], after=day if not result['out_of_range'] else None)
+        if alternatives:
+            options = ', '.join(f"{WEEKDAY_NAMES[d.weekday()]} {d.isoformat()} dalle {t}"
+                                for d, t in alternatives)
+            text += f" Prime date disponibili: {options}."
+        return text
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """Servizio condiviso del processo (avviato alla prima chiamata)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AvailabilityService(
+                source=os.getenv('CALENDAR_ICS_URL'),
+                refresh_interval=float(os.getenv('CALENDAR_REFRESH_SECONDS', DEFAULT_REFRESH_SECONDS)),
+            ).start()
+        return _service
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Disponibilità degli uffici calcolata in locale')
+    parser.add_argument('date', help='Data YYYY-MM-DD')
+    parser.add_argument('--office', help="Ufficio (anche parziale, es. 'anagrafe')")
+    parser.add_argument('--from', dest='start_time', help='Ora inizio HH:MM')
+    parser.add_argument('--to', dest='end_time', help='Ora fine HH:MM')
+    parser.add_argument('--ics', default=os.getenv('CALENDAR_ICS_URL'),
+                        help='URL o file .ics del calendario (default: CALENDAR_ICS_URL)')
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help='Ripete la verifica N volte e stampa il tempo medio')
+    args = parser.parse_args()
+
+    service = AvailabilityService(source=args.ics, refresh_interval=0)
+    start = time.perf_counter()
+    service.refresh()
+    print(f"Slot calcolati: {service.events} eventi, {service.config['horizon']} giorni "
+          f"({(time.perf_counter() - start) * 1000:.0f}ms)\n")
+
+    try:
+        print(service.describe(args.date, args.start_time, args.end_time, args.office))
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    if args.bench:
+        start = time.perf_counter()
+        for _ in range(args.bench):
+            service.check(args.date, args.start_time, args.end_time, args.office)
+        print(f"\nBenchmark: {args.bench} verifiche, "
+              f"{(time.perf_counter() - start) / args.bench * 1e6:.1f}µs/verifica")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+"""
+Motore di prenotazione locale: niente doppie prenotazioni con più
+telefonate in contemporanea.
+
+- Un interval tree per calendario (ufficio) con prenotazioni e blocchi
+  temporanei: verifica di sovrapposizione in O(log n)
+- Blocco di uno slot (hold) con scadenza, mentre l'assistente raccoglie
+  nome ed email; i blocchi scaduti vengono rimossi automaticamente
+- Conferma atomica: il blocco diventa prenotazione solo se è ancora
+  valido, sotto lo stesso lock di tutte le altre operazioni
+- Prenotazioni confermate salvate in SQLite (server/.bookings.db),
+  ricaricate all'avvio ed esportabili in iCal (GET /calendar.ics del tool
+  server, da aggiungere a Google Calendar come calendario via URL)
+
+Le prenotazioni passano da un solo processo (il tool server): il lock è
+in memoria.
+
+Uso da linea di comando:
+    python server/booking.py                          # Prenotazioni future
+    python server/booking.py --bench 10000            # Hold/conferme al secondo
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+DEFAULT_DB_FILE = Path(__file__).parent / '.bookings.db'
+DEFAULT_HOLD_SECONDS = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id           TEXT PRIMARY KEY,
+    calendar     TEXT NOT NULL,
+    start        INTEGER NOT NULL,
+    end          INTEGER NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'confirmed',
+    name         TEXT,
+    email        TEXT,
+    summary      TEXT,
+    description  TEXT,
+    created_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bookings_start ON bookings (status, start);
+"""
+
+BOOKING_FIELDS = ('name', 'email', 'summary', 'description')
+
+
+class BookingError(Exception):
+    """Errore di prenotazione (messaggio pronto per l'utente)."""
+
+
+class SlotConflict(BookingError):
+    """Lo slot si sovrappone a una prenotazione o a un blocco attivo."""
+
+
+class HoldNotFound(BookingError):
+    """Blocco inesistente, scaduto o già confermato."""
+
+
+# --- Interval tree ---
+
+class _Node:
+    __slots__ = ('start', 'end', 'key', 'value', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+
+def _update(node):
+    node.max_end = max(
+        node.end,
+        node.left.max_end if node.left else node.end,
+        node.right.max_end if node.right else node.end,
+    )
+
+
+def _split(node, key):
+    """Divide in (< key, >= key), con key = (start, id)."""
+    if node is None:
+        return None, None
+    if (node.start, node.key) < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Unisce due treap con tutte le chiavi di `left` minori di quelle di `right`."""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _delete(node, key):
+    if node is None:
+        return None
+    node_key = (node.start, node.key)
+    if key == node_key:
+        return _merge(node.left, node.right)
+    if key < node_key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _update(node)
+    return node
+
+
+class IntervalTree:
+    """
+    Interval tree su intervalli semiaperti [start, end).
+
+    Treap ordinato per (start, id) con la fine massima di ogni sottoalbero:
+    inserimento, rimozione e ricerca di una sovrapposizione in O(log n)
+    (atteso).
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def insert(self, start, end, key, value):
+        left, right = _split(self.root, (start, key))
+        self.root = _merge(_merge(left, _Node(start, end, key, value)), right)
+        self.size += 1
+
+    def remove(self, start, key):
+        self.root = _delete(self.root, (start, key))
+        self.size -= 1
+
+    def find_overlap(self, start, end):
+        """Un valore che si sovrappone a [start, end), o None."""
+        node = self.root
+        while node is not None:
+            if node.start < end and start < node.end:
+                return node.value
+            # Se il sottoalbero sinistro arriva oltre `start`, una sovrapposizione,
+            # se esiste, è lì: a destra gli inizi sono tutti successivi
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            else:
+                node = node.right
+        return None
+
+    def overlaps(self, start, end):
+        """Tutti i valori che si sovrappongono a [start, end), in ordine."""
+        found = []
+
+        def visit(node):
+            if node is None or node.max_end <= start:
+                return
+            visit(node.left)
+            if node.start < end:
+                if start < node.end:
+                    found.append(node.value)
+                visit(node.right)
+
+        visit(self.root)
+        return found
+
+
+# --- Motore di prenotazione ---
+
+def _timestamp(moment):
+    return int(moment.timestamp())
+
+
+class BookingEngine:
+    """Prenotazioni e blocchi per calendario; thread-safe."""
+
+    def __init__(self, db_path=None, hold_seconds=DEFAULT_HOLD_SECONDS):
+        self.path = Path(db_path or os.getenv('BOOKINGS_DB') or DEFAULT_DB_FILE)
+        self.hold_seconds = hold_seconds
+        self._lock = threading.Lock()
+        self._trees = {}        # calendario → IntervalTree
+        self._holds = {}        # id → blocco
+        self._expiry = []       # heap (scadenza, id)
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+        for row in self._conn.execute(
+            "SELECT * FROM bookings WHERE status = 'confirmed' AND end > ?", (int(time.time()),)
+        ):
+            booking = dict(row, kind='booking')
+            self._tree(booking['calendar']).insert(booking['start'], booking['end'], booking['id'], booking)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _tree(self, calendar):
+        tree = self._trees.get(calendar)
+        if tree is None:
+            tree = self._trees[calendar] = IntervalTree()
+        return tree
+
+    def _purge_expired(self, now):
+        """Rimuove i blocchi scaduti (chiamato sotto lock)."""
+        while self._expiry and self._expiry[0][0] <= now:
+            _, hold_id = heapq.heappop(self._expiry)
+            hold = self._holds.pop(hold_id, None)
+            if hold is not None:
+                self._tree(hold['calendar']).remove(hold['start'], hold_id)
+
+    def _check_free(self, calendar, start, end):
+        if self._tree(calendar).find_overlap(start, end) is not None:
+            raise SlotConflict('Orario non più disponibile')
+
+    # --- Operazioni ---
+
+    def is_busy(self, calendar, start, end):
+        """True se [start, end) si sovrappone a prenotazioni o blocchi attivi."""
+        with self._lock:
+            self._purge_expired(time.time())
+            return self._tree(calendar).find_overlap(_timestamp(start), _timestamp(end)) is not None
+
+    def hold(self, calendar, start, end, ttl=None):
+        """
+        Blocca uno slot per `ttl` secondi.
+
+        Returns:
+            dict: Blocco {id, calendar, start, end, expires_at}
+
+        Raises:
+            SlotConflict: Slot già prenotato o bloccato
+        """
+        start, end = _timestamp(start), _timestamp(end)
+        if end <= start:
+            raise BookingError("L'orario di fine deve essere successivo all'inizio")
+
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            self._check_free(calendar, start, end)
+
+            hold = {
+                'kind': 'hold',
+                'id': uuid.uuid4().hex[:12],
+                'calendar': calendar,
+                'start': start,
+                'end': end,
+                'expires_at': now + (ttl or self.hold_seconds),
+            }
+            self._holds[hold['id']] = hold
+            heapq.heappush(self._expiry, (hold['expires_at'], hold['id']))
+            self._tree(calendar).insert(start, end, hold['id'], hold)
+            return dict(hold)
+
+    def release(self, hold_id):
+        """Libera un blocco (es. il cittadino cambia idea)."""
+        with self._lock:
+            hold = self._holds.pop(hold_id, None)
+            if hold is not None:
+                self._tree(hold['calendar']).remove(hold['start'], hold_id)
+            return hold is not None
+
+    def confirm(self, hold_id, **details):
+        """
+        Trasforma un blocco valido in prenotazione (atomico).
+
+        Args:
+            hold_id: ID del blocco
+            **details: name, email, summary, description
+
+        Returns:
+            dict: Prenotazione confermata
+
+        Raises:
+            HoldNotFound: Blocco scaduto, inesistente o già confermato
+        """
+        with self._lock:
+            self._purge_expired(time.time())
+            hold = self._holds.get(hold_id)
+            if hold is None:
+                raise HoldNotFound('Il blocco dello slot è scaduto o non esiste')
+            return self._commit(hold, details)
+
+    def book(self, calendar, start, end, **details):
+        """Blocco e conferma in un'unica operazione atomica."""
+        start, end = _timestamp(start), _timestamp(end)
+        if end <= start:
+            raise BookingError("L'orario di fine deve essere successivo all'inizio")
+        with self._lock:
+            self._purge_expired(time.time())
+            self._check_free(calendar, start, end)
+            hold = {'id': uuid.uuid4().hex[:12], 'calendar': calendar, 'start': start, 'end': end}
+            return self._commit(hold, details, held=False)
+
+    def _commit(self, hold, details, held=True):
+        """Salva la prenotazione e sostituisce il blocco nell'albero (sotto lock)."""
+        booking = {
+            'kind': 'booking',
+            'id': hold['id'],
+            'calendar': hold['calendar'],
+            'start': hold['start'],
+            'end': hold['end'],
+            'status': 'confirmed',
+            'created_at': time.time(),
+            **{field: details.get(field) for field in BOOKING_FIELDS},
+        }
+        self._conn.execute(
+            'INSERT INTO bookings (id, calendar, start, end, status, name, email, summary, '
+            'description, created_at) VALUES (:id, :calendar, :start, :end, :status, :name, '
+            ':email, :summary, :description, :created_at)', booking
+        )
+
+        tree = self._tree(hold['calendar'])
+        if held:
+            del self._holds[hold['id']]
+            tree.remove(hold['start'], hold['id'])
+        tree.insert(booking['start'], booking['end'], booking['id'], booking)
+        return dict(booking)
+
+    def cancel(self, booking_id):
+        """Annulla una prenotazione confermata."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT calendar, start FROM bookings WHERE id = ? AND status = 'confirmed'", (booking_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            self._conn.execute("UPDATE bookings SET status = 'cancelled' WHERE id = ?", (booking_id,))
+            tree = self._tree(row['calendar'])
+            if any(item['id'] == booking_id for item in tree.overlaps(row['start'], row['start'] + 1)):
+                tree.remove(row['start'], booking_id)
+            return True
+
+    def bookings(self, since=None):
+        """Prenotazioni confermate (dalla più vicina), da `since` in poi."""
+        since = _timestamp(since) if since else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM bookings WHERE status = 'confirmed' AND end > ? ORDER BY start", (since,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def to_ics(self):
+        """Prenotazioni future in formato iCal (calendario via URL)."""
+        def stamp(ts):
+            return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+        def escape(text):
+            return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+        lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//Comune di Codroipo//Assistente//IT']
+        for booking in self.bookings(since=datetime.now(timezone.utc)):
+            lines += [
+                'BEGIN:VEVENT',
+                f"UID:{booking['id']}@assistente-codroipo",
+                f"DTSTAMP:{stamp(booking['created_at'])}",
+                f"DTSTART:{stamp(booking['start'])}",
+                f"DTEND:{stamp(booking['end'])}",
+                f"SUMMARY:{escape(booking['summary'] or booking['name'])}",
+                f"LOCATION:{escape(booking['calendar'])}",
+                f"DESCRIPTION:{escape(booking['description'])}",
+                'END:VEVENT',
+            ]
+        lines.append('END:VCALENDAR')
+        return '\r\n'.join(lines) + '\r\n'
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Motore condiviso del processo (aperto alla prima chiamata)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = BookingEngine(hold_seconds=float(os.getenv('BOOKING_HOLD_SECONDS', DEFAULT_HOLD_SECONDS)))
+        return _engine
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Prenotazioni del motore locale')
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help='Esegue N blocchi + conferme su un database temporaneo')
+    args = parser.parse_args()
+
+    if not args.bench:
+        engine = get_engine()
+        bookings = engine.bookings(since=datetime.now(timezone.utc))
+        print(f"Prenotazioni future: {len(bookings)} ({engine.path})")
+        for booking in bookings:
+            start = datetime.fromtimestamp(booking['start']).strftime('%Y-%m-%d %H:%M')
+            print(f"  {start}  {booking['calendar']:<20} {booking['name'] or '-':<24} {booking['id']}")
+        return
+
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = BookingEngine(Path(tmp) / 'bench.db')
+        base = int(time.time()) + 86400
+        slots = [base + i * 1800 for i in range(args.bench // 2)]
+
+        def attempt(i):
+            # Due richieste per ogni slot: una sola deve riuscire
+            start = slots[i % len(slots)]
+            try:
+                hold = engine.hold('Bench', datetime.fromtimestamp(start, timezone.utc),
+                                   datetime.fromtimestamp(start + 1800, timezone.utc))
+                engine.confirm(hold['id'], name=f'Cittadino {i}')
+                return True
+            except SlotConflict:
+                return False
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            confirmed = sum(executor.map(attempt, range(len(slots) * 2)))
+        elapsed = time.perf_counter() - started
+
+        ok = confirmed == len(slots) == len(engine.bookings())
+        print(f"{'✓' if ok else '✗'} {len(slots) * 2} richieste su {len(slots)} slot: "
+              f"{confirmed} confermate, {len(slots) * 2 - confirmed} conflitti")
+        print(f"Tempo: {elapsed:.2f}s ({len(slots) * 2 / elapsed:,.0f} richieste/s)")
+        engine.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+Relay delle email di conferma appuntamento.
+
+Il tool send_appointment_confirmation_email passa dal tool server: il
+messaggio viene salvato in una coda su disco (SQLite, server/.email-queue.db)
+e il tool risponde subito, senza far aspettare al telefono il giro verso
+il provider email. Un thread in background consegna la coda:
+
+- a lotti: fino a EMAIL_BATCH_SIZE messaggi per connessione SMTP (o
+  sessione HTTP), raccolti per pochi decimi di secondo dopo ogni invio
+- retry con backoff esponenziale sugli errori temporanei
+- dead letter: dopo EMAIL_MAX_ATTEMPTS tentativi, o subito per un errore
+  permanente (es. destinatario rifiutato), il messaggio resta nel
+  database con stato 'dead' e l'ultimo errore
+- i messaggi ancora in coda a un riavvio vengono ripresi
+
+Il testo delle email viene dai template per servizio di email_templates.py.
+
+Trasporto da EMAIL_TRANSPORT:
+    smtp      SMTP_HOST (default localhost), SMTP_PORT (default 1025),
+              SMTP_USER, SMTP_PASSWORD, SMTP_STARTTLS=1
+    mailtrap  API di invio Mailtrap (MAILTRAP_API_TOKEN, MAILTRAP_API_URL)
+
+I default SMTP puntano a server/smtp_sink.py, il server SMTP locale per
+le prove.
+
+Uso da linea di comando:
+    python server/email_relay.py                 # Stato della coda
+    python server/email_relay.py --requeue       # Rimette in coda i dead letter
+    python server/email_relay.py --bench 500     # Ack e consegna su SMTP sink locale
+"""
+
+import argparse
+import json
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+
+import requests
+
+import email_templates
+
+DEFAULT_DB_FILE = Path(__file__).parent / '.email-queue.db'
+DEFAULT_MAILTRAP_URL = 'https://sandbox.api.mailtrap.io/api/send/1018537'
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_RETRY_DELAY = 30.0    # secondi, raddoppiati a ogni tentativo
+MAX_RETRY_DELAY = 3600.0
+BATCH_WINDOW = 0.2            # secondi di attesa per raccogliere un lotto
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    message     TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    next_at     REAL NOT NULL,
+    last_error  TEXT,
+    created_at  REAL NOT NULL,
+    sent_at     REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_at);
+"""
+
+logger = logging.getLogger('email_relay')
+
+
+class DeliveryError(Exception):
+    """Consegna fallita; `permanent` = inutile riprovare."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def to_mime(message):
+    """Messaggio (formato Mailtrap) → EmailMessage per SMTP."""
+    mime = EmailMessage()
+    mime['From'] = formataddr((message['from'].get('name', ''), message['from']['email']))
+    mime['To'] = ', '.join(formataddr((to.get('name', ''), to['email'])) for to in message['to'])
+    mime['Subject'] = message['subject']
+    mime.set_content(message['text'])
+    return mime
+
+
+class SMTPTransport:
+    """Consegna via SMTP: una connessione per lotto."""
+
+    def __init__(self, host='localhost', port=1025, username=None, password=None,
+                 starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def send_batch(self, messages):
+        """
+        Consegna un lotto.
+
+        Returns:
+            list: None (consegnato) o DeliveryError, uno per messaggio
+        """
+        results = []
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password or '')
+                for message in messages:
+                    try:
+                        smtp.send_message(to_mime(message))
+                        results.append(None)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        results.append(DeliveryError(f"Destinatario rifiutato: {e.recipients}", permanent=True))
+                    except smtplib.SMTPResponseException as e:
+                        results.append(DeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}",
+                                                     permanent=500 <= e.smtp_code < 600))
+                        if e.smtp_code == 421:
+                            break   # Il server chiude la connessione
+        except (OSError, smtplib.SMTPException) as e:
+            error = DeliveryError(f"Connessione SMTP fallita: {e}")
+            results += [error] * (len(messages) - len(results))
+        results += [DeliveryError('Connessione SMTP chiusa dal server')] * (len(messages) - len(results))
+        return results
+
+
+class MailtrapTransport:
+    """Consegna tramite API di invio Mailtrap: una sessione keep-alive per lotto."""
+
+    def __init__(self, token, url=DEFAULT_MAILTRAP_URL, timeout=10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def send_batch(self, messages):
+        results = []
+        for message in messages:
+            try:
+                response = self.session.post(self.url, json=message, timeout=self.timeout)
+            except requests.RequestException as e:
+                results.append(DeliveryError(f"Richiesta fallita: {e}"))
+                continue
+            if response.ok:
+                results.append(None)
+            else:
+                permanent = 400 <= response.status_code < 500 and response.status_code != 429
+                results.append(DeliveryError(f"HTTP {response.status_code}: {response.text[:200]}", permanent))
+        return results
+
+
+def transport_from_env():
+    """Trasporto configurato da EMAIL_TRANSPORT (default smtp)."""
+    kind = os.getenv('EMAIL_TRANSPORT', 'smtp').lower()
+    if kind == 'mailtrap':
+        token = os.getenv('MAILTRAP_API_TOKEN')
+        if not token:
+            raise ValueError('MAILTRAP_API_TOKEN mancante per EMAIL_TRANSPORT=mailtrap')
+        return MailtrapTransport(token, os.getenv('MAILTRAP_API_URL', DEFAULT_MAILTRAP_URL))
+    if kind != 'smtp':
+        raise ValueError(f"EMAIL_TRANSPORT non valido: {kind} (smtp o mailtrap)")
+    return SMTPTransport(
+        host=os.getenv('SMTP_HOST', 'localhost'),
+        port=int(os.getenv('SMTP_PORT', '1025')),
+        username=os.getenv('SMTP_USER'),
+        password=os.getenv('SMTP_PASSWORD'),
+        starttls=os.getenv('SMTP_STARTTLS', '').lower() in ('1', 'true', 'yes'),
+    )
+
+
+class EmailQueue:
+    """Coda persistente dei messaggi da consegnare; thread-safe."""
+
+    def __init__(self, db_path=None):
+        self.path = Path(db_path or os.getenv('EMAIL_QUEUE_DB') or DEFAULT_DB_FILE)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # FULL: un messaggio confermato al cittadino non deve perdersi
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def enqueue(self, message):
+        """Salva un messaggio in coda; restituisce l'ID."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO outbox (message, next_at, created_at) VALUES (?, ?, ?)',
+                (json.dumps(message, ensure_ascii=False), now, now),
+            )
+            return cursor.lastrowid
+
+    def due(self, limit, now=None):
+        """Messaggi da consegnare ora: lista di (id, messaggio, tentativi)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, message, attempts FROM outbox WHERE status = 'pending' AND next_at <= ? "
+                "ORDER BY next_at, id LIMIT ?",
+                (time.time() if now is None else now, limit),
+            ).fetchall()
+        return [(row['id'], json.loads(row['message']), row['attempts']) for row in rows]
+
+    def next_due(self):
+        """Istante del prossimo messaggio in coda (None se vuota)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_at) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def record(self, sent, failed):
+        """
+        Registra l'esito di un lotto in una sola transazione.
+
+        Args:
+            sent: ID consegnati
+            failed: lista di (id, tentativi, errore, prossimo tentativo o None = dead letter)
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL "
+                "WHERE id = ?",
+                [(now, message_id) for message_id in sent],
+            )
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ?, next_at = COALESCE(?, next_at) "
+                "WHERE id = ?",
+                [('pending' if retry_at else 'dead', attempts, error, retry_at, message_id)
+                 for message_id, attempts, error, retry_at in failed],
+            )
+            self._conn.execute('COMMIT')
+
+    def requeue_dead(self):
+        """Rimette in coda i dead letter (tentativi azzerati)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_at = ? WHERE status = 'dead'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def dead_letters(self, limit=20):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, message, attempts, last_error, created_at FROM outbox "
+                "WHERE status = 'dead' ORDER BY id DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return [dict(row, message=json.loads(row['message'])) for row in rows]
+
+    def stats(self):
+        """Numero di messaggi per stato."""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall()
+        counts = {'pending': 0, 'sent': 0, 'dead': 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class EmailRelay:
+    """Coda + thread di consegna in background."""
+
+    def __init__(self, queue, transport, batch_size=DEFAULT_BATCH_SIZE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY,
+                 batch_window=BATCH_WINDOW):
+        self.queue = queue
+        self.transport = transport
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.batch_window = batch_window
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def submit(self, payload):
+        """
+        Compone l'email di conferma dal template del servizio, la accoda e
+        sveglia il thread di consegna; restituisce l'ID.
+
+        Raises:
+            ValueError: Se data o ora non sono valide
+        """
+        message_id = self.queue.enqueue(email_templates.render(payload))
+        self._wakeup.set()
+        return message_id
+
+    def deliver_due(self):
+        """
+        Consegna un lotto di messaggi in scadenza.
+
+        Returns:
+            int: Messaggi presi in carico (consegnati o no)
+        """
+        batch = self.queue.due(self.batch_size)
+        if not batch:
+            return 0
+
+        results = self.transport.send_batch([message for _, message, _ in batch])
+        now = time.time()
+        sent, failed = [], []
+        for (message_id, _, attempts), error in zip(batch, results):
+            if error is None:
+                sent.append(message_id)
+                continue
+            attempts += 1
+            retry_at = None
+            if not error.permanent and attempts < self.max_attempts:
+                retry_at = now + min(self.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+            else:
+                logger.warning('Email %s in dead letter dopo %d tentativi: %s', message_id, attempts, error)
+            failed.append((message_id, attempts, str(error), retry_at))
+
+        self.queue.record(sent, failed)
+        return len(batch)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            next_at = self.queue.next_due()
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            if timeout is None or timeout > 0:
+                self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                return
+
+            # Breve attesa: le richieste arrivate nel frattempo partono nello stesso lotto
+            time.sleep(self.batch_window)
+            try:
+                while self.deliver_due() == self.batch_size:
+                    pass
+            except Exception:
+                logger.exception('Errore nel relay email')
+                self._stopping.wait(self.retry_delay)
+
+    def start(self):
+        """Avvia la consegna in background (idempotente)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='email-relay', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_relay = None
+_relay_lock = threading.Lock()
+
+
+def get_relay():
+    """Relay condiviso del processo (coda e trasporto da variabili d'ambiente)."""
+    global _relay
+    with _relay_lock:
+        if _relay is None:
+            _relay = EmailRelay(
+                EmailQueue(),
+                transport_from_env(),
+                batch_size=int(os.getenv('EMAIL_BATCH_SIZE', DEFAULT_BATCH_SIZE)),
+                max_attempts=int(os.getenv('EMAIL_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)),
+            )
+        return _relay
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Coda del relay email di conferma')
+    parser.add_argument('--requeue', action='store_true', help='Rimette in coda i dead letter')
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help='Accoda N email e le consegna a un SMTP sink locale (database temporaneo)')
+    args = parser.parse_args()
+
+    if not args.bench:
+        queue = EmailQueue()
+        if args.requeue:
+            print(f"✓ {queue.requeue_dead()} messaggi rimessi in coda")
+        print(f"Coda email ({queue.path}): {queue.stats()}")
+        for dead in queue.dead_letters():
+            print(f"  ✗ #{dead['id']} {dead['message']['to'][0]['email']} "
+                  f"({dead['attempts']} tentativi): {dead['last_error']}")
+        return
+
+    import tempfile
+
+    import smtp_sink
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = smtp_sink.SMTPSink(port=0, directory=Path(tmp) / 'sink', quiet=True)
+        sink.start()
+        relay = EmailRelay(EmailQueue(Path(tmp) / 'bench.db'), SMTPTransport('127.0.0.1', sink.port))
+        relay.start()
+
+        payload = {'citizen_email': 'mario.rossi@example.com', 'citizen_name': 'Mario Rossi',
+                   'service': "Carta d'Identità Elettronica", 'date': '2025-11-10', 'time': '10:00'}
+        acks = []
+        started = time.perf_counter()
+        for _ in range(args.bench):
+            t0 = time.perf_counter()
+            relay.submit(payload)
+            acks.append(time.perf_counter() - t0)
+
+        while sink.received < args.bench and time.perf_counter() - started < 60:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        relay.stop()
+        sink.shutdown()
+
+        acks.sort()
+        ok = sink.received == args.bench
+        print(f"{'✓' if ok else '✗'} {sink.received}/{args.bench} email consegnate in {elapsed:.2f}s "
+              f"({sink.received / elapsed:,.0f}/s, lotti da {relay.batch_size})")
+        print(f"Ack: mediana {acks[len(acks) // 2] * 1000:.2f}ms, "
+              f"p99 {acks[int(len(acks) * 0.99)] * 1000:.2f}ms")
+        relay.queue.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Template delle email di conferma appuntamento, uno per servizio.
+
+Ogni template è compilato una volta dall'indice dei servizi
+(service_index.py): nome ufficiale, ufficio, orari, costo e documenti
+sono già nel testo. Per ogni email vengono sostituiti solo nome del
+cittadino, data e ora, con data e ora anche in parole italiane
+("lunedì dieci novembre duemilaventicinque, alle dieci e trenta").
+
+Il modello passa cinque campi brevi (email, nome, servizio, data, ora)
+invece di scrivere oggetto e corpo dell'email.
+
+I template vengono ricompilati quando cambia l'indice dei servizi. Un
+servizio non presente nell'indice usa il template generico, con i
+documenti eventualmente passati dal modello.
+
+Uso da linea di comando:
+    python server/email_templates.py "carta d'identità" 2025-11-10 10:30 "Mario Rossi"
+"""
+
+import argparse
+import os
+import threading
+import time
+from datetime import date
+from string import Template
+
+import italian_words
+import service_index
+
+SENDER_EMAIL = os.getenv('EMAIL_FROM', 'info@comune-codroipo.it')
+SENDER_NAME = os.getenv('EMAIL_FROM_NAME', 'Comune di Codroipo')
+OFFICE_PHONE = '0432 905511'
+CATEGORY = 'Conferma Appuntamento'
+
+
+def _escape(text):
+    """Testo statico dentro un Template ($ → $$)."""
+    return str(text).replace('$', '$$')
+
+
+def compile_template(name, office=None, hours=None, cost=None, documents=()):
+    """
+    Compila il template di un servizio.
+
+    Returns:
+        tuple[str, Template]: Oggetto (fisso) e corpo con i segnaposto
+        $citizen_name, $date, $date_words, $time, $time_words
+    """
+    lines = [
+        'Gentile $citizen_name,',
+        '',
+        f"ti confermiamo l'appuntamento per {_escape(name)}.",
+        '',
+        'Data: $date_words ($date)',
+        'Ora: $time_words ($time)',
+    ]
+    if office:
+        lines.append(f"Ufficio: {_escape(office)}")
+    if documents:
+        lines += ['', 'Documenti da portare:'] + [f"- {_escape(document)}" for document in documents]
+    if cost:
+        lines += ['', f"Costo: {_escape(cost)}"]
+    if hours:
+        lines.append(f"Orari dell'ufficio: {_escape(hours)}")
+    lines += [
+        '',
+        f"Per modificare o annullare l'appuntamento chiama lo {OFFICE_PHONE}.",
+        '',
+        SENDER_NAME,
+    ]
+    return f"Conferma Appuntamento - {name}", Template('\n'.join(lines) + '\n')
+
+
+class TemplateCache:
+    """Template compilati per slug del servizio, legati a un indice dei servizi."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._templates = {}
+
+    def _refresh(self):
+        """Ricompila tutti i template se l'indice dei servizi è cambiato."""
+        index = service_index.get_index()
+        if index is not self._index:
+            with self._lock:
+                if index is not self._index:
+                    self._templates = {
+                        slug: compile_template(entry['name'], entry.get('office'), entry.get('hours'),
+                                               entry.get('cost'), entry.get('documents') or ())
+                        for slug, entry in index.services.items()
+                    }
+                    self._index = index
+        return index
+
+    def get(self, service, documents=()):
+        """
+        Template per il servizio richiesto (anche con nome parziale).
+
+        Returns:
+            tuple[str, Template]: Oggetto e corpo
+        """
+        index = self._refresh()
+        matches = index.lookup(service)
+        if len(matches) == 1:
+            return self._templates[matches[0][0]]
+        return compile_template(service, documents=documents)
+
+    def __len__(self):
+        self._refresh()
+        return len(self._templates)
+
+
+_cache = TemplateCache()
+
+
+def render(payload, sender_email=SENDER_EMAIL, sender_name=SENDER_NAME):
+    """
+    Email di conferma dai cinque campi del tool.
+
+    Args:
+        payload: {citizen_email, citizen_name, service, date (YYYY-MM-DD),
+                  time (HH:MM), documents? (solo per servizi fuori indice)}
+
+    Returns:
+        dict: {from, to, subject, text, category} (formato API Mailtrap)
+
+    Raises:
+        ValueError: Se data o ora non sono valide
+    """
+    day = date.fromisoformat(str(payload['date']).strip())
+    documents = [str(d) for d in payload.get('documents') or [] if str(d).strip()]
+    subject, body = _cache.get(payload['service'], tuple(documents))
+    hours, minutes = italian_words.parse_time(payload['time'])
+    text = body.substitute(
+        citizen_name=payload['citizen_name'],
+        date=day.strftime('%d/%m/%Y'),
+        date_words=italian_words.date_to_words(day),
+        time=f"{hours:02d}:{minutes:02d}",
+        time_words=italian_words.at_time(payload['time']),
+    )
+    return {
+        'from': {'email': sender_email, 'name': sender_name},
+        'to': [{'email': payload['citizen_email'], 'name': payload['citizen_name']}],
+        'subject': subject,
+        'text': text,
+        'category': CATEGORY,
+    }
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Anteprima dell\'email di conferma appuntamento')
+    parser.add_argument('service', help='Nome (anche parziale) del servizio')
+    parser.add_argument('date', help='Data YYYY-MM-DD')
+    parser.add_argument('time', help='Ora HH:MM')
+    parser.add_argument('name', nargs='?', default='Mario Rossi', help='Nome del cittadino')
+    args = parser.parse_args()
+
+    payload = {'citizen_email': 'cittadino@example.com', 'citizen_name': args.name,
+               'service': args.service, 'date': args.date, 'time': args.time}
+    start = time.perf_counter()
+    print(f"Template compilati: {len(_cache)} ({(time.perf_counter() - start) * 1000:.1f}ms)")
+
+    start = time.perf_counter()
+    message = render(payload)
+    elapsed = (time.perf_counter() - start) * 1e6
+    print(f"Rendering: {elapsed:.0f}µs\n")
+    print(f"Oggetto: {message['subject']}\n")
+    print(message['text'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Numeri, date e orari in parole italiane, come li deve pronunciare
+l'assistente ("duemilaventicinque", non "2025").
+
+- number_to_words: 0 - 999.999.999 (ventuno, ventitré, centottanta, duemila)
+- date_to_words: "lunedì dieci novembre duemilaventicinque" (1 → "primo")
+- time_to_words: "dieci e trenta"; at_time: "alle dieci", "all'una"
+
+I risultati sono in cache (lru_cache): numeri, giorni e orari usati in
+una conversazione sono pochi e sempre gli stessi.
+
+Uso da linea di comando:
+    python server/italian_words.py 2025 2025-11-10 14:30
+"""
+
+import argparse
+from datetime import date, datetime
+from functools import lru_cache
+
+UNITS = [
+    'zero', 'uno', 'due', 'tre', 'quattro', 'cinque', 'sei', 'sette', 'otto', 'nove',
+    'dieci', 'undici', 'dodici', 'tredici', 'quattordici', 'quindici', 'sedici',
+    'diciassette', 'diciotto', 'diciannove',
+]
+TENS = ['', '', 'venti', 'trenta', 'quaranta', 'cinquanta', 'sessanta', 'settanta', 'ottanta', 'novanta']
+MONTHS = [
+    'gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno',
+    'luglio', 'agosto', 'settembre', 'ottobre', 'novembre', 'dicembre',
+]
+WEEKDAYS = ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì', 'sabato', 'domenica']
+
+
+def _join(prefix, rest):
+    """Unisce due parti elidendo la vocale doppia (venti + otto → ventotto)."""
+    if prefix and rest[0] in 'ou' and prefix[-1] in 'aio':
+        return prefix[:-1] + rest
+    return prefix + rest
+
+
+def _below_thousand(n):
+    hundreds, rest = divmod(n, 100)
+    prefix = '' if not hundreds else 'cento' if hundreds == 1 else UNITS[hundreds] + 'cento'
+    if not rest:
+        return prefix
+    if rest < 20:
+        words = UNITS[rest]
+    else:
+        tens, units = divmod(rest, 10)
+        words = TENS[tens] if not units else _join(TENS[tens], UNITS[units])
+    # "centotto", "centottanta" ma "centouno": l'elisione con cento vale solo per otto/ottanta
+    if prefix and words.startswith('o'):
+        return prefix[:-1] + words
+    return prefix + words
+
+
+def _accent(words):
+    """Tre finale accentato nei composti: ventitré, centotré, duemilatré."""
+    return words[:-3] + 'tré' if words.endswith('tre') and words != 'tre' else words
+
+
+def _apocope(words):
+    """Uno troncato davanti a mila/milioni: ventunmila, trentun milioni."""
+    return words[:-1] if words.endswith('uno') else words
+
+
+@lru_cache(maxsize=4096)
+def number_to_words(n):
+    """
+    Numero intero in parole.
+
+    Raises:
+        ValueError: Se il numero è negativo o oltre 999.999.999
+    """
+    n = int(n)
+    if not 0 <= n < 1_000_000_000:
+        raise ValueError(f"Numero fuori intervallo: {n}")
+    if n == 0:
+        return 'zero'
+
+    millions, rest = divmod(n, 1_000_000)
+    thousands, units = divmod(rest, 1000)
+    parts = []
+    if millions:
+        parts.append('un milione' if millions == 1 else f"{_accent(_apocope(_below_thousand(millions)))} milioni")
+    words = ''
+    if thousands:
+        words = 'mille' if thousands == 1 else _apocope(_below_thousand(thousands)) + 'mila'
+    if units:
+        words += _below_thousand(units)
+    if words:
+        parts.append(_accent(words))
+    return ' '.join(parts)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+@lru_cache(maxsize=1024)
+def _date_words(day, weekday):
+    words = f"{'primo' if day.day == 1 else number_to_words(day.day)} {MONTHS[day.month - 1]} {number_to_words(day.year)}"
+    return f"{WEEKDAYS[day.weekday()]} {words}" if weekday else words
+
+
+def date_to_words(value, weekday=True):
+    """
+    Data (date o 'YYYY-MM-DD') in parole: "lunedì dieci novembre duemilaventicinque".
+
+    Raises:
+        ValueError: Se la data non è valida
+    """
+    return _date_words(_as_date(value), weekday)
+
+
+def parse_time(value):
+    """'HH:MM' (o 'HH.MM', o time) → (ore, minuti); ValueError se non valido."""
+    if hasattr(value, 'hour'):
+        return value.hour, value.minute
+    hours, _, minutes = str(value).strip().replace('.', ':').partition(':')
+    hours, minutes = int(hours), int(minutes or 0)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Orario non valido: {value}")
+    return hours, minutes
+
+
+@lru_cache(maxsize=1440)
+def _time_words(hours, minutes):
+    words = 'una' if hours == 1 else number_to_words(hours)
+    return f"{words} e {number_to_words(minutes)}" if minutes else words
+
+
+def time_to_words(value):
+    """
+    Orario ('HH:MM' o time) in parole, formato 24 ore: "quattordici e trenta".
+
+    Raises:
+        ValueError: Se l'orario non è valido
+    """
+    return _time_words(*parse_time(value))
+
+
+def at_time(value):
+    """Orario con preposizione: "alle dieci", "all'una"."""
+    hours, minutes = parse_time(value)
+    words = _time_words(hours, minutes)
+    return f"all'{words}" if hours == 1 else f"alle {words}"
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Numeri, date e orari in parole italiane')
+    parser.add_argument('values', nargs='+', help='Numeri, date YYYY-MM-DD o orari HH:MM')
+    args = parser.parse_args()
+
+    for value in args.values:
+        if '-' in value:
+            words = date_to_words(value)
+        elif ':' in value:
+            words = at_time(value)
+        else:
+            words = number_to_words(int(value))
+        print(f"{value:>12}  {words}")
+
+
+if __name__ == '__main__':
+    main()
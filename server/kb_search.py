@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Ricerca locale nella knowledge base (knowledge-base/*.md) con BM25.
+
+- I file Markdown sono divisi in chunk per heading (##, ###): ogni chunk
+  porta con sé titolo del servizio e percorso delle sezioni
+- Tokenizzazione italiana: minuscole, rimozione accenti, stopword,
+  stemming leggero a suffissi
+- Indice invertito in formato binario compatto (server/.kb-index.bin),
+  aperto con mmap: l'avvio non legge né decodifica l'indice, i chunk
+  vengono decodificati solo quando finiscono tra i risultati
+- Ricostruzione incrementale: solo i file Markdown modificati vengono
+  ritokenizzati, gli altri sono ripresi dall'indice precedente
+- Hot reload: un thread controlla i file e sostituisce l'indice in modo
+  atomico, senza bloccare le query in corso
+
+Uso come modulo:
+    from kb_search import search
+    search("documenti per la carta d'identità", k=3)
+
+Uso da linea di comando:
+    python server/kb_search.py "quanto costa la carta d'identità"
+    python server/kb_search.py "orari anagrafe" -k 5 --bench 1000
+"""
+
+import argparse
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+KB_DIR = ROOT_DIR / 'knowledge-base'
+DEFAULT_INDEX_FILE = Path(__file__).parent / '.kb-index.bin'
+DEFAULT_WATCH_INTERVAL = 2.0   # secondi tra due controlli dei file
+
+# Formato su disco: MAGIC, lunghezza header (uint32), header JSON, sezioni
+# binarie allineate a 8 byte (array nativi, leggibili con memoryview.cast)
+INDEX_MAGIC = b'KBIX'
+INDEX_VERSION = 2
+ALIGN = 8
+MAX_CACHED_TERMS = 50000   # Termini di query già cercati nel dizionario
+
+# Parametri BM25
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2   # I termini di titolo/heading contano doppio
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)$')
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+MARKDOWN_RE = re.compile(r'[*_`>|]|\[([^\]]*)\]\([^)]*\)')
+
+ITALIAN_STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai all anche ancora avere aveva c che chi ci col come con
+cosa cui da dal dalla dalle dallo dagli dai dall dei del della delle dello degli dell
+di dove e ed era essere gli ha hanno ho i il in io l la le lei li lo loro lui ma me
+mi mia mie mio miei ne negli nei nel nella nelle nello nell no noi non nostro o per
+perche piu puo quale quali quando quanto quella quelle quello questa queste questo
+qui se sei si sia sono su sua sue sui sul sulla sulle sullo suo suoi ti tra tu tua
+tuo un una uno vi voi vostro posso devo serve servono come fare faccio vorrei
+""".split())
+
+# Suffissi flessivi e derivativi, dal più lungo al più corto
+SUFFIXES = sorted("""
+azione azioni amento amenti imento imenti mente ita ista iste isti ismo ismi
+abile abili ibile ibili ativo ativa ativi ative anza anze enza enze ore ori
+ice ici ando endo are ere ire ato ata ati ate uto uta uti ute ito iti ite
+i e a o
+""".split(), key=len, reverse=True)
+MIN_STEM = 3
+
+logger = logging.getLogger('kb_search')
+
+
+def fold_accents(text):
+    """Rimuove gli accenti (identità → identita)."""
+    normalized = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch))
+
+
+@lru_cache(maxsize=65536)
+def stem(token):
+    """Stemming leggero: toglie il suffisso più lungo lasciando almeno 3 lettere."""
+    if token.isdigit():
+        return token
+    for suffix in SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text):
+    """Testo → lista di termini normalizzati (senza stopword)."""
+    text = fold_accents(text.lower())
+    return [stem(token) for token in TOKEN_RE.findall(text)
+            if token not in ITALIAN_STOPWORDS and len(token) > 1]
+
+
+def clean_markdown(text):
+    """Testo leggibile da un blocco Markdown (niente link, enfasi, tabelle)."""
+    text = MARKDOWN_RE.sub(lambda m: m.group(1) or '', text)
+    return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+def chunk_markdown(path):
+    """
+    Divide un file Markdown in chunk per heading.
+
+    Returns:
+        list: dict {file, title, section, text}
+    """
+    title = path.stem.replace('-', ' ').capitalize()
+    chunks = []
+    headings = []
+    lines = []
+
+    def flush():
+        text = clean_markdown('\n'.join(lines))
+        if text:
+            chunks.append({
+                'file': path.name,
+                'title': title,
+                'section': ' > '.join(h for _, h in headings[1:]) or title,
+                'text': text,
+            })
+        lines.clear()
+
+    for line in path.read_text(encoding='utf-8').splitlines():
+        match = HEADING_RE.match(line)
+        if not match:
+            if line.strip() != '---':
+                lines.append(line)
+            continue
+
+        flush()
+        level, heading = len(match.group(1)), clean_markdown(match.group(2))
+        if level == 1:
+            title = heading
+        headings = [(lvl, h) for lvl, h in headings if lvl < level] + [(level, heading)]
+
+    flush()
+    return chunks
+
+
+def analyze_file(path):
+    """
+    Chunk di un file con le frequenze dei termini.
+
+    Returns:
+        list: (chunk, {termine: frequenza})
+    """
+    analyzed = []
+    for chunk in chunk_markdown(path):
+        counts = {}
+        for term in tokenize(chunk['text']):
+            counts[term] = counts.get(term, 0) + 1
+        for term in tokenize(f"{chunk['title']} {chunk['section']}"):
+            counts[term] = counts.get(term, 0) + TITLE_WEIGHT
+        analyzed.append((chunk, counts))
+    return analyzed
+
+
+def file_signature(path):
+    """Firma di un file per capire se l'indice è aggiornato."""
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def kb_signatures(kb_dir=KB_DIR):
+    """Firma di tutti i file Markdown della knowledge base."""
+    return {path.name: file_signature(path) for path in sorted(Path(kb_dir).glob('*.md'))}
+
+
+def write_index(path, files, analyzed):
+    """
+    Scrive l'indice binario (scrittura atomica: file temporaneo + rename).
+
+    Args:
+        path: File di destinazione
+        files: nome file → firma
+        analyzed: nome file → lista di (chunk, frequenze), in ordine di chunk
+    """
+    chunk_blobs = []
+    lengths = []
+    postings = {}
+    file_ranges = {}
+
+    for name in sorted(analyzed):
+        start = len(chunk_blobs)
+        for chunk, counts in analyzed[name]:
+            doc_id = len(chunk_blobs)
+            chunk_blobs.append(json.dumps(chunk, ensure_ascii=False).encode('utf-8'))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+        file_ranges[name] = {'signature': files[name], 'start': start, 'end': len(chunk_blobs)}
+
+    n = len(chunk_blobs)
+    avgdl = sum(lengths) / n if n else 0.0
+
+    terms = sorted(postings)
+    term_bytes = [term.encode('utf-8') for term in terms]
+    sections = {
+        'norms': array('d', (K1 * (1 - B + B * length / avgdl) if avgdl else K1 for length in lengths)),
+        'idf': array('d', (math.log(1 + (n - len(postings[t]) + 0.5) / (len(postings[t]) + 0.5))
+                           for t in terms)),
+        'term_offsets': array('I', [0]),
+        'post_offsets': array('I', [0]),
+        'post_docs': array('I'),
+        'post_tfs': array('H'),
+        'chunk_offsets': array('I', [0]),
+    }
+    for term, encoded in zip(terms, term_bytes):
+        sections['term_offsets'].append(sections['term_offsets'][-1] + len(encoded))
+        for doc_id, tf in postings[term]:
+            sections['post_docs'].append(doc_id)
+            sections['post_tfs'].append(min(tf, 0xFFFF))
+        sections['post_offsets'].append(len(sections['post_docs']))
+    for blob in chunk_blobs:
+        sections['chunk_offsets'].append(sections['chunk_offsets'][-1] + len(blob))
+
+    payloads = {name: data.tobytes() for name, data in sections.items()}
+    payloads['term_strings'] = b''.join(term_bytes)
+    payloads['chunks'] = b''.join(chunk_blobs)
+
+    layout = {}
+    offset = 0
+    for name, data in payloads.items():
+        layout[name] = [offset, len(data)]
+        offset += len(data) + (-len(data) % ALIGN)
+
+    header = json.dumps({
+        'version': INDEX_VERSION,
+        'byteorder': sys.byteorder,
+        'chunks': n,
+        'terms': len(terms),
+        'files': file_ranges,
+        'sections': layout,
+    }, separators=(',', ':')).encode('utf-8')
+    header += b' ' * (-(len(header) + 8) % ALIGN)
+
+    path = Path(path)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(INDEX_MAGIC + len(header).to_bytes(4, 'little') + header)
+        for data in payloads.values():
+            f.write(data + b'\0' * (-len(data) % ALIGN))
+    os.replace(tmp_path, path)
+
+
+class KBIndex:
+    """
+    Indice BM25 su file, in sola lettura tramite mmap; thread-safe.
+
+    Le sezioni binarie sono viste come array (memoryview.cast), senza copie:
+    aprire l'indice costa solo la lettura dell'header JSON.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._mm)
+        self._views = [view]
+        if bytes(view[:4]) != INDEX_MAGIC:
+            raise ValueError('Formato indice non riconosciuto')
+        header_len = int.from_bytes(view[4:8], 'little')
+        header = json.loads(bytes(view[8:8 + header_len]))
+        if header.get('version') != INDEX_VERSION or header.get('byteorder') != sys.byteorder:
+            raise ValueError('Versione indice non compatibile')
+
+        self.files = header['files']
+        self.n_chunks = header['chunks']
+        self.n_terms = header['terms']
+
+        base = 8 + header_len
+
+        def section(name, typecode=None):
+            offset, length = header['sections'][name]
+            data = view[base + offset:base + offset + length]
+            self._views.append(data)
+            if typecode:
+                data = data.cast(typecode)
+                self._views.append(data)
+            return data
+
+        self._norms = section('norms', 'd')
+        self._idf = section('idf', 'd')
+        self._term_offsets = section('term_offsets', 'I')
+        self._term_strings = section('term_strings')
+        self._post_offsets = section('post_offsets', 'I')
+        self._post_docs = section('post_docs', 'I')
+        self._post_tfs = section('post_tfs', 'H')
+        self._chunk_offsets = section('chunk_offsets', 'I')
+        self._chunks = section('chunks')
+        self._term_ids = {}
+
+    @classmethod
+    def open(cls, path=DEFAULT_INDEX_FILE):
+        """Apre un indice salvato, o None se assente/di versione diversa."""
+        try:
+            return cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def close(self):
+        """Chiude il mmap (solo se nessuno sta usando l'indice)."""
+        try:
+            for view in reversed(self._views):
+                view.release()
+            self._mm.close()
+        except BufferError:
+            pass   # Viste ancora in uso: verrà chiuso dal garbage collector
+
+    # --- Lettura ---
+
+    def term(self, term_id):
+        start, end = self._term_offsets[term_id], self._term_offsets[term_id + 1]
+        return bytes(self._term_strings[start:end]).decode('utf-8')
+
+    def term_id(self, term):
+        """Posizione del termine nel dizionario (ricerca binaria), o None."""
+        if term in self._term_ids:
+            return self._term_ids[term]
+
+        lo, hi = 0, self.n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < term:
+                lo = mid + 1
+            else:
+                hi = mid
+        term_id = lo if lo < self.n_terms and self.term(lo) == term else None
+        if len(self._term_ids) < MAX_CACHED_TERMS:
+            self._term_ids[term] = term_id
+        return term_id
+
+    def postings(self, term_id):
+        """Coppie (chunk, frequenza) di un termine."""
+        start, end = self._post_offsets[term_id], self._post_offsets[term_id + 1]
+        return zip(self._post_docs[start:end], self._post_tfs[start:end])
+
+    def chunk(self, doc_id):
+        """Chunk decodificato: dict {file, title, section, text}."""
+        start, end = self._chunk_offsets[doc_id], self._chunk_offsets[doc_id + 1]
+        return json.loads(bytes(self._chunks[start:end]))
+
+    def changed_files(self, signatures):
+        """Nomi dei file aggiunti, modificati o rimossi rispetto all'indice."""
+        indexed = {name: entry['signature'] for name, entry in self.files.items()}
+        return {name for name in indexed.keys() | signatures.keys()
+                if indexed.get(name) != signatures.get(name)}
+
+    def analyzed_files(self, names):
+        """
+        Chunk e frequenze dei file già indicizzati, ricostruiti dai postings
+        (nessuna ritokenizzazione).
+
+        Returns:
+            dict: nome file → lista di (chunk, frequenze)
+        """
+        owners = {}
+        for name in names:
+            entry = self.files[name]
+            for doc_id in range(entry['start'], entry['end']):
+                owners[doc_id] = {}
+
+        if owners:
+            first, last = min(owners), max(owners)
+            for term_id in range(self.n_terms):
+                term = None
+                for doc_id, tf in self.postings(term_id):
+                    if first <= doc_id <= last and doc_id in owners:
+                        term = term or self.term(term_id)
+                        owners[doc_id][term] = tf
+
+        return {
+            name: [(self.chunk(doc_id), owners[doc_id])
+                   for doc_id in range(self.files[name]['start'], self.files[name]['end'])]
+            for name in names
+        }
+
+    # --- Ricerca ---
+
+    def search(self, query, k=5):
+        """
+        Top-k chunk per la query (BM25).
+
+        Returns:
+            list: dict {file, title, section, text, score}, dal più rilevante
+        """
+        scores = {}
+        norms = self._norms
+        for term in set(tokenize(query)):
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            idf = self._idf[term_id]
+            for doc_id, tf in self.postings(term_id):
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norms[doc_id])
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [dict(self.chunk(doc_id), score=round(score, 4)) for doc_id, score in best]
+
+
+def build(kb_dir=KB_DIR, index_path=DEFAULT_INDEX_FILE, previous=None):
+    """
+    Costruisce l'indice e lo salva; con `previous` ritokenizza solo i file cambiati.
+
+    Returns:
+        tuple: (KBIndex, numero di file ritokenizzati)
+    """
+    signatures = kb_signatures(kb_dir)
+    reused = set()
+    if previous is not None:
+        reused = signatures.keys() - previous.changed_files(signatures)
+
+    analyzed = previous.analyzed_files(reused) if reused else {}
+    changed = sorted(signatures.keys() - reused)
+    for name in changed:
+        analyzed[name] = analyze_file(Path(kb_dir) / name)
+
+    write_index(index_path, signatures, analyzed)
+    return KBIndex(index_path), len(changed)
+
+
+def load_or_build(kb_dir=KB_DIR, index_path=DEFAULT_INDEX_FILE, rebuild=False):
+    """Indice da disco se aggiornato, altrimenti lo aggiorna (incrementale) e salva."""
+    index = None if rebuild else KBIndex.open(index_path)
+    if index is None or index.changed_files(kb_signatures(kb_dir)):
+        index, _ = build(kb_dir, index_path, previous=index)
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()       # Primo caricamento
+_reload_lock = threading.Lock()      # Una sola ricostruzione alla volta
+_watcher = None
+
+
+def get_index():
+    """
+    Indice condiviso del processo (caricato alla prima ricerca).
+
+    Le query usano il riferimento corrente senza lock: una ricarica
+    sostituisce il riferimento, le query in corso finiscono sul vecchio.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_or_build()
+    return _index
+
+
+def reload_if_changed(kb_dir=KB_DIR, index_path=DEFAULT_INDEX_FILE):
+    """
+    Aggiorna l'indice condiviso se i file Markdown o l'indice su disco sono cambiati.
+
+    Returns:
+        bool: True se l'indice è stato sostituito
+    """
+    global _index
+    with _reload_lock:
+        current = get_index()
+        start = time.perf_counter()
+
+        if current.changed_files(kb_signatures(kb_dir)):
+            index, changed = build(kb_dir, index_path, previous=current)
+            logger.info('Indice aggiornato: %d file ritokenizzati su %d (%.0fms)',
+                        changed, len(index.files), (time.perf_counter() - start) * 1000)
+        else:
+            # Indice ricostruito da un altro processo (es. CLI --rebuild)
+            try:
+                stat = os.stat(index_path)
+            except OSError:
+                return False
+            if (stat.st_ino, stat.st_mtime_ns) == current.identity:
+                return False
+            index = KBIndex.open(index_path)
+            if index is None:
+                return False
+            logger.info('Indice ricaricato da disco')
+
+        _index = index   # Swap atomico; il vecchio mmap si chiude con l'ultimo riferimento
+        return True
+
+
+def start_watcher(interval=DEFAULT_WATCH_INTERVAL):
+    """Avvia (una volta) il thread che ricarica l'indice quando la KB cambia."""
+    global _watcher
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                reload_if_changed()
+            except Exception:
+                logger.exception("Errore nell'aggiornamento dell'indice")
+
+    with _index_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=watch, name='kb-index-watcher', daemon=True)
+            _watcher.start()
+    return _watcher
+
+
+def search(query, k=5):
+    """Cerca nella knowledge base locale (vedi KBIndex.search)."""
+    return get_index().search(query, k)
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Ricerca BM25 nella knowledge base locale')
+    parser.add_argument('query', help='Domanda o parole chiave')
+    parser.add_argument('-k', type=int, default=3, help='Numero di risultati (default: 3)')
+    parser.add_argument('--rebuild', action='store_true', help="Ricostruisce l'indice da zero")
+    parser.add_argument('--bench', type=int, metavar='N',
+                        help='Ripete la query N volte e stampa il tempo medio')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = load_or_build(rebuild=args.rebuild)
+    load_ms = (time.perf_counter() - start) * 1000
+    size_kb = index.path.stat().st_size / 1024
+    print(f"Indice: {index.n_chunks} chunk, {index.n_terms} termini, "
+          f"{size_kb:.0f} KB ({load_ms:.1f}ms)")
+
+    start = time.perf_counter()
+    results = index.search(args.query, args.k)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    for i, result in enumerate(results, 1):
+        print(f"\n{i}. [{result['score']:.2f}] {result['title']} — {result['section']} ({result['file']})")
+        preview = ' '.join(result['text'].split())
+        print(f"   {preview[:200]}{'…' if len(preview) > 200 else ''}")
+
+    if not results:
+        print("\nNessun risultato")
+    print(f"\nQuery: {query_ms:.3f}ms")
+
+    if args.bench:
+        start = time.perf_counter()
+        for _ in range(args.bench):
+            index.search(args.query, args.k)
+        per_query = (time.perf_counter() - start) / args.bench * 1e6
+        print(f"Benchmark: {args.bench} query, {per_query:.1f}µs/query")
+
+    sys.exit(0 if results else 1)
+
+
+if __name__ == '__main__':
+    main()
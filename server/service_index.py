@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Indice dei servizi comunali: slug → nome, ufficio, documenti, orari, costo.
+
+L'indice (knowledge-base/services-index.json) è generato da
+scraper/generate_knowledge_base.py insieme ai file Markdown. Serve al tool
+get_service_info: una sola chiamata restituisce la lista dei documenti da
+portare, senza far ricostruire al modello i documenti dai chunk della KB.
+
+Ricerca del servizio:
+- esatta sullo slug o sul nome (senza accenti e maiuscole)
+- fuzzy: quota dei termini della richiesta presenti nel nome (stessa
+  tokenizzazione di kb_search, "carta d'identità" → CIE) oppure
+  similarità sui trigrammi di caratteri (errori di battitura)
+
+Il file viene riletto automaticamente quando cambia.
+
+Uso da linea di comando:
+    python server/service_index.py "carta d'identità"
+"""
+
+import argparse
+import json
+import threading
+import time
+
+import answer_cache
+import kb_search
+import spoken_form
+
+DEFAULT_INDEX_FILE = kb_search.KB_DIR / 'services-index.json'
+MIN_SCORE = 0.5     # punteggio minimo per un match fuzzy
+
+
+def fold(text):
+    """Minuscole, senza accenti e spazi doppi."""
+    return ' '.join(kb_search.fold_accents(text.lower()).split())
+
+
+class ServiceIndex:
+    """Indice dei servizi in memoria, con ricerca esatta e fuzzy."""
+
+    def __init__(self, services, signature=None):
+        self.services = services
+        self.signature = signature
+        self._exact = {}
+        self._terms = {}
+        self._grams = {}
+        for slug, entry in services.items():
+            self._exact[fold(slug)] = slug
+            self._exact[fold(slug.replace('-', ' '))] = slug
+            self._exact[fold(entry['name'])] = slug
+            # Nome come lo legge il modello nelle risposte dei tool ("Servizio 8" → "Servizio otto")
+            self._exact[fold(spoken_form.normalize(entry['name']))] = slug
+            terms = set(kb_search.tokenize(f"{entry['name']} {slug.replace('-', ' ')}"))
+            self._terms[slug] = terms
+            self._grams[slug] = answer_cache.trigrams(' '.join(sorted(terms)))
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_FILE):
+        """Legge l'indice da disco (indice vuoto se il file non esiste)."""
+        try:
+            signature = kb_search.file_signature(path)
+            with open(path, 'r', encoding='utf-8') as f:
+                services = json.load(f)['services']
+        except FileNotFoundError:
+            return cls({})
+        return cls(services, signature)
+
+    def lookup(self, query):
+        """
+        Servizi corrispondenti alla richiesta.
+
+        Returns:
+            list[tuple[str, dict, float]]: (slug, voce, punteggio); un solo
+            elemento se il match è esatto o non ambiguo, più elementi a
+            pari punteggio, lista vuota se nessun servizio supera MIN_SCORE
+        """
+        slug = self._exact.get(fold(query))
+        if slug is not None:
+            return [(slug, self.services[slug], 1.0)]
+
+        terms = set(kb_search.tokenize(query))
+        if not terms:
+            return []
+        grams = answer_cache.trigrams(' '.join(sorted(terms)))
+
+        scored = []
+        for slug, service_terms in self._terms.items():
+            containment = len(terms & service_terms) / len(terms)
+            service_grams = self._grams[slug]
+            overlap = len(grams & service_grams)
+            similarity = overlap / (len(grams) + len(service_grams) - overlap)
+            score = max(containment, similarity)
+            if score >= MIN_SCORE:
+                scored.append((score, slug))
+
+        if not scored:
+            return []
+        best = max(score for score, _ in scored)
+        return [(slug, self.services[slug], round(score, 3))
+                for score, slug in sorted(scored, reverse=True) if score == best]
+
+
+def describe(entry):
+    """Testo per il modello: nome, ufficio, orari, costo e documenti."""
+    lines = [entry['name']]
+    if entry.get('office'):
+        lines.append(f"Ufficio: {entry['office']}")
+    if entry.get('hours'):
+        lines.append(f"Orari: {entry['hours']}")
+    if entry.get('cost'):
+        lines.append(f"Costo: {entry['cost']}")
+    if entry.get('documents'):
+        lines.append('Documenti necessari:')
+        lines.extend(f"- {document}" for document in entry['documents'])
+    else:
+        lines.append('Documenti necessari: non indicati, verificare con l\'ufficio')
+    return '\n'.join(lines)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(path=DEFAULT_INDEX_FILE):
+    """Indice condiviso del processo, riletto se il file è cambiato."""
+    global _index
+    try:
+        signature = kb_search.file_signature(path)
+    except FileNotFoundError:
+        signature = None
+
+    if _index is None or _index.signature != signature:
+        with _index_lock:
+            if _index is None or _index.signature != signature:
+                _index = ServiceIndex.load(path)
+    return _index
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Cerca un servizio nell\'indice dei servizi')
+    parser.add_argument('query', help='Nome (anche parziale) del servizio')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = get_index()
+    print(f"Indice: {len(index.services)} servizi ({(time.perf_counter() - start) * 1000:.1f}ms)")
+
+    start = time.perf_counter()
+    matches = index.lookup(args.query)
+    elapsed = (time.perf_counter() - start) * 1e6
+    print(f"{len(matches)} risultati ({elapsed:.0f}µs)\n")
+    for slug, entry, score in matches:
+        print(f"[{score:.2f}] {slug}")
+        print(describe(entry))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Server SMTP locale per le prove del relay email: accetta ogni messaggio e
+lo salva su disco invece di consegnarlo.
+
+- Comandi SMTP essenziali (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT),
+  più connessioni in parallelo
+- Messaggi salvati come file .eml in server/.smtp-sink/ (o --dir)
+- --fail-rate simula errori temporanei (451) per provare retry e backoff
+
+Uso:
+    python server/smtp_sink.py --port 1025
+    python server/smtp_sink.py --port 1025 --fail-rate 0.2
+
+Con il relay: EMAIL_TRANSPORT=smtp, SMTP_HOST=localhost, SMTP_PORT=1025
+(i valori di default di email_relay.py).
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+from email import message_from_bytes
+from pathlib import Path
+
+DEFAULT_PORT = 1025
+DEFAULT_DIR = Path(__file__).parent / '.smtp-sink'
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Una sessione SMTP."""
+
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def reset(self):
+        self.sender = None
+        self.recipients = []
+
+    def handle(self):
+        self.reset()
+        self.reply('220 smtp-sink pronto')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode('utf-8', 'replace').strip().partition(' ')
+            command = command.upper()
+
+            if command == 'EHLO':
+                self.reply('250-smtp-sink')
+                self.reply('250 8BITMIME')
+            elif command == 'HELO':
+                self.reply('250 smtp-sink')
+            elif command == 'MAIL':
+                self.reset()
+                self.sender = argument.partition(':')[2].strip().split(' ')[0]
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                if self.sender is None:
+                    self.reply('503 MAIL richiesto prima di RCPT')
+                    continue
+                self.recipients.append(argument.partition(':')[2].strip())
+                self.reply('250 OK')
+            elif command == 'DATA':
+                if not self.recipients:
+                    self.reply('503 RCPT richiesto prima di DATA')
+                    continue
+                self.reply('354 Fine dati con <CRLF>.<CRLF>')
+                self.receive_data()
+            elif command == 'RSET':
+                self.reset()
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Arrivederci')
+                return
+            else:
+                self.reply('502 Comando non supportato')
+
+    def receive_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+
+        if random.random() < self.server.fail_rate:
+            self.reply('451 Errore temporaneo simulato')
+        else:
+            self.server.store(b''.join(lines), self.sender, self.recipients)
+            self.reply('250 OK messaggio salvato')
+        self.reset()
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Server SMTP che salva i messaggi ricevuti in una directory."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, directory=DEFAULT_DIR,
+                 fail_rate=0.0, quiet=False):
+        super().__init__((host, port), SMTPHandler)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fail_rate = fail_rate
+        self.quiet = quiet
+        self.received = 0
+        self._lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def store(self, data, sender, recipients):
+        with self._lock:
+            self.received += 1
+            number = self.received
+        (self.directory / f"{number:06d}.eml").write_bytes(data)
+        if not self.quiet:
+            subject = message_from_bytes(data).get('Subject', '')
+            print(f"📨 {sender} → {', '.join(recipients)}: {subject}")
+
+    def start(self):
+        """Avvia il server in un thread in background (per prove e benchmark)."""
+        thread = threading.Thread(target=self.serve_forever, name='smtp-sink', daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Server SMTP locale che salva i messaggi ricevuti')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--dir', default=str(DEFAULT_DIR), help='Directory dei file .eml')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='Quota di messaggi rifiutati con errore temporaneo (0-1)')
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.dir, args.fail_rate)
+    print(f"📭 SMTP sink su {args.host}:{sink.port}, messaggi in {sink.directory}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{sink.received} messaggi ricevuti")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Forma parlata italiana per le risposte dei tool.
+
+Le risposte del tool server (snippet della knowledge base, schede dei
+servizi, orari liberi, prenotazioni) passano da normalize() prima di
+arrivare al modello: numeri, date, orari, importi, telefoni e indirizzi
+email sono già scritti come vanno pronunciati. Il system prompt tiene
+solo poche regole di pronuncia, per i tool che non passano dal tool
+server (Google Calendar, Mailtrap, KB remota).
+
+    2025-11-17            → lunedì diciassette novembre duemilaventicinque (`2025-11-17`)
+    10/11/2025            → dieci novembre duemilaventicinque
+    8:30-12:30            → dalle otto e trenta alle dodici e trenta
+    alle 13:00, alle 1:00 → alle tredici, all'una
+    22,21 euro            → ventidue euro e ventuno centesimi
+    0432 905511           → zero quattro tre due, nove zero cinque, cinque uno uno
+    mario.rossi@email.com → mario punto rossi chiocciola email punto com
+    2 foto, 2025          → due foto, duemilaventicinque
+
+Le date ISO restano anche in forma `YYYY-MM-DD` tra backtick: sono i
+valori da ripassare ai tool. Il testo tra backtick e gli URL non vengono
+toccati.
+
+Un'unica espressione regolare precompilata riconosce tutti i casi in una
+sola passata, saltando il testo senza cifre; numeri, date e orari in parole vengono da italian_words.py
+(in cache), e anche i testi normalizzati sono in cache: le risposte
+ricorrenti (cache delle domande, schede dei servizi) si normalizzano una
+volta sola.
+
+Uso da linea di comando:
+    python server/spoken_form.py "Aperto lunedì dalle 8:30 alle 12:30, costo 22,21 euro"
+"""
+
+import argparse
+import re
+import time
+from datetime import date
+from functools import lru_cache
+
+import italian_words
+
+TIME = r"(?:[01]?\d|2[0-3])[:.][0-5]\d"
+AMOUNT = r"\d{1,3}(?:\.\d{3})+|\d+"
+
+# Ogni alternativa inizia con una cifra o un simbolo: il lookahead iniziale
+# fa saltare al motore regex tutto il testo senza cifre. Preposizioni
+# ("alle", "dalle"), giorno della settimana e parte locale delle email
+# stanno prima del match e sono cercati a ritroso (PREFIX_RE, LOCAL_PART_RE).
+SPOKEN_RE = re.compile(
+    rf"""(?=[\d`@€+hw])
+    (?:
+      (?P<protected>`[^`\n]*`|(?<!\w)https?://\S+|(?<![\w.])www\.\S+)
+    | (?P<email>@[\w-]+(?:\.[\w-]+)+)
+    | (?<!\d)(?P<iso>\d{{4}}-\d{{2}}-\d{{2}})(?!\d)
+    | (?<![\d/])(?P<date>\d{{1,2}}/\d{{1,2}}/\d{{4}})(?![\d/])
+    | (?<![\d.,:])(?P<range_from>{TIME})\ ?[-–]\ ?(?P<range_to>{TIME})(?!\d)
+    | €\ ?(?P<euro_before>{AMOUNT})(?:,(?P<cents_before>\d{{1,2}}))?(?!\d)
+    | (?<![\d.,])(?P<euro_after>{AMOUNT})(?:,(?P<cents_after>\d{{1,2}}))?\ ?(?:€|[Ee]uro\b|EUR\b)
+    | (?<![\d.,:])(?P<time>{TIME})(?![\d:])
+    | (?<![\w+])(?P<phone>(?:\+39\ ?)?(?:0\d{{1,3}}|3\d{{2}})[\ ./]?\d{{5,8}})(?!\d)
+    | (?<![\w.,])(?P<percent>\d+(?:,\d+)?)\ ?%
+    | (?<![\w.,:])(?P<number>{AMOUNT})(?:,(?P<decimals>\d+))?(?!\w|[.,:]\d)
+    )""",
+    re.VERBOSE,
+)
+PREFIX_RE = re.compile(
+    rf"\b(?P<prefix>{'|'.join(italian_words.WEEKDAYS)}|dalle|dall'|alle|all'|le) ?\Z",
+    re.IGNORECASE,
+)
+PREFIX_WINDOW = 12          # caratteri prima del match in cui cercare PREFIX_RE
+LOCAL_PART_RE = re.compile(r"(?<![\w.+-])[\w.+-]+\Z")
+
+EMAIL_SYMBOLS = {'.': 'punto', '@': 'chiocciola', '-': 'trattino', '_': 'trattino basso', '+': 'più'}
+EMAIL_PART_RE = re.compile(r"[a-zà-ÿ]+|\d|[.@_+-]", re.IGNORECASE)
+
+
+def _keep_case(original, words):
+    """Maiuscola iniziale se il testo originale la aveva (inizio frase)."""
+    return words[0].upper() + words[1:] if original[:1].isupper() else words
+
+
+def _digits(text):
+    """Cifre una per una: '0432' → 'zero quattro tre due'."""
+    return ' '.join(italian_words.UNITS[int(digit)] for digit in text if digit.isdigit())
+
+
+def _integer(text):
+    """'1.000' → 'mille'; None se il numero è troppo grande."""
+    try:
+        return italian_words.number_to_words(int(text.replace('.', '')))
+    except ValueError:
+        return None
+
+
+def _decimal(integer, decimals):
+    """Numero con la virgola: 'uno virgola cinque', 'zero virgola zero cinque'."""
+    words = _integer(integer)
+    if words is None or not decimals:
+        return words
+    tail = _digits(decimals) if decimals.startswith('0') else italian_words.number_to_words(int(decimals))
+    return f"{words} virgola {tail}"
+
+
+def _from_time(value):
+    """Inizio di un intervallo: "dalle otto e trenta", "dall'una"."""
+    return 'dall' + italian_words.at_time(value)[3:]
+
+
+def _euro(amount, cents):
+    """'22', '21' → 'ventidue euro e ventuno centesimi'."""
+    euros = _integer(amount)
+    if euros is None:
+        return None
+    cents = int(cents.ljust(2, '0')) if cents else 0
+    words = [] if euros == 'zero' and cents else ['un euro' if euros == 'uno' else f"{euros} euro"]
+    if cents:
+        words.append('un centesimo' if cents == 1 else f"{italian_words.number_to_words(cents)} centesimi")
+    return ' e '.join(words)
+
+
+def _phone(number):
+    """Prefisso e poi gruppi di tre cifre: 'zero quattro tre due, nove zero cinque, cinque uno uno'."""
+    prefix = ''
+    if number.startswith('+39'):
+        prefix, number = 'più tre nove, ', number[3:]
+    digits = re.sub(r"\D", '', number)
+    head = re.match(r"\d+", number.strip()).group()
+    if head == digits:   # numero senza separatori: 0 + 3 cifre (fisso) o 3 cifre (cellulare)
+        head = digits[:4] if digits.startswith('0') else digits[:3]
+    rest = digits[len(head):]
+    groups = [rest[i:i + 3] for i in range(0, len(rest), 3)]
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        groups[-2:] = [groups[-2] + groups[-1]]
+    return prefix + ', '.join(_digits(group) for group in [head] + groups)
+
+
+def _email(address):
+    """'mario.rossi@email.com' → 'mario punto rossi chiocciola email punto com'."""
+    words = []
+    for part in EMAIL_PART_RE.findall(address):
+        if part in EMAIL_SYMBOLS:
+            words.append(EMAIL_SYMBOLS[part])
+        elif part.isdigit():
+            words.append(_digits(part))
+        elif len(part) <= 2:
+            words.append(' '.join(part.lower()))   # "ud", "it": lettera per lettera
+        else:
+            words.append(part.lower())
+    return ' '.join(words)
+
+
+def _prefix(before, allowed):
+    """Preposizione o giorno della settimana subito prima del match: (parola, lunghezza)."""
+    prefix = PREFIX_RE.search(before, max(0, len(before) - PREFIX_WINDOW))
+    if prefix is None or prefix.group('prefix').lower() not in allowed:
+        return '', 0
+    return prefix.group('prefix'), len(prefix.group())
+
+
+def _replace(match, before):
+    """
+    Forma parlata di un match di SPOKEN_RE.
+
+    Args:
+        match: Match di SPOKEN_RE
+        before: Testo tra il match precedente e questo
+
+    Returns:
+        tuple[int, str | None]: Caratteri di `before` assorbiti (preposizione,
+        giorno, parte locale dell'email) e testo parlato, None per lasciare
+        il testo originale
+    """
+    groups = match.groupdict()
+    if groups['protected'] is not None:
+        return 0, None
+
+    if groups['email'] is not None:
+        local = LOCAL_PART_RE.search(before)
+        if local is None:
+            return 0, None
+        return len(local.group()), _email(local.group() + match.group())
+
+    if groups['iso'] is not None:
+        weekday, taken = _prefix(before, italian_words.WEEKDAYS)
+        words = italian_words.date_to_words(groups['iso'])
+        return taken, f"{_keep_case(weekday, words)} (`{groups['iso']}`)"
+
+    if groups['date'] is not None:
+        day, month, year = (int(part) for part in groups['date'].split('/'))
+        return 0, italian_words.date_to_words(date(year, month, day), weekday=False)
+
+    if groups['range_from'] is not None:
+        prep, taken = _prefix(before, ('dalle', "dall'", 'le'))
+        words = f"{_from_time(groups['range_from'])} {italian_words.at_time(groups['range_to'])}"
+        return taken, _keep_case(prep, words)
+
+    if groups['euro_before'] is not None or groups['euro_after'] is not None:
+        return 0, _euro(groups['euro_before'] or groups['euro_after'],
+                        groups['cents_before'] or groups['cents_after'])
+
+    if groups['time'] is not None:
+        prep, taken = _prefix(before, ('alle', 'dalle', "all'", "dall'"))
+        if prep.lower().startswith('dall'):
+            words = _from_time(groups['time'])
+        elif prep:
+            words = italian_words.at_time(groups['time'])
+        else:
+            words = italian_words.time_to_words(groups['time'])
+        return taken, _keep_case(prep, words)
+
+    if groups['phone'] is not None:
+        return 0, _phone(groups['phone'])
+
+    if groups['percent'] is not None:
+        integer, _, decimals = groups['percent'].partition(',')
+        words = _decimal(integer, decimals)
+        return 0, words and f"{words} per cento"
+
+    # Numeri degli elenchi puntati ("1. Prenota...") lasciati come sono
+    line = before[before.rfind('\n') + 1:]
+    at_line_start = not line.strip() and ('\n' in before or match.start() == len(before))
+    if at_line_start and match.string.startswith('.', match.end()):
+        return 0, None
+    return 0, _decimal(groups['number'], groups['decimals'])
+
+
+@lru_cache(maxsize=2048)
+def normalize(text):
+    """
+    Testo con numeri, date, orari, importi, telefoni ed email in forma parlata.
+
+    Args:
+        text: Risposta di un tool o snippet della knowledge base
+
+    Returns:
+        str: Testo pronto per essere letto dal modello
+    """
+    if not text:
+        return text
+    parts = []
+    last = 0
+    for match in SPOKEN_RE.finditer(text):
+        before = text[last:match.start()]
+        try:
+            taken, words = _replace(match, before)
+        except ValueError:
+            taken, words = 0, None   # data o orario inesistente (es. 2025-02-30)
+        if words is None:
+            parts.append(text[last:match.end()])
+        else:
+            parts += [before[:len(before) - taken], words]
+        last = match.end()
+    parts.append(text[last:])
+    return ''.join(parts)
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Forma parlata italiana di un testo')
+    parser.add_argument('text', nargs='+', help='Testo da normalizzare')
+    args = parser.parse_args()
+
+    text = ' '.join(args.text)
+    start = time.perf_counter()
+    spoken = normalize(text)
+    elapsed = (time.perf_counter() - start) * 1e6
+    print(spoken)
+    print(f"\n({elapsed:.0f}µs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Server webhook per i tool custom dell'assistente Vapi.ai.
+
+Vapi chiama POST /webhook con un messaggio "tool-calls"; il server
+risponde con i risultati di tutte le chiamate della lista. Le risposte
+arrivano dalla memoria del processo (indice della knowledge base mappato
+all'avvio), senza passare da provider esterni, e sono già in forma
+parlata: numeri, date, orari, importi e telefoni scritti in parole
+italiane (vedi spoken_form.py). Se knowledge-base/ cambia
+l'indice viene aggiornato a caldo, senza riavviare il server.
+
+Tool disponibili:
+    search_services   Ricerca nella knowledge base locale (BM25), con cache
+                      delle domande ricorrenti (vedi answer_cache.py)
+    get_service_info  Scheda di un servizio (ufficio, orari, costo,
+                      documenti) dall'indice dei servizi (vedi service_index.py)
+    google_calendar_check_availability
+                      Orari liberi degli uffici, dagli slot precalcolati
+                      in memoria (vedi availability.py), esclusi quelli
+                      bloccati o prenotati
+    hold_appointment_slot
+                      Blocca per qualche minuto l'orario scelto
+    google_calendar_book_appointment
+                      Prenotazione atomica (vedi booking.py)
+    send_appointment_confirmation_email
+                      Email di conferma: accodata su disco e consegnata
+                      in background (vedi email_relay.py)
+
+Endpoint:
+    POST /webhook        Tool call di Vapi
+    GET  /calendar.ics   Prenotazioni in formato iCal (?token=TOOL_SERVER_SECRET)
+    GET  /health         Stato del server
+
+Configurazione da variabili d'ambiente:
+    TOOL_SERVER_SECRET   Se presente, richiesto nell'header X-Vapi-Secret
+    EMAIL_TRANSPORT      Consegna delle email (smtp o mailtrap, vedi email_relay.py)
+
+Uso:
+    python server/tool_server.py --port 8080
+    curl -X POST localhost:8080/webhook -H 'Content-Type: application/json' \\
+         -d '{"message": {"type": "tool-calls", "toolCallList": [{"id": "1",
+              "function": {"name": "search_services",
+                           "arguments": {"query": "carta d identità"}}}]}}'
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+
+from flask import Flask, Response, jsonify, request
+
+try:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+except ImportError:
+    pass
+
+import answer_cache
+import availability
+import booking
+import email_relay
+import italian_words
+import kb_search
+import service_index
+import spoken_form
+
+DEFAULT_PORT = 8080
+DEFAULT_RESULTS = 3
+MAX_RESULTS = 5
+MAX_SNIPPET_CHARS = 600   # Per risultato: il testo finisce nel contesto del modello
+EMAIL_FIELDS = ('citizen_email', 'citizen_name', 'service', 'date', 'time')
+EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+logger = logging.getLogger('tool_server')
+
+
+class ToolError(Exception):
+    """Errore di un tool, restituito a Vapi come messaggio (non come 500)."""
+
+
+def search_services(arguments):
+    """
+    Tool search_services: sezioni della knowledge base più rilevanti.
+
+    Le domande già viste (o presenti tra le FAQ) sono risposte dalla
+    cache, senza eseguire la ricerca.
+
+    Args:
+        arguments: {query, limit?}
+
+    Returns:
+        str: Risultati in testo semplice, pronti per il modello
+    """
+    query = str(arguments.get('query') or '').strip()
+    if not query:
+        raise ToolError("Parametro 'query' mancante")
+
+    try:
+        limit = int(arguments.get('limit') or DEFAULT_RESULTS)
+    except (TypeError, ValueError):
+        limit = DEFAULT_RESULTS
+    limit = max(1, min(limit, MAX_RESULTS))
+
+    # Solo le risposte con il numero di risultati di default sono in cache
+    cache = answer_cache.get_cache() if limit == DEFAULT_RESULTS else None
+    if cache is not None:
+        cached = cache.get(query)
+        if cached is not None:
+            return cached
+
+    results = kb_search.search(query, k=limit)
+    if not results:
+        return "Nessuna informazione trovata nella knowledge base per questa richiesta."
+
+    blocks = []
+    for result in results:
+        text = ' '.join(result['text'].split())
+        if len(text) > MAX_SNIPPET_CHARS:
+            text = text[:MAX_SNIPPET_CHARS].rsplit(' ', 1)[0] + '…'
+        blocks.append(f"{result['title']} — {result['section']}\n{text}")
+    answer = '\n\n'.join(blocks)
+
+    if cache is not None:
+        cache.put(query, answer)
+    return answer
+
+
+def service_info(arguments):
+    """
+    Tool get_service_info: scheda di un servizio con i documenti da portare.
+
+    Args:
+        arguments: {service}
+
+    Returns:
+        str: Scheda del servizio, o i servizi tra cui scegliere se la
+        richiesta è ambigua
+    """
+    query = str(arguments.get('service') or '').strip()
+    if not query:
+        raise ToolError("Parametro 'service' mancante")
+
+    matches = service_index.get_index().lookup(query)
+    if not matches:
+        return (f"Nessun servizio trovato per '{query}'. "
+                "Usa search_services per cercare nella knowledge base.")
+    if len(matches) > 1:
+        names = '; '.join(entry['name'] for _, entry, _ in matches)
+        return f"Più servizi corrispondono a '{query}': {names}. Chiedi al cittadino quale intende."
+    return service_index.describe(matches[0][1])
+
+
+def get_availability():
+    """Servizio disponibilità che esclude gli slot bloccati/prenotati in locale."""
+    service = availability.get_service()
+    if service.busy_filter is None:
+        service.busy_filter = booking.get_engine().is_busy
+    return service
+
+
+def slot_label(office, day, start):
+    """'Ufficio Anagrafe, lunedì 2025-11-17 alle 10:00'."""
+    return f"{office}, {availability.WEEKDAY_NAMES[day.weekday()]} {day.isoformat()} alle {start}"
+
+
+def requested_slot(arguments):
+    """
+    Slot richiesto da una tool call, validato sugli orari liberi.
+
+    Returns:
+        tuple: (servizio, ufficio, data, inizio, fine) con inizio/fine datetime,
+            oppure il testo con le alternative se lo slot non è prenotabile
+    """
+    if not arguments.get('date') or not arguments.get('startTime'):
+        raise ToolError("Parametri 'date' e 'startTime' obbligatori")
+
+    service = get_availability()
+    try:
+        day = availability.parse_date(arguments['date'])
+        office = service.resolve_office(arguments.get('office'))
+        start = availability.parse_minutes(arguments['startTime'])
+        end = availability.parse_minutes(arguments['endTime']) if arguments.get('endTime') else None
+        if service.is_bookable(day, arguments['startTime'], arguments.get('endTime'), office):
+            return (service, office, day, *service.slot_window(day, start, end))
+        alternatives = service.describe(day, office=office)
+    except ValueError as e:
+        raise ToolError(str(e)) from None
+    return f"L'orario {arguments['startTime']} non è disponibile. {alternatives}"
+
+
+def check_availability(arguments):
+    """
+    Tool google_calendar_check_availability: orari liberi di un ufficio.
+
+    Args:
+        arguments: {date, startTime?, endTime?, office?}
+    """
+    if not arguments.get('date'):
+        raise ToolError("Parametro 'date' mancante")
+    try:
+        return get_availability().describe(
+            arguments['date'], arguments.get('startTime'), arguments.get('endTime'),
+            arguments.get('office'),
+        )
+    except ValueError as e:
+        raise ToolError(str(e)) from None
+
+
+def hold_slot(arguments):
+    """
+    Tool hold_appointment_slot: blocca l'orario scelto finché il cittadino conferma.
+
+    Args:
+        arguments: {date, startTime, office?}
+    """
+    slot = requested_slot({**arguments, 'endTime': None})
+    if isinstance(slot, str):
+        return slot
+
+    service, office, day, start, end = slot
+    try:
+        hold = booking.get_engine().hold(office, start, end)
+    except booking.SlotConflict:
+        return f"L'orario {arguments['startTime']} è appena stato preso. {service.describe(day, office=office)}"
+
+    minutes = round((hold['expires_at'] - time.time()) / 60)
+    return (f"Orario bloccato per {minutes} minuti: {slot_label(office, day, start.strftime('%H:%M'))}. "
+            f"holdId: `{hold['id']}`. Raccogli nome ed email e conferma con "
+            f"google_calendar_book_appointment passando questo holdId.")
+
+
+def book_appointment(arguments):
+    """
+    Tool google_calendar_book_appointment: prenotazione atomica.
+
+    Con holdId conferma il blocco; senza (o con blocco scaduto) prenota lo
+    slot richiesto se è ancora libero.
+
+    Args:
+        arguments: {summary, description?, date, startTime, endTime?,
+                    attendeeName, attendeeEmail, office?, holdId?}
+    """
+    details = {
+        'name': arguments.get('attendeeName'),
+        'email': arguments.get('attendeeEmail'),
+        'summary': arguments.get('summary'),
+        'description': arguments.get('description'),
+    }
+    if not details['name'] or not details['email']:
+        raise ToolError("Parametri 'attendeeName' e 'attendeeEmail' obbligatori")
+
+    engine = booking.get_engine()
+    confirmed = None
+    if arguments.get('holdId'):
+        try:
+            confirmed = engine.confirm(str(arguments['holdId']).strip('` '), **details)
+        except booking.HoldNotFound:
+            pass   # Blocco scaduto: si prova a prenotare lo slot se è ancora libero
+
+    if confirmed is None:
+        slot = requested_slot(arguments)
+        if isinstance(slot, str):
+            return slot
+        service, office, day, start, end = slot
+        try:
+            confirmed = engine.book(office, start, end, **details)
+        except booking.SlotConflict:
+            return f"L'orario {arguments['startTime']} è appena stato preso. {service.describe(day, office=office)}"
+
+    service = get_availability()
+    start = datetime.fromtimestamp(confirmed['start'], service.config['timezone'])
+    return (f"Appuntamento confermato: {slot_label(confirmed['calendar'], start.date(), start.strftime('%H:%M'))}, "
+            f"a nome di {confirmed['name']}. Codice prenotazione: `{confirmed['id']}`.")
+
+
+def send_confirmation_email(arguments):
+    """
+    Tool send_appointment_confirmation_email: accoda l'email e risponde subito.
+
+    Il testo viene dal template del servizio (email_templates.py), la
+    consegna (SMTP o Mailtrap) avviene in background con retry: la
+    telefonata non aspetta il provider email.
+
+    Args:
+        arguments: {citizen_email, citizen_name, service, date, time,
+                    documents? (solo per servizi fuori dall'indice)}
+    """
+    missing = [field for field in EMAIL_FIELDS if not str(arguments.get(field) or '').strip()]
+    if missing:
+        raise ToolError(f"Parametri mancanti: {', '.join(missing)}")
+    if not EMAIL_RE.match(arguments['citizen_email'].strip()):
+        raise ToolError(f"Indirizzo email non valido: {arguments['citizen_email']}")
+
+    payload = {field: str(arguments[field]).strip() for field in EMAIL_FIELDS}
+    payload['documents'] = arguments.get('documents') or []
+    try:
+        email_relay.get_relay().submit(payload)
+        when = f"{italian_words.date_to_words(payload['date'])} {italian_words.at_time(payload['time'])}"
+    except ValueError:
+        raise ToolError(f"Data (YYYY-MM-DD) o ora (HH:MM) non valida: "
+                        f"date={payload['date']!r}, time={payload['time']!r}") from None
+    return (f"Email di conferma presa in carico per {payload['citizen_name']}, appuntamento "
+            f"{when}: arriverà entro pochi minuti.")
+
+
+# Nome funzione → handler(arguments) che restituisce una stringa
+TOOL_HANDLERS = {
+    'search_services': search_services,
+    'get_service_info': service_info,
+    'google_calendar_check_availability': check_availability,
+    'hold_appointment_slot': hold_slot,
+    'google_calendar_book_appointment': book_appointment,
+    'send_appointment_confirmation_email': send_confirmation_email,
+}
+
+
+def parse_arguments(function):
+    """Argomenti di una tool call (Vapi li manda come oggetto o come stringa JSON)."""
+    arguments = function.get('arguments') or {}
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except json.JSONDecodeError:
+            raise ToolError('Argomenti non validi (JSON atteso)') from None
+    if not isinstance(arguments, dict):
+        raise ToolError('Argomenti non validi (oggetto atteso)')
+    return arguments
+
+
+def run_tool_call(tool_call):
+    """
+    Esegue una tool call; gli errori diventano il testo del risultato.
+
+    Il risultato arriva al modello in forma parlata (spoken_form.py):
+    numeri, date, orari, importi, telefoni ed email già in parole. I
+    messaggi di errore restano come sono: riportano i valori ricevuti,
+    che il modello deve correggere e non leggere al cittadino.
+    """
+    function = tool_call.get('function') or {}
+    name = function.get('name')
+    handler = TOOL_HANDLERS.get(name)
+
+    start = time.perf_counter()
+    try:
+        if handler is None:
+            raise ToolError(f"Tool sconosciuto: {name}")
+        result = spoken_form.normalize(handler(parse_arguments(function)))
+    except ToolError as e:
+        result = f"Errore: {e}"
+    except Exception:
+        logger.exception('Errore nel tool %s', name)
+        result = "Errore interno del tool, riprovare più tardi."
+
+    logger.info('%s %.1fms', name, (time.perf_counter() - start) * 1000)
+    return {'toolCallId': tool_call.get('id'), 'result': result}
+
+
+def create_app(secret=None):
+    """
+    Crea l'app Flask del server tool.
+
+    Args:
+        secret: Valore richiesto nell'header X-Vapi-Secret (None = nessun controllo)
+    """
+    app = Flask(__name__)
+
+    @app.before_request
+    def check_secret():
+        # Il calendario iCal è letto da client che non mandano header: token nell'URL
+        provided = request.headers.get('X-Vapi-Secret') or request.args.get('token')
+        if secret and request.path != '/health' and provided != secret:
+            return jsonify({'error': 'Unauthorized'}), 401
+        return None
+
+    @app.route('/webhook', methods=['POST'])
+    def webhook():
+        message = (request.get_json(silent=True) or {}).get('message') or {}
+        if message.get('type') != 'tool-calls':
+            # Altri eventi server (status-update, end-of-call-report...): ignorati
+            return jsonify({})
+
+        tool_calls = message.get('toolCallList') or [
+            item.get('toolCall') for item in message.get('toolWithToolCallList') or []
+        ]
+        results = [run_tool_call(tool_call) for tool_call in tool_calls if tool_call]
+        return jsonify({'results': results})
+
+    @app.route('/calendar.ics')
+    def calendar():
+        return Response(booking.get_engine().to_ics(), mimetype='text/calendar')
+
+    @app.route('/health')
+    def health():
+        index = kb_search.get_index()
+        return jsonify({
+            'ok': True,
+            'tools': sorted(TOOL_HANDLERS),
+            'chunks': index.n_chunks,
+            'services': len(service_index.get_index().services),
+            'cache': answer_cache.get_cache().stats(),
+            'email_queue': email_relay.get_relay().queue.stats(),
+        })
+
+    return app
+
+
+def main():
+    """Main."""
+    parser = argparse.ArgumentParser(description='Server webhook per i tool custom Vapi')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--watch-interval', type=float, default=kb_search.DEFAULT_WATCH_INTERVAL,
+                        help='Secondi tra due controlli della knowledge base (0 = nessun hot reload)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    # Indice in memoria prima della prima chiamata
+    start = time.perf_counter()
+    index = kb_search.get_index()
+    print(f"📚 Knowledge base: {index.n_chunks} chunk ({(time.perf_counter() - start) * 1000:.0f}ms)")
+    print(f"   Cache: {answer_cache.get_cache().stats()['faq']} FAQ precaricate")
+    print(f"   Servizi: {len(service_index.get_index().services)} nell'indice dei servizi")
+
+    service = availability.get_service()
+    print(f"🗓️  Disponibilità: {service.events} eventi, {service.config['horizon']} giorni "
+          f"({'calendario ' + ('collegato' if service.source else 'non configurato')})")
+    if args.watch_interval > 0:
+        kb_search.start_watcher(args.watch_interval)
+        print(f"   Hot reload: controllo ogni {args.watch_interval:g}s")
+
+    try:
+        relay = email_relay.get_relay()
+    except ValueError as e:
+        raise SystemExit(f"❌ Relay email: {e}")
+    relay.start()
+    print(f"📧 Relay email: {type(relay.transport).__name__}, "
+          f"{relay.queue.stats()['pending']} email in coda ({relay.queue.path.name})")
+
+    secret = os.getenv('TOOL_SERVER_SECRET')
+    if not secret:
+        print("⚠️  TOOL_SERVER_SECRET non impostato: webhook senza autenticazione")
+
+    print(f"🛠️  Tool server su http://{args.host}:{args.port}/webhook")
+    print(f"   Tool: {', '.join(sorted(TOOL_HANDLERS))}")
+    create_app(secret).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()